@@ -0,0 +1,236 @@
+'''Batch exploration of many input models by a pool of worker processes
+
+Running the tool once per input pays every time for importing the heavy
+dependencies, loading the MiniZinc models and routing the platform. A
+batch runs all inputs through the same pipeline as the command line
+interface in a pool of long lived worker processes instead, each with
+its own caches: parsed and identified inputs by content, platform routes
+by platform and MiniZinc models and solvers by name. Inputs sharing a
+formulation only pay for it once per worker, since loaded MiniZinc
+models cannot be handed between processes. Platform routes are also
+shared between the workers through files in a cache directory, so that
+a platform routed by one worker is read by the others, and by later
+batches given the same directory.
+
+The outputs of every input are written as in a single run, and the time
+spent in each phase, the explorer and the objective of every input are
+gathered in a report, written as CSV or JSON.
+'''
+import concurrent.futures
+import contextlib
+import csv
+import glob
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+REPORT_COLUMNS = ('model', 'status', 'elapsed', 'decision_model', 'explorer', 'objective', 'time_to_first_solution',
+                  'outputs', 'error')
+
+# cache of each worker process, kept across the jobs it runs
+_worker_cache = None
+
+
+@dataclass
+class BatchResult(object):
+    '''Outcome of the exploration of one input of a batch
+
+    Arguments:
+        status: 'done' if outputs were written, 'no solution' if the
+            exploration ended without one and 'failed' on errors.
+        phases: Wall time in seconds of every top level phase.
+        objective: Objective of the solution, for MiniZinc explorers.
+        exploration: Statistics and convergence of the exploration, for
+            MiniZinc explorers, only written in JSON reports.
+    '''
+    model: str
+    status: str
+    elapsed: float
+    outputs: List[str] = field(default_factory=list)
+    decision_model: Optional[str] = None
+    explorer: Optional[str] = None
+    objective: Optional[float] = None
+    time_to_first_solution: Optional[float] = None
+    phases: Dict[str, float] = field(default_factory=dict)
+    exploration: Optional[Dict[str, Any]] = None
+    error: str = ''
+
+
+def batch_inputs(patterns: List[str] = [], manifest: Optional[str] = None) -> List[str]:
+    '''Get the input models of a batch, in order and without repetitions
+
+    Arguments:
+        patterns: Paths or glob patterns, expanded in sorted order.
+        manifest: File with one path or pattern per line, relative to
+            the manifest itself. Empty lines and '#' comments are skipped.
+    '''
+    entries = list(patterns)
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as stream:
+            for line in stream:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    entries.append(os.path.join(base, line))
+    inputs: Dict[str, None] = dict()
+    for entry in entries:
+        for path in sorted(glob.glob(entry)) if any(c in entry for c in '*?[') else [entry]:
+            inputs.setdefault(path, None)
+    return list(inputs)
+
+
+def batch_output_path(model_path: str, output_dir: Optional[str] = None) -> str:
+    '''Get the output of an input, 'out_' prefixed next to it or in 'output_dir' '''
+    (directory, name) = os.path.split(model_path)
+    return os.path.join(output_dir if output_dir else directory, f'out_{name}')
+
+
+def _init_worker(verbosity: str, cache_size: int, cache_dir: Optional[str] = None) -> None:
+    global _worker_cache
+    # paid once per worker instead of once per input
+    from idesyde.pipeline import PipelineCache
+    _worker_cache = PipelineCache(max_entries=cache_size)
+    if cache_dir:
+        from idesyde.identification.routing import set_routing_cache_dir
+        set_routing_cache_dir(cache_dir)
+    logger = logging.getLogger('CLI')
+    logger.setLevel(getattr(logging, verbosity.upper(), logging.INFO))
+    # forked workers inherit the console handler, spawned ones do not
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[{levelname:<8}{asctime}] {message}', style='{'))
+        logger.addHandler(handler)
+
+
+def run_batch_job(model_path: str, outputs: List[str], request: Dict[str, Any]) -> BatchResult:
+    '''Run one input of a batch through the pipeline, catching its errors
+
+    Arguments:
+        request: Options of the pipeline, with the same entries as the
+            requests of the DSE service.
+    '''
+    from idesyde.pipeline import run_pipeline
+    from idesyde.profiling import PhaseProfiler
+    logger = logging.getLogger('CLI')
+    profiler = PhaseProfiler()
+    outcome: Dict[str, Any] = dict()
+    start = time.perf_counter()
+    try:
+        written = run_pipeline(model_path,
+                               outputs=outputs,
+                               desired_names=request.get('decision_model', []),
+                               mzn_solver=request.get('mzn_solver', 'gecode'),
+                               logger=logger,
+                               cache=_worker_cache,
+                               profiler=profiler,
+                               use_snapshot=request.get('snapshot', False),
+                               incremental=request.get('incremental', False),
+                               explorer_names=request.get('explorer', []),
+                               outcome=outcome)
+        (status, error) = ('done' if written else 'no solution', '')
+    except Exception as e:
+        logger.error(f'Batch input {model_path} failed: {e}')
+        (written, status, error) = ([], 'failed', f'{type(e).__name__}: {e}')
+    report = outcome.get('report', None)
+    return BatchResult(model=model_path,
+                       status=status,
+                       elapsed=time.perf_counter() - start,
+                       outputs=written,
+                       decision_model=outcome.get('decision_model', None),
+                       explorer=outcome.get('explorer', None),
+                       objective=outcome.get('objective', None),
+                       time_to_first_solution=report.time_to_first_solution if report else None,
+                       phases={r.path[0]: r.wall for r in profiler.records.values() if len(r.path) == 1},
+                       exploration=report.to_dict() if report else None,
+                       error=error)
+
+
+def run_batch(model_paths: List[str],
+              output_dir: Optional[str] = None,
+              request: Dict[str, Any] = {},
+              workers: Optional[int] = None,
+              verbosity: str = 'INFO',
+              cache_size: int = 8,
+              cache_dir: Optional[str] = None,
+              on_result: Optional[Callable[[BatchResult], None]] = None) -> List[BatchResult]:
+    '''Explore every input of a batch, with 'workers' processes or one per CPU
+
+    A single worker runs the batch in this process, which keeps the
+    caches of previous calls.
+
+    Arguments:
+        cache_dir: Directory where the workers share the platform routes.
+            With several workers, a temporary one is used for the batch
+            if not given.
+        on_result: Called with the result of every input as it ends,
+            which is not necessarily in the order of 'model_paths'.
+
+    Returns:
+        The results of the inputs, in the order of 'model_paths'.
+    '''
+    workers = workers or os.cpu_count() or 1
+    jobs = [(m, [batch_output_path(m, output_dir)], request) for m in model_paths]
+    results: Dict[str, BatchResult] = dict()
+    if workers == 1 or len(jobs) <= 1:
+        from idesyde.identification.routing import set_routing_cache_dir
+        if _worker_cache is None:
+            _init_worker(verbosity, cache_size)
+        # routes stay in the memory of this process, and also go to 'cache_dir' during the batch
+        previous_dir = set_routing_cache_dir(cache_dir) if cache_dir else None
+        try:
+            for job in jobs:
+                results[job[0]] = run_batch_job(*job)
+                if on_result:
+                    on_result(results[job[0]])
+        finally:
+            if cache_dir:
+                set_routing_cache_dir(previous_dir)
+    else:
+        with contextlib.ExitStack() as stack:
+            if not cache_dir:
+                cache_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='idesyde-batch-'))
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                                       initializer=_init_worker,
+                                                       initargs=(verbosity, cache_size, cache_dir)))
+            futures = [executor.submit(run_batch_job, *job) for job in jobs]
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                results[result.model] = result
+                if on_result:
+                    on_result(result)
+    return [results[m] for m in model_paths]
+
+
+def write_batch_report(path: str, results: List[BatchResult]) -> None:
+    '''Write the results of a batch as CSV if 'path' ends in .csv, and JSON otherwise
+
+    The CSV has one row per input, with a column for the seconds spent in
+    each phase after the common ones, and outputs joined by ';'.
+    '''
+    if not path.endswith('.csv'):
+        with open(path, 'w') as stream:
+            json.dump([asdict(r) for r in results], stream, indent=2)
+        return
+    phases: Dict[str, None] = dict()
+    for r in results:
+        for name in r.phases:
+            phases.setdefault(name, None)
+    with open(path, 'w', newline='') as stream:
+        writer = csv.writer(stream)
+        writer.writerow(list(REPORT_COLUMNS) + [f'{p}_s' for p in phases])
+        for r in results:
+            row = asdict(r)
+            row['outputs'] = ';'.join(r.outputs)
+            writer.writerow([row[c] if row[c] is not None else '' for c in REPORT_COLUMNS] +
+                            [r.phases.get(p, '') for p in phases])
@@ -0,0 +1,5 @@
+'''Scaling benchmarks of the DSE flow over generated models
+
+Run with 'python -m idesyde.benchmark run' and compare two stored runs
+with 'python -m idesyde.benchmark compare'.
+'''
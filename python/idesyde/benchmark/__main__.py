@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+
+from idesyde.benchmark import runner
+
+
+def run_entry(args) -> int:
+    cases = [c for c in runner.standard_cases(scale=args.scale) if not args.case or any(k in c.name for k in args.case)]
+    flatten = False if args.no_flatten else None
+    results = runner.run_benchmarks(cases, repeat=args.repeat, flatten=flatten)
+    for (case, stages) in results['cases'].items():
+        top = ', '.join(f'{s} {t * 1000:.2f}ms' for (s, t) in stages.items() if ';' not in s)
+        print(f'{case}: {top}')
+    path = runner.save_results(results, results_dir=args.results_dir)
+    print(f'Results stored in {path}')
+    return 0
+
+
+def compare_entry(args) -> int:
+    baseline_path = args.baseline or runner.latest_results(args.results_dir, skip=1)
+    current_path = args.current or runner.latest_results(args.results_dir)
+    if not baseline_path or not current_path:
+        print(f'Two benchmark runs are needed in {args.results_dir} to compare', file=sys.stderr)
+        return 2
+    baseline = runner.load_results(baseline_path, results_dir=args.results_dir)
+    current = runner.load_results(current_path, results_dir=args.results_dir)
+    comparison = runner.compare_results(baseline, current, threshold=args.threshold)
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print(f"Comparing {current['commit']} against {baseline['commit']}")
+        for entry in comparison:
+            mark = 'REGRESSION' if entry['regression'] else ''
+            print(f"{entry['case']:<24} {entry['stage']:<48} {entry['baseline_s'] * 1000:10.2f}ms "
+                  f"{entry['current_s'] * 1000:10.2f}ms {entry['ratio']:6.2f}x {mark}")
+    regressions = [e for e in comparison if e['regression']]
+    if regressions:
+        print(f'{len(regressions)} stage(s) regressed more than {args.threshold:.0%}', file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m idesyde.benchmark', description=runner.__doc__)
+    parser.add_argument('--results-dir',
+                        type=str,
+                        default=runner.DEFAULT_RESULTS_DIR,
+                        help=f'Directory where runs are stored. Default is {runner.DEFAULT_RESULTS_DIR}.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and store the results')
+    run_parser.add_argument('--scale', type=int, default=1, help='Multiplier for the size of the generated models.')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Repetitions per case, of which the best is kept.')
+    run_parser.add_argument('--case',
+                            type=str,
+                            action='append',
+                            help='Only run the cases whose names contain this text. Can be repeated.')
+    run_parser.add_argument('--no-flatten',
+                            action='store_true',
+                            help='Skip the MiniZinc flattening even if MiniZinc is installed.')
+    run_parser.set_defaults(func=run_entry)
+    compare_parser = subparsers.add_parser('compare',
+                                           help='''
+                                           Compare two stored runs, by default the two latest ones.
+                                           Exits with status 1 if any stage regressed.
+                                           ''')
+    compare_parser.add_argument('baseline', type=str, nargs='?', help='Baseline run, as a file or a commit.')
+    compare_parser.add_argument('current', type=str, nargs='?', help='Current run, as a file or a commit.')
+    compare_parser.add_argument('--threshold',
+                                type=float,
+                                default=0.25,
+                                help='Relative slowdown considered a regression. Default is 0.25.')
+    compare_parser.add_argument('--json', action='store_true', help='Print the comparison as JSON.')
+    compare_parser.set_defaults(func=compare_entry)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+'''Parameterised generators of ForSyDe models for benchmarking
+
+All generators build the models in memory, with the same vertex and edge
+conventions as the ForSyDe IO drivers, so that they go through exactly
+the same identification rules as parsed models. Randomness always comes
+from an explicit seed so that runs are comparable between commits.
+
+The rates of the random application graphs are derived from a randomly
+drawn repetition vector, so that they are always consistent.
+'''
+import math
+import random
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Edge
+from forsyde.io.python.core import Port
+from forsyde.io.python.core import Vertex
+from forsyde.io.python.types import SDFComb
+from forsyde.io.python.types import Process
+from forsyde.io.python.types import Signal
+from forsyde.io.python.types import AbstractOrdering
+from forsyde.io.python.types import AbstractProcessingComponent
+from forsyde.io.python.types import TimeDivisionMultiplexer
+from forsyde.io.python.types import WCET
+from forsyde.io.python.types import WCCT
+from forsyde.io.python.types import MinimumThroughput
+from forsyde.io.python.types import Output
+from forsyde.io.python.types import Annotation
+from forsyde.io.python.types import AbstractPhysicalConnection
+
+# (source actor, target actor, tokens produced, tokens consumed)
+ChannelSpec = Tuple[int, int, int, int]
+
+
+def add_vertex(model: ForSyDeModel, vertex: Vertex) -> Vertex:
+    model.add_node(vertex, label=vertex.identifier)
+    return vertex
+
+
+def add_edge(model: ForSyDeModel, edge: Edge) -> Edge:
+    source_port = edge.source_vertex_port.identifier if edge.source_vertex_port else None
+    target_port = edge.target_vertex_port.identifier if edge.target_vertex_port else None
+    key = f"{edge.source_vertex.identifier}:{source_port}->{edge.target_vertex.identifier}:{target_port}"
+    model.add_edge(edge.source_vertex, edge.target_vertex, key=key, object=edge)
+    return edge
+
+
+def _consistent_rates(repetitions: List[int], source: int, target: int) -> Tuple[int, int, int, int]:
+    '''A channel whose rates balance the given repetitions of its source and target actors'''
+    gcd = math.gcd(repetitions[source], repetitions[target])
+    return (source, target, repetitions[target] // gcd, repetitions[source] // gcd)
+
+
+def chain_channels(num_actors: int, max_repetition: int = 1, seed: int = 0) -> List[ChannelSpec]:
+    '''A pipeline of 'num_actors' actors'''
+    rng = random.Random(seed)
+    repetitions = [rng.randint(1, max_repetition) for _ in range(num_actors)]
+    return [_consistent_rates(repetitions, a, a + 1) for a in range(num_actors - 1)]
+
+
+def fork_join_channels(branches: int, depth: int, max_repetition: int = 1, seed: int = 0) -> List[ChannelSpec]:
+    '''A source actor forking into 'branches' chains of 'depth' actors which join in a sink actor
+
+    Actor 0 is the source and the last actor is the sink.
+    '''
+    rng = random.Random(seed)
+    sink = branches * depth + 1
+    repetitions = [rng.randint(1, max_repetition) for _ in range(sink + 1)]
+    channels = []
+    for b in range(branches):
+        first = 1 + b * depth
+        channels.append(_consistent_rates(repetitions, 0, first))
+        for d in range(depth - 1):
+            channels.append(_consistent_rates(repetitions, first + d, first + d + 1))
+        channels.append(_consistent_rates(repetitions, first + depth - 1, sink))
+    return channels
+
+
+def sobel_channels(copies: int = 1) -> List[ChannelSpec]:
+    '''The Sobel filter of 'examples/sobel-on-mpsoc', optionally chained 'copies' times
+
+    Each stage is getPx -> (Gx, Gy) -> Abs, where the pixel getter sends
+    windows of 6 tokens and the gradients consume them in one firing.
+    '''
+    channels = []
+    for c in range(copies):
+        (get_px, gx, gy, absolute) = (4 * c, 4 * c + 1, 4 * c + 2, 4 * c + 3)
+        channels.extend([(get_px, gx, 6, 6), (get_px, gy, 6, 6), (gx, absolute, 1, 1), (gy, absolute, 1, 1)])
+        if c > 0:
+            channels.append((absolute - 4, get_px, 1, 1))
+    return channels
+
+
+def random_dag_channels(num_actors: int,
+                        extra_channels: int,
+                        max_repetition: int = 4,
+                        seed: int = 0) -> List[ChannelSpec]:
+    '''A random connected acyclic SDF graph with consistent rates
+
+    Since it is acyclic, a PASS always exists without initial tokens.
+    '''
+    rng = random.Random(seed)
+    repetitions = [rng.randint(1, max_repetition) for _ in range(num_actors)]
+    pairs = set((a - 1, a) for a in range(1, num_actors))
+    # a backbone chain keeps it connected, the rest goes forward at random
+    candidates = [(s, t) for s in range(num_actors) for t in range(s + 2, num_actors)]
+    pairs.update(rng.sample(candidates, min(extra_channels, len(candidates))))
+    return [_consistent_rates(repetitions, s, t) for (s, t) in sorted(pairs)]
+
+
+def build_sdf_application(model: ForSyDeModel, channels: List[ChannelSpec], prefix: str = 'app') -> List[Vertex]:
+    '''Add the SDF actors, constructors and signals described by 'channels' to 'model'
+
+    Returns:
+        The actors added, indexed as in 'channels'.
+    '''
+    num_actors = 1 + max((max(s, t) for (s, t, _, _) in channels), default=0)
+    consumption: List[Dict[str, int]] = [dict() for _ in range(num_actors)]
+    production: List[Dict[str, int]] = [dict() for _ in range(num_actors)]
+    for (cidx, (s, t, prod, cons)) in enumerate(channels):
+        production[s][f'out{cidx}'] = prod
+        consumption[t][f'in{cidx}'] = cons
+    actors = []
+    for a in range(num_actors):
+        ports = set(Port(identifier=p) for p in list(production[a]) + list(consumption[a]))
+        actor = add_vertex(model, Process(identifier=f'{prefix}/actor{a}', ports=ports))
+        constructor = add_vertex(
+            model,
+            SDFComb(identifier=f'{prefix}/actor{a}Cons',
+                    ports=set([Port(identifier='combinator'), Port(identifier='output')]),
+                    properties={
+                        'production': production[a],
+                        'consumption': consumption[a]
+                    }))
+        add_edge(model,
+                 Output(source_vertex=constructor,
+                        target_vertex=actor,
+                        source_vertex_port=constructor.get_port('output')))
+        actors.append(actor)
+    for (cidx, (s, t, _, _)) in enumerate(channels):
+        signal = add_vertex(
+            model,
+            Signal(identifier=f'{prefix}/signal{cidx}', ports=set([Port(identifier='fifoIn'),
+                                                                    Port(identifier='fifoOut')])))
+        add_edge(
+            model,
+            Output(source_vertex=actors[s],
+                   target_vertex=signal,
+                   source_vertex_port=actors[s].get_port(f'out{cidx}'),
+                   target_vertex_port=signal.get_port('fifoIn')))
+        add_edge(
+            model,
+            Output(source_vertex=signal,
+                   target_vertex=actors[t],
+                   source_vertex_port=signal.get_port('fifoOut'),
+                   target_vertex_port=actors[t].get_port(f'in{cidx}')))
+    return actors
+
+
+def build_tdma_bus_platform(model: ForSyDeModel,
+                            num_cores: int,
+                            slots: int = 4,
+                            prefix: str = 'platform') -> Tuple[List[Vertex], List[Vertex]]:
+    '''Add 'num_cores' cores sharing one TDMA bus to 'model', plus one ordering per element
+
+    Returns:
+        The cores and the communication elements added.
+    '''
+    bus = add_vertex(model, TimeDivisionMultiplexer(identifier=f'{prefix}/bus', properties={'slots': slots}))
+    cores = []
+    for p in range(num_cores):
+        core = add_vertex(model, AbstractProcessingComponent(identifier=f'{prefix}/core{p}'))
+        add_edge(model, AbstractPhysicalConnection(source_vertex=core, target_vertex=bus))
+        add_edge(model, AbstractPhysicalConnection(source_vertex=bus, target_vertex=core))
+        cores.append(core)
+    for o in range(num_cores + 1):
+        add_vertex(model, AbstractOrdering(identifier=f'{prefix}/order{o}'))
+    return (cores, [bus])
+
+
+def annotate_wcet(model: ForSyDeModel,
+                  actors: List[Vertex],
+                  cores: List[Vertex],
+                  core_types: int = 1,
+                  time_range: Tuple[int, int] = (10, 1000),
+                  seed: int = 0) -> None:
+    '''Annotate every actor with one WCET per core type
+
+    Cores are split in 'core_types' groups in a round robin fashion and
+    all the cores of a group share the same execution times.
+    '''
+    rng = random.Random(seed)
+    for actor in actors:
+        for k in range(core_types):
+            wcet = add_vertex(model,
+                              WCET(identifier=f'{actor.identifier}/wcet{k}',
+                                   properties={'time': rng.randint(*time_range)}))
+            add_edge(model, Annotation(source_vertex=wcet, target_vertex=actor))
+            for core in cores[k::core_types]:
+                add_edge(model, Annotation(source_vertex=wcet, target_vertex=core))
+
+
+def annotate_wcct(model: ForSyDeModel,
+                  comms: List[Vertex],
+                  time_range: Tuple[int, int] = (1, 10),
+                  seed: int = 0) -> None:
+    '''Annotate every signal in 'model' with a WCCT for every communication element'''
+    rng = random.Random(seed)
+    signals = [v for v in model if isinstance(v, Signal)]
+    for signal in signals:
+        for comm in comms:
+            wcct = add_vertex(
+                model,
+                WCCT(identifier=f'{signal.identifier}/{comm.identifier}/wcct',
+                     properties={'time': rng.randint(*time_range)}))
+            add_edge(model, Annotation(source_vertex=wcct, target_vertex=signal))
+            add_edge(model, Annotation(source_vertex=wcct, target_vertex=comm))
+
+
+def annotate_throughput_goal(model: ForSyDeModel, actors: List[Vertex], importance: int = 1) -> Vertex:
+    goal = add_vertex(model,
+                      MinimumThroughput(identifier=f'{actors[0].identifier}/throughput',
+                                        properties={'apriori_importance': importance}))
+    add_edge(model, Annotation(source_vertex=goal, target_vertex=actors[0]))
+    return goal
+
+
+def sdf_mpsoc_model(channels: List[ChannelSpec],
+                    num_cores: int,
+                    slots: int = 4,
+                    core_types: int = 1,
+                    seed: int = 0,
+                    model: Optional[ForSyDeModel] = None) -> ForSyDeModel:
+    '''Build a complete SDF on MPSoC model, from application to characterization
+
+    Arguments:
+        channels: Application graph, e.g. made by 'chain_channels'.
+        num_cores: Number of cores in the TDMA bus platform.
+        slots: Number of TDMA slots of the bus.
+        core_types: Number of groups of cores with distinct WCETs.
+        seed: Seed for the WCET and WCCT annotations.
+        model: Model where the elements are added. A new one if not given.
+    '''
+    model = model if model is not None else ForSyDeModel()
+    actors = build_sdf_application(model, channels)
+    (cores, comms) = build_tdma_bus_platform(model, num_cores, slots=slots)
+    annotate_wcet(model, actors, cores, core_types=core_types, seed=seed)
+    annotate_wcct(model, comms, seed=seed)
+    annotate_throughput_goal(model, actors)
+    return model
+
+
+def independent_sdf_mpsoc_model(applications: List[List[ChannelSpec]],
+                                num_cores: int,
+                                slots: int = 4,
+                                core_types: int = 1,
+                                seed: int = 0) -> ForSyDeModel:
+    '''Build a model with several disjoint SDF applications sharing one platform
+
+    Applications are prefixed 'app0', 'app1' and so on, and each gets its
+    own throughput goal. The other arguments are as in 'sdf_mpsoc_model'.
+    '''
+    model = ForSyDeModel()
+    (cores, comms) = build_tdma_bus_platform(model, num_cores, slots=slots)
+    for (i, channels) in enumerate(applications):
+        actors = build_sdf_application(model, channels, prefix=f'app{i}')
+        annotate_wcet(model, actors, cores, core_types=core_types, seed=seed + i)
+        annotate_throughput_goal(model, actors)
+    annotate_wcct(model, comms, seed=seed)
+    return model
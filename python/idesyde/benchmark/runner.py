@@ -0,0 +1,250 @@
+'''Timing of the DSE flow stages over generated models and comparison between runs
+
+Every benchmark case builds one model with the generators and times each
+identification rule, the PASS computation, the MiniZinc data generation,
+the flattening (if a MiniZinc installation is found), the rebuild of
+a ForSyDe model from synthetic exploration results and the throughput
+analysis of these results. The best time over a number of repetitions
+is kept per stage, to reduce noise from the machine.
+
+Results are stored as one JSON file per run, tagged with the commit they
+were measured at, so that runs from different commits can be compared.
+'''
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+from forsyde.io.python.api import ForSyDeModel
+
+import idesyde.sdf as sdfapi
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.interfaces import MinizincableDecisionModel
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.profiling import PhaseProfiler
+
+DEFAULT_RESULTS_DIR = '.benchmarks'
+
+
+@dataclass
+class BenchmarkCase(object):
+    '''A named, parameterised model to be benchmarked
+
+    Arguments:
+        name: Unique name of the case, used to match it between runs.
+        build: Builds a fresh model for the case on every call.
+    '''
+    name: str
+    build: Callable[[], ForSyDeModel]
+
+
+def _case(name: str, channels: List[generators.ChannelSpec], cores: int, core_types: int = 1) -> BenchmarkCase:
+    return BenchmarkCase(name=name,
+                         build=lambda: generators.sdf_mpsoc_model(channels, cores, core_types=core_types, seed=0))
+
+
+def standard_cases(scale: int = 1) -> List[BenchmarkCase]:
+    '''The benchmark cases run by default, with sizes growing with 'scale'
+
+    Each family is run at a few sizes so that scaling trends can be seen
+    in the results and not only absolute times.
+    '''
+    cases = []
+    for size in (scale * 4, scale * 8, scale * 16):
+        cases.append(_case(f'chain-{size}-on-4', generators.chain_channels(size, max_repetition=3, seed=size), 4))
+        cases.append(
+            _case(f'forkjoin-{size // 4}x4-on-4',
+                  generators.fork_join_channels(size // 4, 4, max_repetition=3, seed=size), 4))
+        cases.append(
+            _case(f'random-{size}-on-4',
+                  generators.random_dag_channels(size, size // 2, max_repetition=3, seed=size),
+                  4,
+                  core_types=2))
+    for copies in (scale, scale * 2):
+        cases.append(_case(f'sobel-{copies}-on-4', generators.sobel_channels(copies), 4))
+    for cores in (scale * 2, scale * 8, scale * 16):
+        cases.append(_case(f'sobel-1-on-{cores}', generators.sobel_channels(1), cores, core_types=2))
+    for apps in (scale * 2, scale * 4, scale * 8):
+        applications = [generators.chain_channels(8, max_repetition=3, seed=i) for i in range(apps)]
+        cases.append(
+            BenchmarkCase(name=f'independent-{apps}x8-on-4',
+                          build=lambda applications=applications: generators.independent_sdf_mpsoc_model(
+                              applications, 4, seed=0)))
+    return cases
+
+
+def synthetic_results(decision_model: SDFToMultiCore) -> Dict[str, Any]:
+    '''Exploration results in the shape returned by the MiniZinc models, for timing the rebuild
+
+    Actors are mapped round robin to the cores with all their firings
+    in a single step, and no channel uses the communication elements.
+    '''
+    sdf_exec = decision_model.sdf_orders_sub.sdf_exec_sub
+    (num_actors, num_channels) = (len(sdf_exec.sdf_actors), len(sdf_exec.sdf_channels))
+    (num_cores, num_comms) = (len(decision_model.cores), len(decision_model.comms))
+    steps = decision_model.max_steps
+    repetitions = sdf_exec.sdf_repetition_vector.reshape(-1)
+    mapped_actors = np.zeros((num_actors, num_cores, steps), dtype=int)
+    for aidx in range(num_actors):
+        mapped_actors[aidx, aidx % num_cores, min(aidx // num_cores, steps - 1)] = repetitions[aidx]
+    sends = np.zeros((num_channels, num_cores, num_cores, steps, steps, num_comms), dtype=int)
+    return {
+        'mapped_actors': mapped_actors.tolist(),
+        'buffer_start': np.zeros((num_channels, num_cores, steps), dtype=int).tolist(),
+        'send_start': sends.tolist(),
+        'send_duration': sends.tolist()
+    }
+
+
+def _flatten(decision_model: MinizincableDecisionModel) -> None:
+    # imported here so that the rest of the benchmark runs without minizinc
+    from minizinc import Instance
+    from minizinc import Model
+    from minizinc import Solver
+    instance = Instance(Solver.lookup('gecode'), Model())
+    decision_model.build_mzn_model(instance)
+    with instance.flat():
+        pass
+
+
+def run_case(case: BenchmarkCase, repeat: int = 3, flatten: Optional[bool] = None) -> Dict[str, float]:
+    '''Time every stage of the flow for one case
+
+    Arguments:
+        repeat: Number of repetitions, of which the best time is kept.
+        flatten: Whether to time the flattening. By default, only if
+            'minizinc' is found in the PATH.
+
+    Returns:
+        The best wall time in seconds of each stage, keyed by stage name.
+    '''
+    flatten = shutil.which('minizinc') is not None if flatten is None else flatten
+    best: Dict[str, float] = dict()
+    for _ in range(repeat):
+        profiler = PhaseProfiler()
+        with profiler.phase('generate'):
+            model = case.build()
+        with profiler.phase('identify'):
+            identified = identify_decision_models(model, profiler=profiler)
+        for decision_model in identified:
+            name = decision_model.short_name()
+            if isinstance(decision_model, SDFExecution):
+                with profiler.phase('get_PASS'):
+                    sdfapi.get_PASS(decision_model.sdf_topology, decision_model.sdf_repetition_vector)
+            if isinstance(decision_model, MinizincableDecisionModel):
+                with profiler.phase('mzn_data'), profiler.phase(name):
+                    decision_model.get_mzn_data()
+                if flatten:
+                    with profiler.phase('flatten'), profiler.phase(name):
+                        _flatten(decision_model)
+            if isinstance(decision_model, (SDFToMultiCore, SDFToMultiCoreCharacterized)):
+                mpsoc = decision_model if isinstance(decision_model, SDFToMultiCore) else decision_model.sdf_mpsoc_sub
+                results = synthetic_results(mpsoc)
+                with profiler.phase('rebuild'), profiler.phase(name):
+                    decision_model.rebuild_forsyde_model(results)
+                if isinstance(decision_model, SDFToMultiCoreCharacterized):
+                    with profiler.phase('throughput'):
+                        decision_model.evaluate_period(results)
+        for (path, record) in profiler.records.items():
+            stage = ';'.join(path)
+            best[stage] = min(best.get(stage, record.wall), record.wall)
+    return best
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL,
+                              universal_newlines=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(cases: List[BenchmarkCase], repeat: int = 3, flatten: Optional[bool] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    return {
+        'commit': current_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': {case.name: run_case(case, repeat=repeat, flatten=flatten) for case in cases},
+        'elapsed': time.perf_counter() - start
+    }
+
+
+def save_results(results: Dict[str, Any], results_dir: str = DEFAULT_RESULTS_DIR) -> str:
+    '''Store a run in 'results_dir', named so that runs sort by time
+
+    Returns:
+        The path of the stored file.
+    '''
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = results['timestamp'].replace(':', '').replace('-', '')
+    path = os.path.join(results_dir, f"{stamp}_{results['commit']}.json")
+    with open(path, 'w') as stream:
+        json.dump(results, stream, indent=2)
+    return path
+
+
+def load_results(path_or_commit: str, results_dir: str = DEFAULT_RESULTS_DIR) -> Dict[str, Any]:
+    '''Load a stored run, either from its path or from the latest run of a commit'''
+    if not os.path.isfile(path_or_commit):
+        runs = sorted(f for f in os.listdir(results_dir) if f.endswith(f'_{path_or_commit}.json'))
+        if not runs:
+            raise FileNotFoundError(f'No benchmark results for {path_or_commit} in {results_dir}')
+        path_or_commit = os.path.join(results_dir, runs[-1])
+    with open(path_or_commit) as stream:
+        return json.load(stream)
+
+
+def latest_results(results_dir: str = DEFAULT_RESULTS_DIR, skip: int = 0) -> Optional[str]:
+    runs = sorted(f for f in os.listdir(results_dir) if f.endswith('.json')) if os.path.isdir(results_dir) else []
+    return os.path.join(results_dir, runs[-1 - skip]) if len(runs) > skip else None
+
+
+def compare_results(baseline: Dict[str, Any],
+                    current: Dict[str, Any],
+                    threshold: float = 0.25,
+                    min_seconds: float = 1e-3) -> List[Dict[str, Any]]:
+    '''Compare two runs stage by stage
+
+    Stages faster than 'min_seconds' in both runs are ignored, since
+    their relative differences are dominated by noise.
+
+    Returns:
+        One entry per stage present in both runs, with the ratio of the
+        current time to the baseline time and whether it is a regression,
+        i.e. the ratio is above 1 + 'threshold'.
+    '''
+    comparison = []
+    for (case, stages) in current['cases'].items():
+        for (stage, seconds) in stages.items():
+            before = baseline['cases'].get(case, {}).get(stage, None)
+            if before is None or max(before, seconds) < min_seconds:
+                continue
+            ratio = seconds / before if before > 0 else float('inf')
+            comparison.append({
+                'case': case,
+                'stage': stage,
+                'baseline_s': before,
+                'current_s': seconds,
+                'ratio': ratio,
+                'regression': ratio > 1 + threshold
+            })
+    return comparison
@@ -0,0 +1,138 @@
+'''Checkpoints of long running explorations
+
+A checkpoint keeps the best solution found so far by an explorer, with
+its objective, the best bound the solver proved, the solver and options
+used, and the fingerprint of the decision model it solves. It is written
+as JSON, replacing the previous one atomically, so a machine restart at
+any point leaves either the previous checkpoint or the new one.
+
+Resuming loads the solution back as the warm start of the same decision
+model, with the objective constrained to be strictly better, so the
+exploration carries on from where it stopped instead of from scratch.
+'''
+import datetime
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from idesyde.identification.interfaces import MinizincableDecisionModel
+
+CHECKPOINT_INTERVAL = datetime.timedelta(seconds=60)
+
+# variables of a solution needed to rebuild it or to start from it
+SOLUTION_VARIABLES = ('mapped_actors', 'buffer_start', 'send_start', 'send_duration', 'start', 'objective_values')
+
+
+@dataclass
+class Checkpoint(object):
+    '''Best solution of an exploration so far
+
+    Arguments:
+        fingerprint: Fingerprint of the decision model.
+        data_digest: Digest of the MiniZinc data of the decision model,
+            which changes with the characterization even when the
+            covered elements do not.
+        objective: Weighted objective of the solution.
+        bound: Best bound on the objective proved by the solver, if any.
+        config: Options the exploration was run with.
+    '''
+    fingerprint: str
+    data_digest: str
+    decision_model: str
+    solver: str
+    solution: Dict[str, Any]
+    objective: Optional[int] = None
+    bound: Optional[int] = None
+    config: Dict[str, Any] = field(default_factory=dict)
+    updated: str = ''
+
+    def matches(self, decision_model: MinizincableDecisionModel) -> bool:
+        return self.fingerprint == decision_model.fingerprint() and self.data_digest == data_digest(decision_model)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, range):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'{type(value)} is not serializable')
+
+
+def data_digest(decision_model: MinizincableDecisionModel) -> str:
+    '''Get the SHA-256 digest of the MiniZinc data of a decision model'''
+    encoded = json.dumps(decision_model.get_mzn_data(), sort_keys=True, default=_jsonable)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def make_checkpoint(decision_model: MinizincableDecisionModel,
+                    solver: str,
+                    result: Any,
+                    objective: Optional[int] = None,
+                    bound: Optional[int] = None,
+                    config: Dict[str, Any] = {}) -> Checkpoint:
+    '''Make a checkpoint of a solution, indexable by variable name as MiniZinc results are'''
+    solution = dict()
+    for name in SOLUTION_VARIABLES:
+        try:
+            solution[name] = result[name]
+        except KeyError:
+            continue
+    return Checkpoint(fingerprint=decision_model.fingerprint(),
+                      data_digest=data_digest(decision_model),
+                      decision_model=decision_model.short_name(),
+                      solver=solver,
+                      solution=json.loads(json.dumps(solution, default=_jsonable)),
+                      objective=objective,
+                      bound=bound,
+                      config=dict(config),
+                      updated=datetime.datetime.now().isoformat(timespec='seconds'))
+
+
+def write_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    '''Replace the checkpoint at 'path', so that it is never left half written'''
+    partial = f'{path}.partial'
+    with open(partial, 'w') as stream:
+        json.dump(asdict(checkpoint), stream)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(partial, path)
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    with open(path) as stream:
+        return Checkpoint(**json.load(stream))
+
+
+def resume_data(checkpoint: Checkpoint) -> Dict[str, Any]:
+    '''Get the MiniZinc data starting the search from the solution of a checkpoint'''
+    return {'warm_mapped_actors': checkpoint.solution['mapped_actors']}
+
+
+def improvement_constraint(checkpoint: Checkpoint) -> str:
+    '''Get the MiniZinc constraint for solutions strictly better than the one of a checkpoint
+
+    Raises:
+        ValueError: If the checkpoint has no objective to improve on.
+    '''
+    if checkpoint.objective is None:
+        raise ValueError(f'The checkpoint of {checkpoint.decision_model} has no objective to improve on')
+    return f'constraint sum(o in objectives) (objective_weights[o] * objective[o]) < {checkpoint.objective};\n'
+
+
+def find_checkpointed(checkpoint: Checkpoint,
+                      decision_models: List[MinizincableDecisionModel]) -> Optional[MinizincableDecisionModel]:
+    '''Get the decision model a checkpoint was taken for, if it is among 'decision_models' unchanged'''
+    for m in decision_models:
+        if isinstance(m, MinizincableDecisionModel) and m.fingerprint() == checkpoint.fingerprint\
+                and checkpoint.matches(m):
+            return m
+    return None
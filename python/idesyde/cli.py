@@ -1,14 +1,11 @@
 import argparse
 import logging
-import random
+import os
+import sys
 
-import forsyde.io.python.api as forsyde_io
-import networkx as nx
-
-from idesyde.identification.api import identify_decision_models
-from idesyde.identification.api import choose_decision_models
-from idesyde.exploration import choose_explorer
-from idesyde.exploration import MinizincExplorer
+# Only light modules are imported at load time so that the CLI starts fast.
+# The DSE flow pulls in sympy, networkx, numpy, minizinc and forsyde-io,
+# which are imported inside the functions that actually need them.
 
 description = '''
   ___  ___        ___        ___
@@ -21,9 +18,7 @@ Automated Identification and Exlopration of Design Spaces in ForSyDe
 '''
 
 
-def cli_entry():
-    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('model', type=str, help='Input ForSyDe-IO model to DeSyDe')
+def _add_verbosity_argument(parser):
     parser.add_argument('--verbosity',
                         type=str,
                         default="INFO",
@@ -36,20 +31,27 @@ def cli_entry():
                         Note that capitalization is done internally, so
                         info and INFO are equally valid.
                         ''')
-    parser.add_argument('-o',
-                        '--output',
-                        type=str,
+
+
+def _add_exploration_arguments(parser):
+    parser.add_argument('--decision-model',
                         action='append',
                         nargs=1,
                         help='''
-                        Output files, which can be another model or
-                        graph visualization formats.
+                        Filter decision model to match these short names.
                         ''')
-    parser.add_argument('--decision-model',
+    parser.add_argument('--explorer',
                         action='append',
                         nargs=1,
                         help='''
-                        Filter decision model to match these short names.
+                        Filter explorers to match these short names, e.g.
+                        ComponentsParallelExplorer to explore disjoint
+                        applications separately and in parallel, or
+                        LNSExplorer to improve a first solution of large
+                        models by large neighbourhood search, or
+                        CPSATExplorer to solve with OR-Tools CP-SAT on all
+                        cores, or MILPExplorer to solve as a MILP with
+                        SciPy and HiGHS, if installed.
                         ''')
     parser.add_argument('--mzn-solver',
                         type=str,
@@ -58,43 +60,407 @@ def cli_entry():
                         Minizinc solver to be used for decision models
                         that are solved by them.
                         ''')
-    args = parser.parse_args()
+    parser.add_argument('--snapshot',
+                        action='store_true',
+                        help='''
+                        Keep a binary snapshot of the parsed model and its
+                        decision models next to the input, and load it instead
+                        of parsing and identifying again while the input
+                        content does not change.
+                        ''')
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        help='''
+                        With --snapshot, when the input changed since the
+                        snapshot was taken, patch its decision models with
+                        the changes instead of identifying from scratch.
+                        ''')
+
+
+def _add_job_arguments(parser):
+    parser.add_argument('model', type=str, help='Input ForSyDe-IO model to DeSyDe')
+    parser.add_argument('-o',
+                        '--output',
+                        type=str,
+                        action='append',
+                        nargs=1,
+                        help='''
+                        Output files, which can be another model or
+                        graph visualization formats.
+                        ''')
+    parser.add_argument('--pareto',
+                        type=int,
+                        nargs='?',
+                        const=0,
+                        help='''
+                        Explore the Pareto front of throughput and latency
+                        instead of a single solution, writing one output per
+                        point with '_paretoN' added to its name. With a
+                        number, that many points are solved in parallel
+                        between the extremes of the front, instead of
+                        sweeping the whole front.
+                        ''')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        help='''
+                        Keep the best solution found so far in this file,
+                        rewritten every minute and at the end, so that a long
+                        exploration can be carried on with --resume.
+                        ''')
+    parser.add_argument('--resume',
+                        type=str,
+                        help='''
+                        Carry on the exploration kept in this checkpoint,
+                        starting from its solution and looking only for
+                        better ones. The input must be unchanged since the
+                        checkpoint was taken.
+                        ''')
+    parser.add_argument('--exploration-report',
+                        type=str,
+                        help='''
+                        Write the solver statistics of the exploration, such as
+                        flattening time, flattened variables and constraints,
+                        nodes, failures and restarts, and the time and objective
+                        of every solution found, to this file as JSON.
+                        ''')
+    _add_exploration_arguments(parser)
+
+
+def _add_service_arguments(parser):
+    from idesyde import service
+    parser.add_argument('--host',
+                        type=str,
+                        default=service.DEFAULT_HOST,
+                        help=f'''
+                        Address of the DSE service. Default is {service.DEFAULT_HOST}.
+                        ''')
+    parser.add_argument('--port',
+                        type=int,
+                        default=service.DEFAULT_PORT,
+                        help=f'''
+                        Port of the DSE service. Default is {service.DEFAULT_PORT}.
+                        ''')
+
+
+def _create_logger(verbosity: str) -> logging.Logger:
     logger = logging.getLogger('CLI')
-    logger.setLevel(getattr(logging, args.verbosity.upper(), 'INFO'))
+    logger.setLevel(getattr(logging, verbosity.upper(), 'INFO'))
     consoleLogHandler = logging.StreamHandler()
-    consoleLogHandler.setLevel(getattr(logging, args.verbosity.upper(), 'INFO'))
+    consoleLogHandler.setLevel(getattr(logging, verbosity.upper(), 'INFO'))
     consoleLogHandler.setFormatter(logging.Formatter('[{levelname:<8}{asctime}] {message}', style='{'))
     logger.addHandler(consoleLogHandler)
-    logger.debug('Arguments parsed')
-    in_model = forsyde_io.load_model(args.model)
-    logger.info('Model parsed')
-    logger.debug('DeSyDeR API created')
-    identified = identify_decision_models(in_model)
-    logger.info(f'{len(identified)} Decision model(s) identified')
-    logger.debug(f"Decision models identified: {identified}")
-    desired_names = [i[0] for i in args.decision_model] if args.decision_model else []
-    models_chosen = choose_decision_models(identified, desired_names=desired_names)
-    logger.info(f'{len(models_chosen)} Decision model(s) chosen')
-    explorer_and_models = choose_explorer(models_chosen)
-    logger.info(f'{len(explorer_and_models)} Explorer(s) and Model(s) chosen')
-    resulting_model = None
-    if len(explorer_and_models) > 0:
-        if len(explorer_and_models) > 1:
-            logger.warning("More than one explorer and model chosen. Picking one randomly")
-        (explorer, model) = random.choice(explorer_and_models)
-        logger.info(f'Exploring {model.short_name()} with {explorer.short_name()}')
-        if isinstance(explorer, MinizincExplorer):
-            resulting_model = explorer.explore(model, backend_solver_name=args.mzn_solver)
+    return logger
+
+
+def serve_entry(argv):
+    parser = argparse.ArgumentParser(prog='idesyde serve',
+                                     description='''
+                                     Keep a warm DSE process that runs jobs submitted
+                                     with 'idesyde submit'.
+                                     ''')
+    _add_service_arguments(parser)
+    _add_verbosity_argument(parser)
+    parser.add_argument('--concurrency',
+                        type=int,
+                        default=1,
+                        help='''
+                        Number of jobs that are run simultaneously. Default is 1.
+                        ''')
+    parser.add_argument('--max-queue',
+                        type=int,
+                        default=16,
+                        help='''
+                        Number of jobs that can wait for a free worker. Submissions
+                        beyond that are rejected. Default is 16.
+                        ''')
+    parser.add_argument('--cache-size',
+                        type=int,
+                        default=8,
+                        help='''
+                        Number of parsed and identified input models kept in memory,
+                        keyed by their file content. Default is 8.
+                        ''')
+    args = parser.parse_args(argv)
+    logger = _create_logger(args.verbosity)
+    import asyncio
+    from idesyde import service
+    dse_service = service.DSEService(concurrency=args.concurrency,
+                                     max_queue=args.max_queue,
+                                     cache_size=args.cache_size)
+    try:
+        asyncio.run(dse_service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info('Service stopped')
+
+
+def submit_entry(argv):
+    parser = argparse.ArgumentParser(prog='idesyde submit',
+                                     description='''
+                                     Run a model through a DSE service started
+                                     with 'idesyde serve'.
+                                     ''')
+    _add_job_arguments(parser)
+    _add_service_arguments(parser)
+    _add_verbosity_argument(parser)
+    args = parser.parse_args(argv)
+    logger = _create_logger(args.verbosity)
+    # the service may run in another working directory
+    outputs = [i[0] for i in args.output] if args.output else [f'out_{args.model}']
+    request = {
+        'model': os.path.abspath(args.model),
+        'output': [os.path.abspath(o) for o in outputs],
+        'decision_model': [i[0] for i in args.decision_model] if args.decision_model else [],
+        'explorer': [i[0] for i in args.explorer] if args.explorer else [],
+        'mzn_solver': args.mzn_solver,
+        'snapshot': args.snapshot,
+        'incremental': args.incremental,
+        'pareto': args.pareto,
+        'checkpoint': os.path.abspath(args.checkpoint) if args.checkpoint else None,
+        'resume': os.path.abspath(args.resume) if args.resume else None,
+        'exploration_report': os.path.abspath(args.exploration_report) if args.exploration_report else None,
+        'verbosity': args.verbosity
+    }
+
+    def log_event(event):
+        if event['event'] == 'progress':
+            logger.log(getattr(logging, event['level'], logging.INFO), event['message'])
         else:
-            resulting_model = explorer.explore(model)
-        logger.info('Exploration complete')
-    if resulting_model:
-        out_model = nx.compose(in_model, resulting_model)
-        outputs = [i[0] for i in args.output]\
-            if args.output else [f'out_{args.model}']
-        for out_file in outputs:
-            out_model.write(out_file)
-            logger.info(f'Writting output model {out_file}')
+            logger.debug(f'Job {event["job"]} {event["event"]}')
+
+    import asyncio
+    from idesyde import service
+    try:
+        result = asyncio.run(service.submit(request, host=args.host, port=args.port, on_event=log_event))
+    except ConnectionError as e:
+        logger.error(f'Could not reach the DSE service at {args.host}:{args.port}: {e}')
+        sys.exit(1)
+    if result['event'] == 'done':
+        for out_file in result['outputs']:
+            logger.info(f'Output model written to {out_file}')
+        logger.info(f'Done in {result["elapsed"]:.3f}s')
+    else:
+        logger.error(f'Job {result["event"]}: {result.get("reason", "")}')
+        sys.exit(1)
+
+
+def batch_entry(argv):
+    parser = argparse.ArgumentParser(prog='idesyde batch',
+                                     description='''
+                                     Explore many input models in a pool of worker
+                                     processes that keep their caches between inputs.
+                                     ''')
+    parser.add_argument('models', type=str, nargs='*', help='Input ForSyDe-IO models or glob patterns of them')
+    parser.add_argument('--manifest',
+                        type=str,
+                        help='''
+                        File with one input model or glob pattern per line,
+                        relative to the file.
+                        ''')
+    parser.add_argument('--output-dir',
+                        type=str,
+                        help='''
+                        Directory where the output of every input is written,
+                        'out_' prefixed to its name. Default is next to the input.
+                        ''')
+    parser.add_argument('--report',
+                        type=str,
+                        help='''
+                        Write the status, phase timings, explorer and objective
+                        of every input to this file, as CSV if it ends in .csv
+                        and JSON otherwise.
+                        ''')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='''
+                        Number of worker processes. Default is one per CPU.
+                        ''')
+    parser.add_argument('--cache-size',
+                        type=int,
+                        default=8,
+                        help='''
+                        Number of parsed and identified input models kept in memory
+                        by each worker, keyed by their file content. Default is 8.
+                        ''')
+    parser.add_argument('--cache-dir',
+                        type=str,
+                        help='''
+                        Directory where the workers share the routes of the
+                        platforms, which can be reused by later batches.
+                        Default is a temporary directory for the batch.
+                        ''')
+    _add_exploration_arguments(parser)
+    _add_verbosity_argument(parser)
+    args = parser.parse_args(argv)
+    logger = _create_logger(args.verbosity)
+    from idesyde import batch
+    inputs = batch.batch_inputs(args.models, manifest=args.manifest)
+    if not inputs:
+        parser.error('no input models given')
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    request = {
+        'decision_model': [i[0] for i in args.decision_model] if args.decision_model else [],
+        'explorer': [i[0] for i in args.explorer] if args.explorer else [],
+        'mzn_solver': args.mzn_solver,
+        'snapshot': args.snapshot,
+        'incremental': args.incremental
+    }
+
+    def log_result(result):
+        logger.info(f'{result.model}: {result.status} in {result.elapsed:.3f}s')
+
+    results = batch.run_batch(inputs,
+                              output_dir=args.output_dir,
+                              request=request,
+                              workers=args.workers,
+                              verbosity=args.verbosity,
+                              cache_size=args.cache_size,
+                              cache_dir=args.cache_dir,
+                              on_result=log_result)
+    if args.report:
+        batch.write_batch_report(args.report, results)
+        logger.info(f'Batch report written to {args.report}')
+    failed = [r for r in results if r.status == 'failed']
+    logger.info(f'{len(results) - len(failed)} of {len(results)} input(s) explored')
+    if failed:
+        sys.exit(1)
+
+
+def sweep_entry(argv):
+    parser = argparse.ArgumentParser(prog='idesyde sweep',
+                                     description='''
+                                     Explore an input model on a grid of platforms derived
+                                     from its own, identifying its application only once.
+                                     ''')
+    parser.add_argument('model', type=str, help='Input ForSyDe-IO model to DeSyDe')
+    parser.add_argument('--cores',
+                        type=int,
+                        nargs='+',
+                        default=[],
+                        help='''
+                        Numbers of cores of the platforms, e.g. 2 4 8 16,
+                        keeping the first cores of the input platform.
+                        Default is all of them.
+                        ''')
+    parser.add_argument('--slots',
+                        type=int,
+                        nargs='+',
+                        default=[],
+                        help='''
+                        Numbers of slots of every communication element.
+                        Default is the slots of the input platform.
+                        ''')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=4,
+                        help='''
+                        Number of platforms explored at once. Default is 4.
+                        ''')
+    parser.add_argument('--report',
+                        type=str,
+                        help='''
+                        Write the throughput and latency of every platform to
+                        this file, as CSV if it ends in .csv and JSON otherwise.
+                        ''')
+    parser.add_argument('--mzn-solver',
+                        type=str,
+                        default='gecode',
+                        help='''
+                        Minizinc solver used for every platform.
+                        ''')
+    _add_verbosity_argument(parser)
+    args = parser.parse_args(argv)
+    logger = _create_logger(args.verbosity)
+    from idesyde import sweep
+    from idesyde.pipeline import explore_platform_sweep
+    from idesyde.pipeline import parse_and_identify
+    (_, identified) = parse_and_identify(args.model, logger)
+    points = explore_platform_sweep(identified,
+                                    logger,
+                                    core_counts=args.cores,
+                                    slot_counts=args.slots,
+                                    mzn_solver=args.mzn_solver,
+                                    workers=args.workers)
+    if args.report:
+        sweep.write_sweep_report(args.report, points)
+        logger.info(f'Sweep report written to {args.report}')
+    if not points:
+        sys.exit(1)
+
+
+_subcommands = {'serve': serve_entry, 'submit': submit_entry, 'batch': batch_entry, 'sweep': sweep_entry}
+
+
+def cli_entry():
+    if len(sys.argv) > 1 and sys.argv[1] in _subcommands:
+        return _subcommands[sys.argv[1]](sys.argv[2:])
+    parser = argparse.ArgumentParser(description=description,
+                                     epilog="Use 'idesyde serve' and 'idesyde submit' to run jobs "
+                                     "through a long running DSE service, 'idesyde batch' "
+                                     "to explore many models in one go and 'idesyde sweep' to "
+                                     "explore one on many platforms.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    _add_job_arguments(parser)
+    _add_verbosity_argument(parser)
+    parser.add_argument('--mzn-log',
+                        type=str,
+                        default='minizinc-python.log',
+                        help='''
+                        File where the minizinc library debug log is written.
+                        Pass an empty string to disable it.
+
+                        Default is minizinc-python.log.
+                        ''')
+    parser.add_argument('--profile',
+                        type=str,
+                        help='''
+                        Write the wall time, CPU time and peak memory of every
+                        phase of the flow, and the peak memory of the run, to
+                        this file. The report is in the
+                        folded stacks format used by flamegraph tools if the file
+                        ends in .folded, and JSON otherwise.
+                        ''')
+    parser.add_argument('--profile-cprofile',
+                        type=str,
+                        help='''
+                        Directory where a cProfile dump of each top level phase
+                        of the flow is written.
+                        ''')
+    args = parser.parse_args()
+    logger = _create_logger(args.verbosity)
+    logger.debug('Arguments parsed')
+    if args.mzn_log:
+        logging.basicConfig(filename=args.mzn_log, level=logging.DEBUG)
+    from idesyde.pipeline import run_pipeline
+    from idesyde.profiling import PhaseProfiler
+    profiler = PhaseProfiler(cprofile_dir=args.profile_cprofile)\
+        if args.profile or args.profile_cprofile else None
+    try:
+        run_pipeline(args.model,
+                     outputs=[i[0] for i in args.output] if args.output else [],
+                     desired_names=[i[0] for i in args.decision_model] if args.decision_model else [],
+                     mzn_solver=args.mzn_solver,
+                     logger=logger,
+                     profiler=profiler,
+                     use_snapshot=args.snapshot,
+                     incremental=args.incremental,
+                     explorer_names=[i[0] for i in args.explorer] if args.explorer else [],
+                     pareto_points=args.pareto,
+                     checkpoint_path=args.checkpoint,
+                     resume_path=args.resume,
+                     report_path=args.exploration_report)
+    except ValueError as e:
+        # requests the flow cannot honour, such as an explorer running out of memory
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        if profiler:
+            for record in profiler.records.values():
+                if len(record.path) == 1:
+                    logger.info(f'Phase {record.path[0]} took {record.wall:.3f}s wall, {record.cpu:.3f}s CPU')
+        if args.profile:
+            profiler.write(args.profile)
+            logger.info(f'Profiling report written to {args.profile}')
     logging.info('Done')
 
 
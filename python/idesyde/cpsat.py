@@ -0,0 +1,218 @@
+'''CP-SAT model of the SDF to MPSoC decision model
+
+The decision model is built directly as an OR-Tools CP-SAT model from its
+matrices, with the same variables as 'sdf_mpsoc_linear_dmodel.mzn', so
+that its solutions are rebuilt into ForSyDe models the same way:
+
+    mapped_actors[a, p, t]: firings of actor 'a' in step 't' of core 'p'.
+    buffer_start[c, p, t]: tokens of channel 'c' on core 'p' before step 't'.
+    send_start, send_duration[c, p, pp, t, tt, u]: transfer of the tokens
+        of 'c' from step 't' of 'p' to step 'tt' of 'pp' through 'u'.
+
+The steps of a core are interval variables that do not overlap, and the
+transfers are optional interval variables, present when tokens flow,
+which share the slots of every TDMA element through a cumulative
+constraint. Transfers go through the elements of their path in order,
+after the step that produces the tokens and before the one consuming
+them. The throughput objective is the largest load of a core or of an
+element per slot, and the latency objective is the end of the last step.
+
+CP-SAT runs a portfolio of search workers in parallel, so it uses all
+cores of the machine, which the MiniZinc backends do not.
+'''
+import datetime
+import os
+import time
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def cpsat_size(decision_model: SDFToMultiCoreCharacterized) -> int:
+    '''Estimate the number of variables of the CP-SAT model, which grows with the possible transfers'''
+    mpsoc = decision_model.sdf_mpsoc_sub
+    sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+    (c, p, s) = (len(sdf_exec.sdf_channels), len(mpsoc.cores), mpsoc.max_steps)
+    hops = int(np.count_nonzero(mpsoc.comms_path))
+    return len(sdf_exec.sdf_actors) * p * s + 4 * p * s + 2 * c * p * s + c * (p * p + hops) * s * s * 4
+
+
+class _SolutionTimes(cp_model.CpSolverSolutionCallback):
+    '''Keeps the time and objective of every solution found'''
+
+    def __init__(self):
+        super().__init__()
+        self.start = time.perf_counter()
+        self.solutions: List[Tuple[float, Optional[float]]] = []
+
+    def on_solution_callback(self):
+        self.solutions.append((time.perf_counter() - self.start, self.ObjectiveValue()))
+
+
+class SDFMPSoCModel(object):
+    '''CP-SAT model of a characterized SDF to MPSoC decision model
+
+    The model is built from the MiniZinc data of the decision model, so
+    that it shares its deduced bounds and warm start mapping.
+    '''
+
+    def __init__(self, decision_model: SDFToMultiCoreCharacterized):
+        data = decision_model.get_mzn_data()
+        self.model = cp_model.CpModel()
+        m = self.model
+        wcet = np.array(data['wcet'], dtype=int)
+        topology = np.array(data['sdf_topology'], dtype=int)
+        token_wcct = np.array(data['token_wcct'], dtype=int)
+        path = np.array(data['path'], dtype=int)
+        activations = [int(a) for a in data['activations']]
+        max_tokens = [int(t) for t in data['max_tokens']]
+        capacity = [int(k) for k in data['comms_capacity']]
+        (num_actors, num_procs) = wcet.shape
+        (num_channels, num_comms) = token_wcct.shape
+        num_steps = int(data['max_steps'])
+        self.shape = (num_actors, num_channels, num_procs, num_comms, num_steps)
+        steps = range(num_steps)
+        horizon = int(np.sum(np.array(activations).reshape((-1, 1)) * wcet)) + sum(
+            max_tokens[c] * int(np.sum(token_wcct[c])) for c in range(num_channels)) * num_procs * num_steps * num_steps
+        # mapping and steps
+        self.mapped = {(a, p, t): m.NewIntVar(0, activations[a] if wcet[a, p] > 0 else 0, f'mapped_{a}_{p}_{t}')
+                       for a in range(num_actors) for p in range(num_procs) for t in steps}
+        for a in range(num_actors):
+            m.Add(sum(self.mapped[a, p, t] for p in range(num_procs) for t in steps) == activations[a])
+        self.start = {(p, t): m.NewIntVar(0, horizon, f'start_{p}_{t}') for p in range(num_procs) for t in steps}
+        self.end = {(p, t): m.NewIntVar(0, horizon, f'end_{p}_{t}') for p in range(num_procs) for t in steps}
+        busy = {(p, t): m.NewIntVar(0, int(data['max_busy'][p]), f'busy_{p}_{t}')
+                for p in range(num_procs) for t in steps}
+        for p in range(num_procs):
+            for t in steps:
+                m.Add(busy[p, t] == sum(int(wcet[a, p]) * self.mapped[a, p, t] for a in range(num_actors)))
+                if t > 0:
+                    m.Add(self.end[p, t - 1] <= self.start[p, t])
+            m.AddNoOverlap(
+                [m.NewIntervalVar(self.start[p, t], busy[p, t], self.end[p, t], f'step_{p}_{t}') for t in steps])
+        # token flows between steps, only to the next step within a core
+        # and only between cores with a path between them
+        hops = {(p, pp): [int(u) for u in sorted(np.nonzero(path[p, pp])[0], key=lambda u: path[p, pp, u])]
+                for p in range(num_procs) for pp in range(num_procs)}
+        self.flow: Dict[Tuple[int, ...], Any] = dict()
+        inflow: Dict[Tuple[int, int, int], List[Any]] = defaultdict(list)
+        outflow: Dict[Tuple[int, int, int], List[Any]] = defaultdict(list)
+        for c in range(num_channels):
+            for (p, pp) in hops:
+                for t in steps:
+                    for tt in steps:
+                        if (p == pp and tt == t + 1) or (p != pp and hops[p, pp]):
+                            f = m.NewIntVar(0, max_tokens[c], f'flow_{c}_{p}_{pp}_{t}_{tt}')
+                            self.flow[c, p, pp, t, tt] = f
+                            outflow[c, p, t].append(f)
+                            inflow[c, pp, tt].append(f)
+        self.buffer_start = dict()
+        for c in range(num_channels):
+            for p in range(num_procs):
+                for t in steps:
+                    self.buffer_start[c, p, t] = m.NewIntVar(0, max_tokens[c], f'buffer_start_{c}_{p}_{t}')
+                    m.Add(self.buffer_start[c, p, t] == sum(inflow[c, p, t]))
+                    firings = sum(int(topology[c, a]) * self.mapped[a, p, t] for a in range(num_actors))
+                    m.Add(self.buffer_start[c, p, t] + firings == sum(outflow[c, p, t]))
+                    m.Add(sum(outflow[c, p, t]) <= max_tokens[c])
+            m.Add(sum(self.buffer_start[c, p, 0] for p in range(num_procs)) >= int(data['initial_tokens'][c]))
+        # transfers through the elements of the paths, sharing their slots
+        self.sends: Dict[Tuple[int, ...], Tuple[Any, Any]] = dict()
+        transfers: List[List[Any]] = [[] for _ in range(num_comms)]
+        durations: List[List[Any]] = [[] for _ in range(num_comms)]
+        for ((c, p, pp, t, tt), f) in self.flow.items():
+            if p == pp:
+                continue
+            present = m.NewBoolVar(f'present_{c}_{p}_{pp}_{t}_{tt}')
+            m.Add(f >= 1).OnlyEnforceIf(present)
+            m.Add(f == 0).OnlyEnforceIf(present.Not())
+            previous = self.end[p, t]
+            for u in hops[p, pp]:
+                start = m.NewIntVar(0, horizon, f'send_start_{c}_{p}_{pp}_{t}_{tt}_{u}')
+                duration = m.NewIntVar(0, max_tokens[c] * int(token_wcct[c, u]),
+                                       f'send_duration_{c}_{p}_{pp}_{t}_{tt}_{u}')
+                end = m.NewIntVar(0, horizon, f'send_end_{c}_{p}_{pp}_{t}_{tt}_{u}')
+                m.Add(duration == int(token_wcct[c, u]) * f)
+                m.Add(start >= previous).OnlyEnforceIf(present)
+                m.Add(start == 0).OnlyEnforceIf(present.Not())
+                transfers[u].append(
+                    m.NewOptionalIntervalVar(start, duration, end, present, f'send_{c}_{p}_{pp}_{t}_{tt}_{u}'))
+                durations[u].append(duration)
+                self.sends[c, p, pp, t, tt, u] = (start, duration)
+                previous = end
+            m.Add(self.start[pp, tt] >= previous).OnlyEnforceIf(present)
+        for u in range(num_comms):
+            if transfers[u]:
+                m.AddCumulative(transfers[u], [1] * len(transfers[u]), capacity[u])
+        # objectives
+        self.throughput = m.NewIntVar(0, horizon, 'throughput')
+        self.latency = m.NewIntVar(0, horizon, 'latency')
+        for p in range(num_procs):
+            m.Add(self.throughput >= sum(busy[p, t] for t in steps))
+        for u in range(num_comms):
+            if durations[u]:
+                m.Add(self.throughput * max(capacity[u], 1) >= sum(durations[u]))
+        m.AddMaxEquality(self.latency, [self.end[p, num_steps - 1] for p in range(num_procs)])
+        weights = [int(w) for w in data['objective_weights']]
+        if any(weights):
+            m.Minimize(weights[0] * self.throughput + weights[1] * self.latency)
+        # start from the same mapping as the MiniZinc model
+        for ((a, p, t), v) in self.mapped.items():
+            m.AddHint(v, int(data['warm_mapped_actors'][a][p][t]))
+
+    def solve(self,
+              time_limit: Optional[datetime.timedelta] = None,
+              workers: Optional[int] = None,
+              seed: int = 0) -> Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]:
+        '''Solve the model with 'workers' parallel workers, or one per CPU
+
+        Returns:
+            The status name, the solution in the shape of the MiniZinc
+            results or None if none was found, and the solver statistics
+            with the time and objective of every solution.
+        '''
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = workers or os.cpu_count() or 1
+        solver.parameters.random_seed = seed
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit.total_seconds()
+        times = _SolutionTimes()
+        status = solver.Solve(self.model, times)
+        statistics = {
+            'solveTime': solver.WallTime(),
+            'workers': solver.parameters.num_workers,
+            'conflicts': solver.NumConflicts(),
+            'branches': solver.NumBranches(),
+            'solutions': times.solutions
+        }
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return (solver.StatusName(status), None, statistics)
+        statistics['objectiveBound'] = solver.BestObjectiveBound()
+        (num_actors, num_channels, num_procs, num_comms, num_steps) = self.shape
+        send_start = np.zeros((num_channels, num_procs, num_procs, num_steps, num_steps, num_comms), dtype=int)
+        send_duration = np.zeros_like(send_start)
+        for (key, (start, duration)) in self.sends.items():
+            send_start[key] = solver.Value(start)
+            send_duration[key] = solver.Value(duration)
+        results = {
+            'mapped_actors': [[[solver.Value(self.mapped[a, p, t]) for t in range(num_steps)]
+                               for p in range(num_procs)]
+                              for a in range(num_actors)],
+            'buffer_start': [[[solver.Value(self.buffer_start[c, p, t]) for t in range(num_steps)]
+                              for p in range(num_procs)]
+                             for c in range(num_channels)],
+            'send_start': send_start.tolist(),
+            'send_duration': send_duration.tolist(),
+            'start': [[solver.Value(self.start[p, t]) for t in range(num_steps)] for p in range(num_procs)],
+            'objective_values': [solver.Value(self.throughput), solver.Value(self.latency)],
+            'objective': solver.ObjectiveValue()
+        }
+        return (solver.StatusName(status), results, statistics)
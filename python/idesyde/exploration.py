@@ -1,22 +1,48 @@
 import abc
 import asyncio
-import logging
+import datetime
+import functools
 import importlib.resources as res
+import itertools
+import math
+import random
+import time
+from types import SimpleNamespace
+from dataclasses import dataclass
+from dataclasses import field
 from enum import Flag, auto
+from typing import Any
+from typing import Dict
+from typing import Iterable
 from typing import Optional
 from typing import Set
 from typing import Tuple
 from typing import List
 
+import networkx as nx
+import numpy as np
 from forsyde.io.python.api import ForSyDeModel
 from minizinc import Model
 from minizinc import Solver
 from minizinc import Instance
+from minizinc import Result
+from minizinc import Status
 
 from idesyde.identification.interfaces import DecisionModel
 from idesyde.identification.interfaces import MinizincableDecisionModel
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.identification import decomposition
+from idesyde.identification import flatsize
+from idesyde import checkpoint
+from idesyde.checkpoint import CHECKPOINT_INTERVAL
+from idesyde.checkpoint import Checkpoint
+from idesyde.profiling import phase
 
-logging.basicConfig(filename="minizinc-python.log", level=logging.DEBUG)
+# mapping variables, i.e. actors, cores and steps, from which the LP relaxation
+# of the MILP explorer pays off over the CP search of the other explorers
+MILP_FASTER_MAPPINGS = 200
 
 
 class ExplorerCriteria(Flag):
@@ -58,7 +84,6 @@ class Explorer(abc.ABC):
     async def explore(self, decision_model: DecisionModel) -> Optional[ForSyDeModel]:
         return None
 
-    @abc.abstractmethod
     def dominates(self, other: "Explorer", decision_model: DecisionModel) -> Tuple[int, int]:
         '''Get comparison information regarding efficiency and completude
 
@@ -72,13 +97,206 @@ class Explorer(abc.ABC):
             indicates that 'other' is 50 "percent" more efficient but
             it is 75 "percent" less complete than 'self'. That is, it would
             be a less accurate but faster choice.
+
+            The efficiency is only whether 'self' is ranked above 'other'
+            by 'explorer_priority', and the completude is not compared.
         '''
-        return (0, 0)
+        return (explorer_priority(self, decision_model) > explorer_priority(other, decision_model), False)
 
     def short_name(self) -> str:
         return str(self.__class__.__name__)
 
 
+@dataclass
+class PresolveReport(object):
+    '''Outcome of screening a decision model before solving it
+
+    Arguments:
+        objective_lower_bounds: Bounds for the 'objective' array of the
+            MiniZinc model, or None if none were found.
+        utilisation_bound: Least load of the busiest core, from the
+            fastest execution of every firing spread over all cores.
+        critical_path_bound: Least time of the longest chain of
+            dependencies without initial tokens in one iteration.
+        communication_bound: Least time to send the tokens of the channel
+            whose actors can never share a core, directly or relayed by
+            other cores.
+    '''
+    feasible: bool = True
+    reasons: List[str] = field(default_factory=list)
+    objective_lower_bounds: Optional[List[int]] = None
+    utilisation_bound: int = 0
+    critical_path_bound: int = 0
+    communication_bound: int = 0
+
+    def mzn_overrides(self) -> Dict[str, Any]:
+        '''Get the MiniZinc data replaced by the bounds found'''
+        if self.objective_lower_bounds is None:
+            return dict()
+        return {'objective_lower_bounds': list(self.objective_lower_bounds)}
+
+
+def presolve(decision_model: DecisionModel) -> PresolveReport:
+    '''Screen a decision model with analytic bounds before it goes to a solver
+
+    Only 'SDFToMultiCoreCharacterized' is screened. It is infeasible if an
+    actor has no core with a non-zero WCET, if the fastest firings do not
+    fit in the load allowed for the cores, or if a channel must cross
+    cores that cannot reach each other, neither by a path nor by relaying
+    the tokens through the buffers of other cores.
+
+    The utilisation bound is a sound bound on the throughput objective of
+    the linear MiniZinc model, and is the one given back as MiniZinc data.
+    That model does not time the dependencies inside a step, so the
+    critical path and communication bounds are only reported.
+    '''
+    if not isinstance(decision_model, SDFToMultiCoreCharacterized):
+        return PresolveReport()
+    mpsoc = decision_model.sdf_mpsoc_sub
+    sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+    report = PresolveReport()
+    wcet = np.asarray(decision_model.wcet, dtype=int)
+    repetitions = sdf_exec.sdf_repetition_vector.reshape(-1).astype(int)
+    usable = wcet > 0
+    for a in np.nonzero(~usable.any(axis=1))[0]:
+        report.reasons.append(f'Actor {sdf_exec.sdf_actors[a].identifier} has no core with a non-zero WCET')
+    fastest = np.min(np.where(usable, wcet, np.iinfo(wcet.dtype).max), axis=1, initial=np.iinfo(wcet.dtype).max)
+    fastest = np.where(usable.any(axis=1), fastest, 0)
+    work = int(np.sum(repetitions * fastest))
+    # the load of a core is at most the sum of its WCETs in the MiniZinc model
+    capacity = int(np.sum(wcet))
+    if work > capacity:
+        report.reasons.append(f'The fastest firings take {work} but the cores can take at most {capacity}')
+    report.utilisation_bound = max(math.ceil(work / max(len(mpsoc.cores), 1)), int(np.max(fastest, initial=0)))
+    # longest chain of same iteration dependencies, with the fastest firing of each actor
+    dag = nx.DiGraph()
+    dag.add_nodes_from(range(len(sdf_exec.sdf_actors)))
+    delays = None
+    connected = np.any(mpsoc.comms_path > 0, axis=2)
+    for (c, row) in enumerate(sdf_exec.sdf_topology):
+        s = int(np.nonzero(row > 0)[0][0])
+        t = int(np.nonzero(row < 0)[0][0])
+        if int(np.asarray(sdf_exec.sdf_initial_tokens).reshape(-1)[c]) == 0:
+            dag.add_edge(s, t)
+        if (usable[s] & usable[t]).any() or not usable[s].any() or not usable[t].any():
+            continue
+        if delays is None:
+            delays = decision_model.comm_delays()
+        # tokens can be relayed by the buffers of other cores, so the
+        # fastest crossing is the shortest path through all cores
+        sends = np.where(connected, delays[c], np.inf)
+        np.fill_diagonal(sends, 0)
+        for k in range(len(mpsoc.cores)):
+            sends = np.minimum(sends, sends[:, k:k + 1] + sends[k:k + 1, :])
+        crossing = np.min(sends[np.ix_(usable[s], usable[t])])
+        if not np.isfinite(crossing):
+            report.reasons.append(f'Channel {sdf_exec.sdf_channels[c][0].identifier} -> '
+                                  f'{sdf_exec.sdf_channels[c][1].identifier} crosses unreachable cores')
+            continue
+        report.communication_bound = max(report.communication_bound, int(math.ceil(crossing)))
+    try:
+        finish = np.zeros(len(sdf_exec.sdf_actors), dtype=int)
+        for a in nx.topological_sort(dag):
+            finish[a] += fastest[a]
+            for b in dag.successors(a):
+                finish[b] = max(finish[b], finish[a])
+        report.critical_path_bound = int(np.max(finish, initial=0))
+    except nx.NetworkXUnfeasible:
+        report.reasons.append('The SDF application deadlocks')
+    report.feasible = len(report.reasons) == 0
+    report.objective_lower_bounds = [report.utilisation_bound, 0]
+    return report
+
+
+# statistics of MiniZinc and its solvers that tell flattening, propagation and search apart
+REPORT_STATISTICS = ('flatTime', 'flatIntVars', 'flatBoolVars', 'flatIntConstraints', 'flatBoolConstraints',
+                     'solveTime', 'nodes', 'failures', 'restarts', 'peakDepth', 'objectiveBound')
+
+
+@dataclass
+class ExplorationReport(object):
+    '''Statistics and convergence of one MiniZinc exploration
+
+    Arguments:
+        mzn_model: MiniZinc formulation solved.
+        wall_time: Seconds from the start of the solver to its end.
+        solutions: Seconds from the start of the solver to every
+            solution found, with its objective, so that the objective
+            over time can be plotted.
+        statistics: Every statistic reported by MiniZinc and the solver,
+            such as the flattening time, the flattened variables and
+            constraints, nodes, failures and restarts.
+    '''
+    decision_model: str
+    mzn_model: str
+    solver: str
+    status: str = 'UNKNOWN'
+    objective: Optional[float] = None
+    wall_time: float = 0.0
+    solutions: List[Tuple[float, Optional[float]]] = field(default_factory=list)
+    statistics: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def time_to_first_solution(self) -> Optional[float]:
+        return self.solutions[0][0] if self.solutions else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'decision_model': self.decision_model,
+            'mzn_model': self.mzn_model,
+            'solver': self.solver,
+            'status': self.status,
+            'objective': self.objective,
+            'wall_time_s': self.wall_time,
+            'time_to_first_solution_s': self.time_to_first_solution,
+            'solutions': [{'time_s': t, 'objective': o} for (t, o) in self.solutions],
+            'statistics': {k: v.total_seconds() if hasattr(v, 'total_seconds') else v
+                           for (k, v) in self.statistics.items()}
+        }
+
+    def summary(self) -> str:
+        '''Get the outcome and the main statistics in one line'''
+        statistics = self.to_dict()['statistics']
+        first = self.time_to_first_solution
+        parts = [f'{self.status} in {self.wall_time:.3f}s', f'{len(self.solutions)} solution(s)']
+        parts += [f'first after {first:.3f}s'] if first is not None else []
+        parts += [f'{k} {statistics[k]}' for k in REPORT_STATISTICS if k in statistics]
+        return ', '.join(parts)
+
+
+@dataclass
+class ExplorationResult(Result):
+    '''MiniZinc result with the report of the exploration that found it'''
+    report: Optional[ExplorationReport] = None
+
+
+def fits_flattening(decision_model: DecisionModel) -> bool:
+    '''Whether the estimated flattened size of 'decision_model' is within 'flatsize.flat_constraint_limit()' '''
+    size = flatsize.estimate_flat_size(decision_model)
+    return size is None or size.constraints <= flatsize.flat_constraint_limit()
+
+
+@functools.lru_cache(maxsize=None)
+def _mzn_model(mzn_model_name: str) -> Model:
+    # instances copy the model, and the interface that minizinc analyses
+    # for the first one is kept in it for the rest of the process
+    mzn_model = Model()
+    mzn_model.add_string(res.read_text('idesyde.minizinc', mzn_model_name))
+    return mzn_model
+
+
+@functools.lru_cache(maxsize=None)
+def _mzn_solver(backend_solver_name: str) -> Solver:
+    return Solver.lookup(backend_solver_name)
+
+
+def _mzn_instance(decision_model: MinizincableDecisionModel, backend_solver_name: str,
+                  overrides: Dict[str, Any]) -> Instance:
+    instance = Instance(_mzn_solver(backend_solver_name), _mzn_model(decision_model.get_mzn_model_name()))
+    decision_model.populate_mzn_model(instance, overrides)
+    return instance
+
+
 class MinizincExplorer(Explorer):
 
     @classmethod
@@ -86,26 +304,599 @@ class MinizincExplorer(Explorer):
         return True
 
     def can_explore(self, decision_model):
-        return isinstance(decision_model, MinizincableDecisionModel)
+        return isinstance(decision_model, MinizincableDecisionModel) and fits_flattening(decision_model)
+
+    def explore(self,
+                decision_model,
+                backend_solver_name='gecode',
+                profiler=None,
+                checkpoint_path=None,
+                resume=None,
+                outcome=None):
+        return asyncio.run(
+            self.explore_async(decision_model,
+                               backend_solver_name,
+                               profiler=profiler,
+                               checkpoint_path=checkpoint_path,
+                               resume=resume,
+                               outcome=outcome))
+
+    async def explore_async(self,
+                            decision_model,
+                            backend_solver_name='gecode',
+                            profiler=None,
+                            checkpoint_path=None,
+                            resume=None,
+                            outcome: Optional[Dict[str, Any]] = None):
+        '''Explore 'decision_model' and rebuild the ForSyDe model of its best solution
+
+        Arguments:
+            outcome: If given, the 'status' and 'objective' of the
+                solution and the 'report' of the exploration are put into
+                it, for reports of many explorations.
+        '''
+        result = await self.solve_async(decision_model,
+                                        backend_solver_name,
+                                        profiler=profiler,
+                                        checkpoint_path=checkpoint_path,
+                                        resume=resume)
+        if outcome is not None:
+            outcome['status'] = result.status.name if result is not None else 'UNSATISFIABLE'
+            outcome['objective'] = result.objective if result is not None else None
+            outcome['report'] = result.report if result is not None else None
+        if result is None or not result.status.has_solution():
+            return None
+        with phase(profiler, 'rebuild'):
+            return decision_model.rebuild_forsyde_model(result)
+
+    async def solve_async(self,
+                          decision_model,
+                          backend_solver_name='gecode',
+                          profiler=None,
+                          checkpoint_path: Optional[str] = None,
+                          resume: Optional[Checkpoint] = None):
+        '''Solve the MiniZinc model of 'decision_model' and return the MiniZinc result
+
+        Arguments:
+            checkpoint_path: File where the best solution so far is kept,
+                rewritten at most every 'CHECKPOINT_INTERVAL' and at the end.
+            resume: Checkpoint of an earlier exploration of the same
+                decision model, whose solution is the warm start and has
+                to be strictly improved. If no better solution is found,
+                that solution is the result.
+
+        Returns:
+            The MiniZinc result, with the report of the exploration, or
+            None if presolving shows that the decision model is infeasible.
+        '''
+        with phase(profiler, 'presolve'):
+            report = presolve(decision_model)
+        if not report.feasible:
+            return None
+        overrides = report.mzn_overrides()
+        if resume is not None:
+            if not resume.matches(decision_model):
+                raise ValueError(f'The checkpoint was taken for another {resume.decision_model}')
+            if resume.objective is None:
+                raise ValueError(f'The checkpoint of {resume.decision_model} has no objective to improve on')
+            overrides.update(checkpoint.resume_data(resume))
+        with phase(profiler, 'build_data'):
+            instance = _mzn_instance(decision_model, backend_solver_name, overrides)
+            if resume is not None:
+                instance.add_string(checkpoint.improvement_constraint(resume))
+        with phase(profiler, 'solve'):
+            result = await self._solve(decision_model, instance, backend_solver_name, checkpoint_path, resume)
+            # flattening happens inside the solve call, so its share
+            # can only be recovered from the statistics minizinc reports
+            if profiler and 'flatTime' in result.statistics:
+                profiler.record('flatten', result.statistics['flatTime'].total_seconds())
+        return result
+
+    async def _solve(self, decision_model, instance, backend_solver_name, checkpoint_path, resume):
+        report = ExplorationReport(decision_model.short_name(), decision_model.get_mzn_model_name(),
+                                   backend_solver_name)
+        (best, status, written) = (None, Status.UNKNOWN, None)
+
+        def write(result):
+            bound = report.statistics.get('objectiveBound', None)
+            objective = result.objective
+            if objective is None and resume is not None:
+                objective = resume.objective
+            checkpoint.write_checkpoint(
+                checkpoint_path,
+                checkpoint.make_checkpoint(decision_model,
+                                           backend_solver_name,
+                                           result,
+                                           objective=objective,
+                                           bound=int(bound) if bound is not None else None,
+                                           config={'mzn_model': decision_model.get_mzn_model_name()}))
+
+        flags = _mzn_solver(backend_solver_name).stdFlags
+        start = time.perf_counter()
+        async for result in instance.solutions(intermediate_solutions='-i' in flags or '-a' in flags):
+            # every result only carries the statistics reported since the previous one
+            report.statistics.update(result.statistics)
+            status = result.status
+            if result.solution is not None:
+                best = result
+                report.solutions.append((time.perf_counter() - start, result.objective))
+                if checkpoint_path and (written is None or datetime.datetime.now() - written >= CHECKPOINT_INTERVAL):
+                    write(best)
+                    written = datetime.datetime.now()
+        report.wall_time = time.perf_counter() - start
+        if best is None and resume is not None:
+            # nothing better was found, so the checkpoint stays the best solution
+            solution = SimpleNamespace(**resume.solution, objective=resume.objective)
+            status = Status.OPTIMAL_SOLUTION if status == Status.UNSATISFIABLE else Status.SATISFIED
+            best = Result(status, solution, dict())
+        if checkpoint_path and best is not None:
+            write(best)
+        (report.status, report.objective) = (status.name, best.objective if best is not None else None)
+        return ExplorationResult(status, best.solution if best is not None else None, report.statistics, report)
+
+
+class ComponentsParallelExplorer(Explorer):
+    '''Explore every disjoint SDF application on its own, in parallel
+
+    The decision model is split with 'decomposition.split_by_components',
+    every part is solved by its own MiniZinc process and the schedules
+    are composed one after the other. This is not complete, since the
+    applications never share steps, so it is only chosen when asked for
+    by name.
+    '''
+
+    @classmethod
+    def is_complete(cls):
+        return False
+
+    def can_explore(self, decision_model):
+        # the parts are flattened separately, so they may fit when the whole does not
+        return isinstance(decision_model, (SDFToMultiCore, SDFToMultiCoreCharacterized))\
+            and len(decomposition.components_of(decision_model)) > 1\
+            and all(fits_flattening(p) for p in decomposition.split_by_components(decision_model))
+
+    def explore(self, decision_model, backend_solver_name='gecode', profiler=None):
+        return asyncio.run(self.explore_async(decision_model, backend_solver_name, profiler=profiler))
+
+    async def explore_async(self, decision_model, backend_solver_name='gecode', profiler=None):
+        with phase(profiler, 'split'):
+            parts = decomposition.split_by_components(decision_model)
+        solver = MinizincExplorer()
+        with phase(profiler, 'solve'):
+            # the parts run concurrently, so their phases cannot be nested in the profiler
+            results = await asyncio.gather(*(solver.solve_async(p, backend_solver_name) for p in parts))
+        if not all(r is not None and r.status.has_solution() for r in results):
+            return None
+        with phase(profiler, 'rebuild'):
+            composed = decomposition.compose_results(decision_model, parts, results)
+            return decomposition.composed_model(decision_model, parts).rebuild_forsyde_model(composed)
+
+
+@dataclass
+class ParetoPoint(object):
+    '''A point of the Pareto front of throughput and latency, with the objective values of the MiniZinc model'''
+    throughput: int
+    latency: int
+    model: Optional[ForSyDeModel] = None
+
+    def dominates(self, other: "ParetoPoint") -> bool:
+        return self.throughput <= other.throughput and self.latency <= other.latency\
+            and (self.throughput, self.latency) != (other.throughput, other.latency)
+
+
+def non_dominated(points: List[ParetoPoint]) -> List[ParetoPoint]:
+    '''Keep one point of every non-dominated pair of objective values, sorted by throughput'''
+    front: Dict[Tuple[int, int], ParetoPoint] = dict()
+    for p in points:
+        if not any(o.dominates(p) for o in points):
+            front.setdefault((p.throughput, p.latency), p)
+    return [front[k] for k in sorted(front)]
+
+
+def pareto_table(points: List[ParetoPoint]) -> str:
+    '''Get a summary table of a Pareto front, one point per line'''
+    lines = [f'{"point":>6} {"throughput":>12} {"latency":>12}']
+    lines += [f'{i:>6} {p.throughput:>12} {p.latency:>12}' for (i, p) in enumerate(points)]
+    return '\n'.join(lines)
+
+
+class ParetoExplorer(Explorer):
+    '''Explore the Pareto front of the throughput and latency objectives of the MPSoC model
+
+    Every point minimizes the throughput objective, then the latency,
+    with the latency constrained below a bound (epsilon constraint).
+    By default the bound is swept from the unconstrained optimum down,
+    each point below the latency of the previous one, on branches of
+    the same instance. With 'points' set, the bounds are spread between
+    the extremes of the front instead and solved in parallel processes,
+    which is faster but may miss points. Since it is only asked for
+    when a front is wanted, it is only chosen by name.
+    '''
+
+    @classmethod
+    def is_complete(cls):
+        return False
+
+    def can_explore(self, decision_model):
+        return isinstance(decision_model, SDFToMultiCoreCharacterized) and fits_flattening(decision_model)
 
-    def explore(self, decision_model, backend_solver_name='gecode'):
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.explore_async(decision_model, backend_solver_name))
+    def explore(self, decision_model, backend_solver_name='gecode', profiler=None):
+        '''Get the point of the front that is best for the objective weights of the decision model'''
+        front = self.explore_front(decision_model, backend_solver_name, profiler=profiler)
+        if not front:
+            return None
+        weights = (decision_model.throughput_importance, decision_model.latency_importance)
+        return min(front, key=lambda p: weights[0] * p.throughput + weights[1] * p.latency).model
 
-    async def explore_async(self, decision_model, backend_solver_name='gecode'):
-        mzn_model_name = decision_model.get_mzn_model_name()
-        mzn_model_str = res.read_text('idesyde.minizinc', mzn_model_name)
-        mzn_model = Model()
-        mzn_model.add_string(mzn_model_str)
-        backend_solver = Solver.lookup(backend_solver_name)
-        instance = Instance(backend_solver, mzn_model)
-        decision_model.populate_mzn_model(instance)
-        result = await instance.solve_async()
-        return decision_model.rebuild_forsyde_model(result)
+    def explore_front(self, decision_model, backend_solver_name='gecode', profiler=None,
+                      points=0) -> List[ParetoPoint]:
+        return asyncio.run(self.explore_front_async(decision_model, backend_solver_name, profiler, points))
 
-    def dominates(self, other, decision_model):
-        # leave it as a default complete method for now
-        return (True, False)
+    async def explore_front_async(self, decision_model, backend_solver_name='gecode', profiler=None,
+                                  points=0) -> List[ParetoPoint]:
+        '''Get the non-dominated points of the front, sorted by throughput'''
+        with phase(profiler, 'presolve'):
+            report = presolve(decision_model)
+        if not report.feasible:
+            return []
+        upper_bounds = decision_model.get_mzn_data()['objective_upper_bounds']
+        # weights making the objectives lexicographic, throughput first or latency first
+        by_throughput = {**report.mzn_overrides(), 'objective_weights': [upper_bounds[1] + 1, 1]}
+        by_latency = {**report.mzn_overrides(), 'objective_weights': [1, upper_bounds[0] + 1]}
+        with phase(profiler, 'solve'):
+            if points > 0:
+                found = await self._grid(decision_model, backend_solver_name, by_throughput, by_latency, points)
+            else:
+                found = await self._sweep(decision_model, backend_solver_name, by_throughput)
+        with phase(profiler, 'rebuild'):
+            results = {id(p): r for (p, r) in found}
+            front = non_dominated([p for (p, _) in found])
+            for p in front:
+                p.model = decision_model.rebuild_forsyde_model(results[id(p)])
+        return front
+
+    async def _solve_point(self, instance, latency_bound=None):
+        with instance.branch() as child:
+            if latency_bound is not None:
+                child.add_string(f'constraint objective[LATENCY] <= {latency_bound};\n')
+            result = await child.solve_async()
+        if result is None or not result.status.has_solution():
+            return None
+        (throughput_value, latency_value) = list(result['objective_values'])
+        # only the points in the front are rebuilt, so the result is kept with the point
+        return (ParetoPoint(throughput=int(throughput_value), latency=int(latency_value)), result)
+
+    async def _sweep(self, decision_model, backend_solver_name, overrides):
+        instance = _mzn_instance(decision_model, backend_solver_name, overrides)
+        found = []
+        solved = await self._solve_point(instance)
+        while solved is not None:
+            found.append(solved)
+            latency = solved[0].latency
+            solved = await self._solve_point(instance, latency - 1) if latency > 0 else None
+        return found
+
+    async def _grid(self, decision_model, backend_solver_name, by_throughput, by_latency, points):
+        extremes = await asyncio.gather(
+            self._solve_point(_mzn_instance(decision_model, backend_solver_name, by_throughput)),
+            self._solve_point(_mzn_instance(decision_model, backend_solver_name, by_latency)))
+        found = [e for e in extremes if e is not None]
+        if len(found) < 2:
+            return found
+        (highest, lowest) = (found[0][0].latency, found[1][0].latency)
+        bounds = sorted(set(np.linspace(lowest, highest, points + 2).astype(int).tolist()))
+        # every bound gets its own instance, and thus its own solver process
+        instances = [_mzn_instance(decision_model, backend_solver_name, by_throughput) for _ in bounds[1:-1]]
+        found += await asyncio.gather(*(self._solve_point(i, b) for (i, b) in zip(instances, bounds[1:-1])))
+        return [e for e in found if e is not None]
+
+
+LNS_NEIGHBOURHOODS = ('core', 'channel', 'random')
+
+
+def lns_neighbourhood(kind: str, mapped_actors: np.ndarray, sdf_topology: np.ndarray, rng: random.Random,
+                      fraction: float = 0.2) -> Tuple[Set[int], Set[int]]:
+    '''Choose the actors and cores released from an incumbent mapping
+
+    Arguments:
+        kind: 'core' releases the actors of two cores, 'channel' the two
+            actors of a channel, and 'random' a 'fraction' of all actors.
+            The actors can move between their cores and one more core.
+        mapped_actors: Incumbent array '(actors, cores, steps)'.
+
+    Returns:
+        The indexes of the released actors and of the released cores.
+    '''
+    (num_actors, num_cores) = mapped_actors.shape[:2]
+    on_core = mapped_actors.sum(axis=2) > 0
+    if kind == 'core':
+        cores = set(rng.sample(range(num_cores), min(2, num_cores)))
+        actors = set(np.nonzero(on_core[:, sorted(cores)].any(axis=1))[0].tolist())
+    else:
+        if kind == 'channel' and sdf_topology.shape[0] > 0:
+            actors = set(np.nonzero(sdf_topology[rng.randrange(sdf_topology.shape[0])])[0].tolist())
+        else:
+            actors = set(rng.sample(range(num_actors), max(1, int(round(fraction * num_actors)))))
+        cores = set(np.nonzero(on_core[sorted(actors)].any(axis=0))[0].tolist())
+    cores.add(rng.randrange(num_cores))
+    return (actors, cores)
+
+
+def _mzn_array(values: Iterable[Any]) -> str:
+    return '[' + ', '.join(str(v).lower() if isinstance(v, bool) else str(v) for v in values) + ']'
+
+
+def lns_constraints(mapped_actors: np.ndarray, start: np.ndarray, actors: Set[int], cores: Set[int],
+                    bound: int) -> str:
+    '''Get the MiniZinc constraints fixing an incumbent outside of a neighbourhood
+
+    Mappings are fixed unless both the actor and the core are released,
+    starts are fixed in the cores not released, and the weighted
+    objective must be below 'bound'.
+    '''
+    released = np.zeros(mapped_actors.shape[:2], dtype=bool)
+    released[np.ix_(sorted(actors), sorted(cores))] = True
+    fixed_start = [p not in cores for p in range(start.shape[0])]
+    return '''
+array[sdf_actors, procs] of bool: lns_fixed = array2d(sdf_actors, procs, {fixed});
+array[sdf_actors, procs, steps] of int: lns_mapped = array3d(sdf_actors, procs, steps, {mapped});
+array[procs] of bool: lns_fixed_start = {fixed_start};
+array[procs, steps] of int: lns_start = array2d(procs, steps, {start});
+constraint forall(a in sdf_actors, p in procs, t in steps where lns_fixed[a, p]) (
+  mapped_actors[a, p, t] = lns_mapped[a, p, t]
+);
+constraint forall(p in procs, t in steps where lns_fixed_start[p]) (
+  start[p, t] = lns_start[p, t]
+);
+constraint sum(o in objectives) (objective_weights[o] * objective[o]) < {bound};
+'''.format(fixed=_mzn_array((~released).reshape(-1).tolist()),
+           mapped=_mzn_array(mapped_actors.reshape(-1).tolist()),
+           fixed_start=_mzn_array(fixed_start),
+           start=_mzn_array(start.reshape(-1).tolist()),
+           bound=bound)
+
+
+class LNSExplorer(Explorer):
+    '''Improve a first solution of the MPSoC model by large neighbourhood search
+
+    The first solution found within the time limit is the incumbent.
+    Then, in every round, each worker releases a neighbourhood of the
+    incumbent, i.e. a few actors and cores, fixes the rest and solves for
+    a better objective within the time limit, on a branch of its own
+    instance of the model. Workers run concurrently and the best
+    improvement of the round becomes the incumbent. The kinds of
+    neighbourhood are taken in turns.
+
+    This is not complete, so it is only chosen by name.
+    '''
+
+    def __init__(self,
+                 rounds: int = 20,
+                 workers: int = 4,
+                 time_limit: datetime.timedelta = datetime.timedelta(seconds=10),
+                 fraction: float = 0.2,
+                 seed: int = 0):
+        self.rounds = rounds
+        self.workers = workers
+        self.time_limit = time_limit
+        self.fraction = fraction
+        self.seed = seed
+
+    @classmethod
+    def is_complete(cls):
+        return False
+
+    def can_explore(self, decision_model):
+        # neighbourhoods only fix variables, so the whole model is still flattened
+        return isinstance(decision_model, SDFToMultiCoreCharacterized) and fits_flattening(decision_model)
+
+    def explore(self, decision_model, backend_solver_name='gecode', profiler=None):
+        return asyncio.run(self.explore_async(decision_model, backend_solver_name, profiler=profiler))
+
+    async def explore_async(self, decision_model, backend_solver_name='gecode', profiler=None):
+        with phase(profiler, 'presolve'):
+            report = presolve(decision_model)
+        if not report.feasible:
+            return None
+        with phase(profiler, 'build_data'):
+            instances = [
+                _mzn_instance(decision_model, backend_solver_name, report.mzn_overrides()) for _ in range(self.workers)
+            ]
+        weights = np.array([decision_model.throughput_importance, decision_model.latency_importance])
+        rng = random.Random(self.seed)
+        sdf_topology = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_topology
+        with phase(profiler, 'solve'):
+            incumbent = await instances[0].solve_async(time_limit=self.time_limit)
+            if incumbent is None or not incumbent.status.has_solution():
+                return None
+            value = int(weights @ np.array(incumbent['objective_values']))
+            kinds = itertools.cycle(LNS_NEIGHBOURHOODS)
+            for _ in range(self.rounds):
+                mapped = np.array(incumbent['mapped_actors'], dtype=int)
+                start = np.array(incumbent['start'], dtype=int)
+                neighbourhoods = [
+                    lns_neighbourhood(next(kinds), mapped, sdf_topology, rng, self.fraction) for _ in instances
+                ]
+                results = await asyncio.gather(*(self._improve(i, lns_constraints(mapped, start, a, c, value))
+                                                 for (i, (a, c)) in zip(instances, neighbourhoods)))
+                improved = [(int(weights @ np.array(r['objective_values'])), k, r) for (k, r) in enumerate(results)
+                            if r is not None]
+                if improved:
+                    (value, _, incumbent) = min(improved)
+        with phase(profiler, 'rebuild'):
+            return decision_model.rebuild_forsyde_model(incumbent)
+
+    async def _improve(self, instance, constraints):
+        with instance.branch() as child:
+            child.add_string(constraints)
+            result = await child.solve_async(time_limit=self.time_limit)
+        return result if result is not None and result.status.has_solution() else None
+
+
+class CPSATExplorer(Explorer):
+    '''Solve the MPSoC model with the CP-SAT solver of OR-Tools
+
+    The model is built directly from the matrices of the decision model,
+    see 'idesyde.cpsat', so nothing is flattened and decision models too
+    large for MiniZinc can still be solved whole, and CP-SAT searches
+    with all cores of the machine. OR-Tools is optional, so this explorer
+    only takes decision models when it is installed.
+
+    This is not complete, since it stops at its time limit and its model
+    leaves out the space-time cut of the MiniZinc one, so MiniZinc is
+    still chosen when it can take the decision model, but it is chosen
+    over the explorers that split or only improve solutions.
+    '''
+
+    def __init__(self,
+                 time_limit: Optional[datetime.timedelta] = datetime.timedelta(minutes=5),
+                 workers: int = 0,
+                 seed: int = 0):
+        self.time_limit = time_limit
+        self.workers = workers
+        self.seed = seed
+
+    @classmethod
+    def is_complete(cls):
+        return False
+
+    def can_explore(self, decision_model):
+        if not isinstance(decision_model, SDFToMultiCoreCharacterized):
+            return False
+        try:
+            from idesyde import cpsat
+        except ImportError:
+            return False
+        return cpsat.cpsat_size(decision_model) <= flatsize.flat_constraint_limit()
+
+    def explore(self, decision_model, backend_solver_name=None, profiler=None, outcome=None):
+        '''Solve 'decision_model' with 'workers' parallel workers, or one per CPU
+
+        Arguments:
+            backend_solver_name: Ignored, CP-SAT is the only solver.
+            outcome: If given, the 'status', 'objective' and 'report' of
+                the exploration are set in it.
+        '''
+        from idesyde import cpsat
+        with phase(profiler, 'presolve'):
+            presolved = presolve(decision_model)
+        if not presolved.feasible:
+            if outcome is not None:
+                outcome.update(status='UNSATISFIABLE', objective=None, report=None)
+            return None
+        with phase(profiler, 'build_data'):
+            model = cpsat.SDFMPSoCModel(decision_model)
+        with phase(profiler, 'solve'):
+            (status, results, statistics) = model.solve(self.time_limit, self.workers, self.seed)
+        report = ExplorationReport(decision_model.short_name(),
+                                   'cp-sat',
+                                   'cp-sat',
+                                   status=status,
+                                   objective=results['objective'] if results is not None else None,
+                                   wall_time=statistics['solveTime'],
+                                   solutions=statistics.pop('solutions'),
+                                   statistics=statistics)
+        if outcome is not None:
+            outcome.update(status=report.status, objective=report.objective, report=report)
+        if results is None:
+            return None
+        with phase(profiler, 'rebuild'):
+            return decision_model.rebuild_forsyde_model(results)
+
+
+class MILPExplorer(Explorer):
+    '''Solve the linear decision models as MILPs with SciPy and HiGHS
+
+    The models are built directly from the matrices of the decision models
+    as sparse MILPs, see 'idesyde.milp', and solved in process. SciPy is
+    optional, so this explorer only takes decision models when it is
+    installed.
+
+    The LP relaxation routes the tokens and balances the loads of the
+    cores well, so this explorer is likely faster than the CP solvers for
+    throughput dominated objectives, or no objective at all, on decision
+    models with many mapping variables. The timing of the transfers is
+    only bounded by big-M constraints, and their sharing of the TDMA
+    slots is scheduled after solving, so it is not complete for latency.
+    '''
+
+    def __init__(self, time_limit: Optional[datetime.timedelta] = datetime.timedelta(minutes=5)):
+        self.time_limit = time_limit
+
+    @classmethod
+    def is_complete(cls):
+        return False
+
+    def can_explore(self, decision_model):
+        if not isinstance(decision_model, (SDFToOrders, SDFToMultiCoreCharacterized)):
+            return False
+        try:
+            from idesyde import milp
+        except ImportError:
+            return False
+        return milp.milp_size(decision_model) <= flatsize.flat_constraint_limit()
+
+    def likely_faster(self, decision_model: DecisionModel) -> bool:
+        '''Whether 'decision_model' is large enough, and its objective throughput dominated, for MILP to pay off'''
+        if not isinstance(decision_model, SDFToMultiCoreCharacterized):
+            return False
+        mpsoc = decision_model.sdf_mpsoc_sub
+        mappings = len(mpsoc.sdf_orders_sub.sdf_exec_sub.sdf_actors) * len(mpsoc.cores) * mpsoc.max_steps
+        (throughput, latency) = (decision_model.throughput_importance, decision_model.latency_importance)
+        return (latency == 0 or throughput > latency) and mappings >= MILP_FASTER_MAPPINGS
+
+    def explore(self, decision_model, backend_solver_name=None, profiler=None, outcome=None):
+        '''Solve 'decision_model' with HiGHS
+
+        Arguments:
+            backend_solver_name: Ignored, HiGHS is the only solver.
+            outcome: If given, the 'status', 'objective' and 'report' of
+                the exploration are set in it.
+        '''
+        from idesyde import milp
+        if isinstance(decision_model, SDFToMultiCoreCharacterized):
+            with phase(profiler, 'presolve'):
+                presolved = presolve(decision_model)
+            if not presolved.feasible:
+                if outcome is not None:
+                    outcome.update(status='UNSATISFIABLE', objective=None, report=None)
+                return None
+            with phase(profiler, 'solve'):
+                (status, results, statistics) = milp.solve_mpsoc(decision_model, self.time_limit)
+        else:
+            with phase(profiler, 'solve'):
+                (status, results, statistics) = milp.solve_orders(decision_model, self.time_limit)
+        report = ExplorationReport(decision_model.short_name(),
+                                   'milp',
+                                   'highs',
+                                   status=status,
+                                   objective=results['objective'] if results is not None else None,
+                                   wall_time=statistics['solveTime'],
+                                   solutions=statistics.pop('solutions'),
+                                   statistics=statistics)
+        if outcome is not None:
+            outcome.update(status=report.status, objective=report.objective, report=report)
+        if results is None:
+            return None
+        with phase(profiler, 'rebuild'):
+            return decision_model.rebuild_forsyde_model(results)
+
+
+def explorer_priority(explorer: Explorer, decision_model: DecisionModel) -> int:
+    '''Rank of 'explorer' among those that can take 'decision_model', the highest being chosen
+
+    MILP comes first when it is likely faster. Otherwise the complete
+    explorers come first, then CP-SAT and then MILP, which stop at their
+    time limits. The explorers that split the decision model or only
+    improve solutions come last, so they run only when asked for by name.
+    '''
+    if isinstance(explorer, MILPExplorer):
+        return 4 if explorer.likely_faster(decision_model) else 1
+    if explorer.is_complete():
+        return 3
+    if isinstance(explorer, CPSATExplorer):
+        return 2
+    return 0
 
 
 def _get_standard_explorers() -> Set[Explorer]:
@@ -114,19 +905,38 @@ def _get_standard_explorers() -> Set[Explorer]:
 
 def choose_explorer(decision_models: List[DecisionModel],
                     explorers: Set[Explorer] = _get_standard_explorers(),
-                    criteria: ExplorerCriteria = ExplorerCriteria.COMPLETE) -> List[Tuple[Explorer, DecisionModel]]:
+                    criteria: ExplorerCriteria = ExplorerCriteria.COMPLETE,
+                    desired_names: List[str] = []) -> List[Tuple[Explorer, DecisionModel]]:
+    '''Choose the explorers of the decision models that no other explorer dominates
+
+    Explorers that solve a MiniZinc model refuse decision models whose
+    flattened model is estimated to be too large, so that another explorer,
+    e.g. one exploring smaller parts, is chosen instead.
+
+    Raises:
+        ValueError: If no explorer is chosen and some decision model is
+            too large to flatten, with its estimated size.
+    '''
+    if desired_names:
+        explorers = set(e for e in explorers if e.short_name() in desired_names)
+    chosen: List[Tuple[Explorer, DecisionModel]] = []
     if criteria & ExplorerCriteria.COMPLETE:
-        dominant = [(e, m) for e in explorers for m in decision_models if e.can_explore(m)]
-        length = len(dominant)
-        length_before = None
-        while length != length_before:
-            length_before = length
-            dominant = [
-                (e, m) for (e, m) in dominant
-                # keep only the (e,m) that are not dominates by anyone else for m.
-                # [0] comes from the fact that we look only at completude
-                if not any(o.dominates(e, m)[0] for (o, om) in dominant if m == om and o != e)
-            ]
-            length = len(dominant)
-        return dominant
-    return []
+        explorers_for: Dict[DecisionModel, List[Explorer]] = dict()
+        for m in decision_models:
+            if m not in explorers_for:
+                explorers_for[m] = [e for e in explorers if e.can_explore(m)]
+        # keep only the (e,m) that are not dominated by anyone else for m.
+        # [0] comes from the fact that we look only at completude.
+        # Anything dominated by a dominated explorer is also dominated
+        # by the explorer dominating that one, so a single pass suffices.
+        chosen = [(e, m) for (m, candidates) in explorers_for.items() for e in candidates
+                  if not any(o.dominates(e, m)[0] for o in candidates if o != e)]
+    if not chosen:
+        too_large = [m for m in decision_models if not fits_flattening(m)]
+        if too_large:
+            sizes = '; '.join(f'{m.short_name()} would flatten to about {flatsize.estimate_flat_size(m)}'
+                              for m in too_large)
+            raise ValueError(f'No explorer can take the decision model(s) without running out of memory: {sizes}. '
+                             f'The limit is {flatsize.flat_constraint_limit():,} constraints, which '
+                             'IDESYDE_MAX_FLAT_CONSTRAINTS overrides.')
+    return chosen
@@ -4,11 +4,21 @@ from enum import Flag
 from enum import auto
 from typing import Set
 from typing import List
+from typing import Optional
+from typing import Tuple
 
 import idesyde.identification.rules as ident_rules
 from forsyde.io.python.api import ForSyDeModel
+from idesyde.profiling import PhaseProfiler
+from idesyde.profiling import phase
 from idesyde.identification.interfaces import DecisionModel
 from idesyde.identification.interfaces import IdentificationRule
+from idesyde.identification.compact import VertexTable
+from idesyde.identification.compact import CompactDecisionModel
+from idesyde.identification.compact import compact_decision_model
+from idesyde.identification.compact import expand_decision_model
+from idesyde.identification.compact import expand_decision_models
+from idesyde.identification.dominance import non_dominated
 
 
 class ChoiceCriteria(Flag):
@@ -26,8 +36,9 @@ def _get_standard_rules() -> List[IdentificationRule]:
     return list(r_class() for r_class in ident_rules._standard_rules_classes)
 
 
-def identify_decision_models(
-    model: ForSyDeModel, rules: List[IdentificationRule] = _get_standard_rules()) -> List[DecisionModel]:
+def identify_decision_models(model: ForSyDeModel,
+                             rules: List[IdentificationRule] = _get_standard_rules(),
+                             profiler: Optional[PhaseProfiler] = None) -> List[DecisionModel]:
     '''
     This function runs the Design Space Identification scheme,
     as presented in paper [DSI-DATE'2021], so that problems can
@@ -36,13 +47,16 @@ def identify_decision_models(
     If the argument **problems** is not passed,
     the API uses all subclasses found during runtime that implement
     the interfaces DecisionModel and Explorer.
+
+    If a **profiler** is passed, every rule invocation is accounted
+    as a phase named after the rule.
     '''
     max_iterations = len(model) * len(rules)
     allowed_rules = [r for r in rules]
     identified: List[DecisionModel] = []
     iterations = 0
     while len(allowed_rules) > 0 and iterations < max_iterations:
-        trials = ((r, r.identify(model, identified)) for r in allowed_rules)
+        trials = ((r, _identify_with_profiling(r, model, identified, profiler)) for r in allowed_rules)
         for (r, (fixed, subprob)) in trials:
             # join with the identified
             if subprob:
@@ -54,6 +68,12 @@ def identify_decision_models(
     return identified
 
 
+def _identify_with_profiling(rule: IdentificationRule, model: ForSyDeModel, identified: List[DecisionModel],
+                             profiler: Optional[PhaseProfiler]):
+    with phase(profiler, rule.short_name()):
+        return rule.identify(model, identified)
+
+
 def identify_decision_models_parallel(model: ForSyDeModel,
                                       rules: List[IdentificationRule] = _get_standard_rules(),
                                       concurrent_idents: int = os.cpu_count() or 1) -> List[DecisionModel]:
@@ -67,22 +87,30 @@ def identify_decision_models_parallel(model: ForSyDeModel,
     If the argument **problems** is not passed,
     the API uses all subclasses found during runtime that implement
     the interfaces DecisionModel and Explorer.
+
+    The model is sent to each worker process only once, when it starts,
+    and decision models travel between processes in their compact form.
     '''
     max_iterations = len(model) * len(rules)
     allowed_rules = [r for r in rules]
     identified: List[DecisionModel] = []
+    compacts: List[CompactDecisionModel] = []
+    table = VertexTable.from_model(model)
     iterations = 0
-    with concurrent.futures.ProcessPoolExecutor(max_workers=concurrent_idents) as executor:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=concurrent_idents,
+                                                initializer=_init_identification_worker,
+                                                initargs=(model, )) as executor:
         while len(allowed_rules) > 0 and iterations < max_iterations:
             # generate all trials and keep track of which subproblem
             # made the trial
-            futures = {r: executor.submit(r.identify, model, identified) for r in allowed_rules}
+            futures = {r: executor.submit(_identify_in_worker, r, compacts) for r in allowed_rules}
             concurrent.futures.wait(futures.values())
             for r in futures:
-                (fixed, subprob) = futures[r].result()
+                (fixed, compact) = futures[r].result()
                 # join with the identified
-                if subprob:
-                    identified.append(subprob)
+                if compact:
+                    identified.append(expand_decision_model(compact, table, identified))
+                    compacts.append(compact)
                 # take away candidates at fixpoint
                 if fixed:
                     allowed_rules.remove(r)
@@ -90,6 +118,27 @@ def identify_decision_models_parallel(model: ForSyDeModel,
         return identified
 
 
+# state of each identification worker process, set once when it starts
+_worker_model: Optional[ForSyDeModel] = None
+_worker_table: Optional[VertexTable] = None
+_worker_identified: List[DecisionModel] = []
+
+
+def _init_identification_worker(model: ForSyDeModel) -> None:
+    global _worker_model, _worker_table, _worker_identified
+    _worker_model = model
+    _worker_table = VertexTable.from_model(model)
+    _worker_identified = []
+
+
+def _identify_in_worker(rule: IdentificationRule,
+                        compacts: List[CompactDecisionModel]) -> Tuple[bool, Optional[CompactDecisionModel]]:
+    # identified models only grow, so only the ones this worker has not seen yet are expanded
+    identified = expand_decision_models(compacts, _worker_table, _worker_identified)
+    (fixed, subprob) = rule.identify(_worker_model, identified)
+    return (fixed, compact_decision_model(subprob, _worker_table, identified) if subprob else None)
+
+
 def choose_decision_models(models: List[DecisionModel],
                            criteria: ChoiceCriteria = ChoiceCriteria.DOMINANCE,
                            desired_names: List[str] = []) -> List[DecisionModel]:
@@ -110,12 +159,7 @@ def choose_decision_models(models: List[DecisionModel],
     if desired_names:
         models = [m for m in models if m.short_name() in desired_names]
     if criteria & ChoiceCriteria.DOMINANCE:
-        non_dominated = [m for m in models]
-        for m in models:
-            for other in models:
-                if m in non_dominated and m != other and other.dominates(m):
-                    non_dominated.remove(m)
-        return non_dominated
+        return non_dominated(models)
     else:
         return models
 
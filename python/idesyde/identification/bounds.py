@@ -0,0 +1,66 @@
+'''Bounds of the variables of the MPSoC MiniZinc model, deduced from its data
+
+The MiniZinc model declares its variables with domains made of sums and
+products of maxima of the data, which are far larger than what its own
+constraints allow. Large domains grow the flattened model and weaken the
+propagation of the solver, so the bounds implied by the constraints are
+computed here from the data and given back as data arrays, which the
+model uses both as domains and as constraints.
+
+The bounds are implied by the constraints of the model, with one
+exception: send durations over elements outside the path of a pair of
+cores are fixed to zero. No constraint sets them otherwise, and they
+only appear in the timing of the sends and in the cumulative constraint
+of their element, where a zero duration never violates what a larger one
+satisfies, so every solution of the model still has a zero duration
+counterpart with the same objectives.
+
+Only the busy times and the send durations are bounded per core and per
+element. A core can wait for the tokens of slower cores, so its starts
+and its throughput are not bounded by its own WCETs, only by the caps of
+the model on the objectives, which are the same for every core.
+
+Restricting the firings of each core to its first steps is not done
+here: the steps are ordered by the busy time of the later step, so
+moving firings to earlier empty steps can change the timing of a
+solution, and such a dominance restriction would cut off solutions.
+Neither are horizons taken from a heuristic schedule nor buffers bounded
+by the tokens along a PASS, as the model does not time its steps like a
+real schedule and other schedules need more tokens.
+'''
+from typing import Any
+from typing import Dict
+
+import numpy as np
+
+
+def mpsoc_bounds(data: Dict[str, Any]) -> Dict[str, Any]:
+    '''Deduce the bounds of the MPSoC model from the data of 'sdf_mpsoc_linear_dmodel.mzn'
+
+    Returns:
+        The data arrays with the bounds, namely
+
+            max_busy: Busy time of each core in any step, bounded both
+                by all firings it can run and by the throughput cap.
+            start_horizon: Latest start of a step in any core.
+            send_horizon: Longest time to send a channel through a
+                communication element, when all its tokens cross it.
+            objective_upper_bounds: Largest value of each objective.
+    '''
+    wcet = np.array(data['wcet'], dtype=int).reshape((len(data['sdf_actors']), len(data['procs'])))
+    activations = np.array(data['activations'], dtype=int).reshape(-1)
+    token_wcct = np.array(data['token_wcct'], dtype=int).reshape((len(data['sdf_channels']), len(data['comms'])))
+    max_tokens = np.array(data['max_tokens'], dtype=int).reshape(-1)
+    # the model caps the throughput by the sum of all WCETs, and the latency by twice that
+    throughput_cap = int(np.sum(wcet))
+    max_busy = np.minimum(np.sum(activations.reshape((-1, 1)) * wcet, axis=0), throughput_cap)
+    # the last step of a core starts early enough to end within the latency cap
+    start_horizon = min(2 * throughput_cap, throughput_cap + int(np.sum(token_wcct)))
+    send_horizon = token_wcct * max_tokens.reshape((-1, 1))
+    objective_upper_bounds = [throughput_cap, min(2 * throughput_cap, start_horizon + int(np.max(max_busy, initial=0)))]
+    return {
+        'max_busy': max_busy.tolist(),
+        'start_horizon': start_horizon,
+        'send_horizon': send_horizon.tolist(),
+        'objective_upper_bounds': objective_upper_bounds
+    }
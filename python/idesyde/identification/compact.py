@@ -0,0 +1,235 @@
+'''Compact, integer indexed representation of decision models
+
+Decision models reference the vertexes of the input model directly, so
+pickling one of them, as done when identification runs in worker
+processes, drags along every vertex it covers with all its ports and
+properties. Here the vertexes are replaced by their positions in a
+'VertexTable' built once per input model and shared by every decision
+model, the channel-like lists of '(source, target, path)' are
+stored as CSR arrays and mostly zero matrices in coordinate form. Nested decision models that were already
+identified are stored as a reference to their position in the
+identified list instead of a copy.
+
+Deduced properties are not kept; they are recomputed when expanding,
+which is cheap compared to identification.
+'''
+import dataclasses
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
+
+from idesyde.identification.interfaces import DecisionModel
+
+
+class VertexTable(object):
+    '''Bidirectional map between the vertexes of a model and integer indexes
+
+    The indexes follow the iteration order of the model, so that two
+    processes holding copies of the same model build the same table.
+    '''
+    __slots__ = ('vertexes', 'indexes')
+
+    def __init__(self, vertexes: Iterable[Vertex]):
+        self.vertexes: List[Vertex] = list(vertexes)
+        self.indexes: Dict[Vertex, int] = {v: i for (i, v) in enumerate(self.vertexes)}
+
+    @classmethod
+    def from_model(cls, model: ForSyDeModel) -> "VertexTable":
+        return cls(model.nodes)
+
+    def __len__(self):
+        return len(self.vertexes)
+
+    def index_dtype(self) -> np.dtype:
+        return np.dtype(np.int32) if len(self.vertexes) < 2**31 else np.dtype(np.int64)
+
+    def encode(self, vertexes: Iterable[Vertex]) -> np.ndarray:
+        return np.fromiter((self.indexes[v] for v in vertexes), dtype=self.index_dtype())
+
+    def decode(self, indexes: Iterable[int]) -> List[Vertex]:
+        return [self.vertexes[i] for i in indexes]
+
+
+class CSRPaths(object):
+    '''Paths between pairs of vertexes in compressed sparse row form
+
+    Path 'i' goes from 'sources[i]' to 'targets[i]' through the
+    vertexes 'members[offsets[i]:offsets[i + 1]]'.
+    '''
+    __slots__ = ('sources', 'targets', 'offsets', 'members')
+
+    def __init__(self, sources: np.ndarray, targets: np.ndarray, offsets: np.ndarray, members: np.ndarray):
+        self.sources = sources
+        self.targets = targets
+        self.offsets = offsets
+        self.members = members
+
+    @classmethod
+    def encode(cls, paths: Sequence[Tuple[Vertex, Vertex, Sequence[Vertex]]], table: VertexTable) -> "CSRPaths":
+        offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for (_, _, p) in paths], dtype=np.int64)
+        return cls(sources=table.encode(s for (s, _, _) in paths),
+                   targets=table.encode(t for (_, t, _) in paths),
+                   offsets=offsets,
+                   members=table.encode(v for (_, _, p) in paths for v in p))
+
+    def decode(self, table: VertexTable) -> List[Tuple[Vertex, Vertex, List[Vertex]]]:
+        return [(table.vertexes[self.sources[i]], table.vertexes[self.targets[i]], table.decode(self.path(i)))
+                for i in range(len(self))]
+
+    def path(self, i: int) -> np.ndarray:
+        return self.members[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.sources)
+
+    def nbytes(self) -> int:
+        return self.sources.nbytes + self.targets.nbytes + self.offsets.nbytes + self.members.nbytes
+
+
+# kinds of encoded fields
+_VERTEX = 'v'
+_VERTEXES = 'vs'
+_PATHS = 'csr'
+_REFERENCE = 'ref'
+_NESTED = 'dm'
+_SPARSE = 'sp'
+_VALUE = 'val'
+
+
+class SparseArray(object):
+    '''Coordinate form of a mostly zero matrix, such as an SDF topology'''
+    __slots__ = ('shape', 'dtype', 'coords', 'values')
+
+    # only matrices with at most this fraction of nonzeros are stored sparse
+    max_density = 0.125
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, coords: np.ndarray, values: np.ndarray):
+        self.shape = shape
+        self.dtype = dtype
+        self.coords = coords
+        self.values = values
+
+    @classmethod
+    def encode(cls, array: np.ndarray) -> "SparseArray":
+        coords = np.nonzero(array)
+        index_dtype = np.int32 if max(array.shape, default=0) < 2**31 else np.int64
+        return cls(shape=array.shape,
+                   dtype=array.dtype,
+                   coords=np.array(coords, dtype=index_dtype),
+                   values=array[coords])
+
+    def decode(self) -> np.ndarray:
+        array = np.zeros(self.shape, dtype=self.dtype)
+        array[tuple(self.coords)] = self.values
+        return array
+
+
+class CompactDecisionModel(object):
+    '''A decision model with its vertexes replaced by 'VertexTable' indexes
+
+    Arguments:
+        model_class: Class of the original decision model.
+        encoded: For every dataclass field of the original decision
+            model, a tuple with the kind of encoding and the encoded value.
+    '''
+    __slots__ = ('model_class', 'encoded')
+
+    def __init__(self, model_class: type, encoded: Dict[str, Tuple[str, Any]]):
+        self.model_class = model_class
+        self.encoded = encoded
+
+    def short_name(self) -> str:
+        return self.model_class.__name__
+
+
+def _is_path_list(value: Sequence[Any]) -> bool:
+    return all(
+        isinstance(e, tuple) and len(e) == 3 and isinstance(e[0], Vertex) and isinstance(e[1], Vertex)
+        and isinstance(e[2], (list, tuple)) and all(isinstance(v, Vertex) for v in e[2]) for e in value)
+
+
+def _encode_value(value: Any, table: VertexTable, identified: Sequence[DecisionModel]) -> Tuple[str, Any]:
+    if isinstance(value, Vertex):
+        return (_VERTEX, table.indexes[value])
+    if isinstance(value, DecisionModel):
+        for (i, m) in enumerate(identified):
+            if m is value:
+                return (_REFERENCE, i)
+        return (_NESTED, compact_decision_model(value, table, identified))
+    if isinstance(value, np.ndarray) and value.ndim > 1 and value.size > 0\
+            and np.count_nonzero(value) <= SparseArray.max_density * value.size:
+        return (_SPARSE, SparseArray.encode(value))
+    if isinstance(value, list) and len(value) > 0:
+        if all(isinstance(v, Vertex) for v in value):
+            return (_VERTEXES, table.encode(value))
+        if _is_path_list(value):
+            return (_PATHS, CSRPaths.encode(value, table))
+    return (_VALUE, value)
+
+
+def _decode_value(kind: str, value: Any, table: VertexTable, identified: Sequence[DecisionModel]) -> Any:
+    if kind == _VERTEX:
+        return table.vertexes[value]
+    if kind == _VERTEXES:
+        return table.decode(value)
+    if kind == _PATHS:
+        return value.decode(table)
+    if kind == _SPARSE:
+        return value.decode()
+    if kind == _REFERENCE:
+        return identified[value]
+    if kind == _NESTED:
+        return expand_decision_model(value, table, identified)
+    return value
+
+
+def compact_decision_model(decision_model: DecisionModel,
+                           table: VertexTable,
+                           identified: Sequence[DecisionModel] = []) -> CompactDecisionModel:
+    '''Encode a decision model against a vertex table
+
+    Arguments:
+        table: Table built from the model the decision model was identified in.
+        identified: Decision models that nested ones may be references to.
+            They must be passed in the same order when expanding.
+    '''
+    encoded = {
+        f.name: _encode_value(getattr(decision_model, f.name), table, identified)
+        for f in dataclasses.fields(decision_model)
+    }
+    return CompactDecisionModel(model_class=decision_model.__class__, encoded=encoded)
+
+
+def expand_decision_model(compact: CompactDecisionModel,
+                          table: VertexTable,
+                          identified: Sequence[DecisionModel] = []) -> DecisionModel:
+    '''Decode a decision model and recompute its deduced properties'''
+    decision_model = compact.model_class(
+        **{name: _decode_value(kind, value, table, identified)
+           for (name, (kind, value)) in compact.encoded.items()})
+    decision_model.compute_deduced_properties()
+    return decision_model
+
+
+def compact_decision_models(decision_models: Sequence[DecisionModel], table: VertexTable) -> List[CompactDecisionModel]:
+    '''Encode a list of decision models, where later ones may reference earlier ones'''
+    return [compact_decision_model(m, table, decision_models[:i]) for (i, m) in enumerate(decision_models)]
+
+
+def expand_decision_models(compacts: Sequence[CompactDecisionModel],
+                           table: VertexTable,
+                           identified: Optional[List[DecisionModel]] = None) -> List[DecisionModel]:
+    '''Decode a list encoded by 'compact_decision_models', appending to 'identified' if given'''
+    identified = [] if identified is None else identified
+    for compact in compacts[len(identified):]:
+        identified.append(expand_decision_model(compact, table, identified))
+    return identified
@@ -0,0 +1,153 @@
+'''Decomposition of decision models with disjoint SDF applications
+
+Independent applications sharing a platform are identified as a single
+decision model, whose MiniZinc instance grows with the number of
+applications and the combined number of steps. Since the applications
+only interact through the platform resources, each one can be explored
+on its own with the whole platform, and the schedules composed afterwards
+by running the steps of one application after the steps of the previous
+one on every core. The composition is always feasible, but not
+necessarily optimal, since applications do not share steps.
+'''
+import copy
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+SDFMultiCoreModel = Union[SDFToMultiCore, SDFToMultiCoreCharacterized]
+
+
+def _mpsoc(decision_model: SDFMultiCoreModel) -> SDFToMultiCore:
+    if isinstance(decision_model, SDFToMultiCoreCharacterized):
+        return decision_model.sdf_mpsoc_sub
+    return decision_model
+
+
+def components_of(decision_model: SDFMultiCoreModel) -> List[List[int]]:
+    '''Get the actor indexes of every disjoint SDF application of the decision model'''
+    return _mpsoc(decision_model).sdf_orders_sub.sdf_exec_sub.sdf_components
+
+
+def _channels_of(sdf_exec: SDFExecution, component: Sequence[int]) -> List[int]:
+    actors = set(sdf_exec.sdf_actors[a] for a in component)
+    return [cidx for (cidx, (s, _, _)) in enumerate(sdf_exec.sdf_channels) if s in actors]
+
+
+def split_sdf_execution(sdf_exec: SDFExecution, component: Sequence[int]) -> SDFExecution:
+    '''Restrict an SDF execution to one of its connected components
+
+    The PASS of the component is the global PASS without the firings of
+    the other components, which is still admissible since they share no
+    channels.
+    '''
+    rows = _channels_of(sdf_exec, component)
+    actors = [sdf_exec.sdf_actors[a] for a in component]
+    channels = [sdf_exec.sdf_channels[c] for c in rows]
+    in_paths = set(v for (_, _, p) in channels for v in p)
+    actors_set = set(actors)
+    res = SDFExecution(sdf_actors=actors,
+                       sdf_delays=[d for d in sdf_exec.sdf_delays if d in in_paths],
+                       sdf_channels=channels,
+                       sdf_topology=sdf_exec.sdf_topology[np.ix_(rows, component)],
+                       sdf_repetition_vector=sdf_exec.sdf_repetition_vector.reshape((-1, 1))[component, :],
+                       sdf_initial_tokens=np.asarray(sdf_exec.sdf_initial_tokens)[rows],
+                       sdf_pass=[a for a in sdf_exec.sdf_pass if a in actors_set])
+    res.compute_deduced_properties()
+    return res
+
+
+def split_by_components(decision_model: SDFMultiCoreModel) -> List[SDFMultiCoreModel]:
+    '''Split a decision model into one decision model per disjoint SDF application
+
+    Every part keeps the whole platform and its orderings. A decision
+    model with a single application is returned as the only part.
+    '''
+    components = components_of(decision_model)
+    if len(components) <= 1:
+        return [decision_model]
+    mpsoc = _mpsoc(decision_model)
+    sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+    parts: List[SDFMultiCoreModel] = []
+    for component in components:
+        rows = _channels_of(sdf_exec, component)
+        orders = SDFToOrders(sdf_exec_sub=split_sdf_execution(sdf_exec, component),
+                             orderings=mpsoc.sdf_orders_sub.orderings)
+        orders.compute_deduced_properties()
+        part = SDFToMultiCore(sdf_orders_sub=orders,
+                              cores=mpsoc.cores,
+                              comms=mpsoc.comms,
+                              connections=mpsoc.connections,
+                              comms_capacity=mpsoc.comms_capacity,
+                              comms_path=mpsoc.comms_path)
+        part.compute_deduced_properties()
+        if isinstance(decision_model, SDFToMultiCoreCharacterized):
+            part = SDFToMultiCoreCharacterized(sdf_mpsoc_sub=part,
+                                               wcet_vertexes=decision_model.wcet_vertexes,
+                                               token_wcct_vertexes=decision_model.token_wcct_vertexes,
+                                               goals_vertexes=decision_model.goals_vertexes,
+                                               wcet=decision_model.wcet[component, :],
+                                               token_wcct=decision_model.token_wcct[rows, :],
+                                               throughput_importance=decision_model.throughput_importance,
+                                               latency_importance=decision_model.latency_importance)
+            part.compute_deduced_properties()
+        parts.append(part)
+    return parts
+
+
+def compose_results(decision_model: SDFMultiCoreModel, parts: Sequence[SDFMultiCoreModel],
+                    results: Sequence[Any]) -> Dict[str, Any]:
+    '''Compose the exploration results of the parts made by 'split_by_components'
+
+    The steps of each part are placed after the steps of the previous
+    parts, so the composed results span the steps of all parts.
+
+    Arguments:
+        results: Results of each part, in the shape returned by the
+            MiniZinc models, i.e. anything indexable by variable name.
+
+    Returns:
+        The composed results, to be rebuilt with 'composed_model'.
+    '''
+    mpsoc = _mpsoc(decision_model)
+    sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+    (num_actors, num_channels) = (len(sdf_exec.sdf_actors), len(sdf_exec.sdf_channels))
+    (num_cores, num_comms) = (len(mpsoc.cores), len(mpsoc.comms))
+    steps = sum(_mpsoc(p).max_steps for p in parts)
+    mapped_actors = np.zeros((num_actors, num_cores, steps), dtype=int)
+    buffer_start = np.zeros((num_channels, num_cores, steps), dtype=int)
+    send_start = np.zeros((num_channels, num_cores, num_cores, steps, steps, num_comms), dtype=int)
+    send_duration = np.zeros_like(send_start)
+    offset = 0
+    for (component, part, result) in zip(components_of(decision_model), parts, results):
+        rows = _channels_of(sdf_exec, component)
+        window = slice(offset, offset + _mpsoc(part).max_steps)
+        mapped_actors[component, :, window] = np.array(result['mapped_actors'], dtype=int)
+        if rows:
+            buffer_start[rows, :, window] = np.array(result['buffer_start'], dtype=int)
+            for (composed, name) in ((send_start, 'send_start'), (send_duration, 'send_duration')):
+                composed[rows, :, :, window, window, :] = np.array(result[name], dtype=int)
+        offset = window.stop
+    return {
+        'mapped_actors': mapped_actors.tolist(),
+        'buffer_start': buffer_start.tolist(),
+        'send_start': send_start.tolist(),
+        'send_duration': send_duration.tolist()
+    }
+
+
+def composed_model(decision_model: SDFMultiCoreModel, parts: Sequence[SDFMultiCoreModel]) -> SDFToMultiCore:
+    '''Get a copy of the decision model with room for the steps of all parts, to rebuild composed results'''
+    composed = copy.copy(_mpsoc(decision_model))
+    composed.max_steps = sum(_mpsoc(p).max_steps for p in parts)
+    # the copy shares the caches of the original
+    composed.invalidate_caches()
+    return composed
@@ -0,0 +1,86 @@
+'''Dominance between decision models using coverage bitsets
+
+Every vertex and edge covered by any of the compared decision models gets
+a bit, and each decision model is reduced to the integer with the bits of
+the elements it covers. A model dominates another when its bits strictly
+contain the other's, which is a couple of integer operations instead of
+set comparisons.
+
+Since a model can only be dominated by one covering strictly more
+elements, visiting the models from the largest to the smallest coverage
+finds the non-dominated ones in a single pass, comparing each model only
+against the non-dominated ones found so far.
+'''
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Sequence
+
+import networkx as nx
+
+from idesyde.identification.interfaces import DecisionModel
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+def coverage_bitsets(models: Sequence[DecisionModel]) -> List[int]:
+    '''Get the coverage of each decision model as a bitset over all their covered elements'''
+    bit_of: Dict[Hashable, int] = dict()
+    bitsets = []
+    for m in models:
+        bits = 0
+        for elem in m.covered_vertex_set():
+            bits |= 1 << bit_of.setdefault(('v', elem), len(bit_of))
+        for elem in m.covered_edge_set():
+            bits |= 1 << bit_of.setdefault(('e', elem), len(bit_of))
+        bitsets.append(bits)
+    return bitsets
+
+
+def _bits_dominate(bits: int, other_bits: int) -> bool:
+    return bits != other_bits and bits & other_bits == other_bits
+
+
+def non_dominated(models: Sequence[DecisionModel]) -> List[DecisionModel]:
+    '''Filter out the decision models dominated by any other
+
+    Returns:
+        The non-dominated decision models, in their original order.
+    '''
+    bitsets = coverage_bitsets(models)
+    order = sorted(range(len(models)), key=lambda i: _popcount(bitsets[i]), reverse=True)
+    kept: List[int] = []
+    for i in order:
+        # a dominator of i is either kept or dominated by a kept model, which then also dominates i
+        if not any(_bits_dominate(bitsets[k], bitsets[i]) for k in kept):
+            kept.append(i)
+    return [models[i] for i in sorted(kept)]
+
+
+def dominance_graph(models: Sequence[DecisionModel], reduced: bool = True) -> nx.DiGraph:
+    '''Build the dominance relation between decision models, for diagnostics
+
+    Arguments:
+        reduced: Keep only the edges that are not implied by transitivity,
+            so that each model points to its closest dominated models.
+
+    Returns:
+        A graph with the indexes of 'models' as nodes, each with its model
+        in the 'model' attribute, and an edge from every model to the ones
+        it dominates.
+    '''
+    bitsets = coverage_bitsets(models)
+    graph = nx.DiGraph()
+    for (i, m) in enumerate(models):
+        graph.add_node(i, model=m, label=m.short_name(), covered=_popcount(bitsets[i]))
+    for i in range(len(models)):
+        for j in range(len(models)):
+            if _bits_dominate(bitsets[i], bitsets[j]):
+                graph.add_edge(i, j)
+    if reduced:
+        reduction = nx.transitive_reduction(graph)
+        reduction.add_nodes_from(graph.nodes(data=True))
+        return reduction
+    return graph
@@ -0,0 +1,123 @@
+'''Estimates of the size of the flattened MiniZinc models of decision models
+
+The flattener expands every 'forall' of a MiniZinc model into one
+constraint per index, so the size of the flattened model follows from
+the dimensions of the decision model alone: actors, channels, cores,
+communication elements and steps. The largest arrays of the MPSoC model
+have one entry per channel, pair of cores, pair of steps and
+communication element, and its space-time cut has one constraint per
+channel, pair of cores and two pairs of steps, so its size grows with the
+fourth power of the steps.
+
+The estimates count variables and constraints the way the model writes
+them, before the flattener simplifies any of them, which is what the
+flattener has to hold in memory at its peak. They are cheap enough to
+be used when choosing explorers, before any MiniZinc call.
+'''
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+# well above the models of the standard benchmark cases that are solved whole,
+# and overridable through the environment for machines with more memory
+MAX_FLAT_CONSTRAINTS = 20_000_000
+
+
+@dataclass
+class FlatSize(object):
+    '''Estimated size of a flattened MiniZinc model'''
+    variables: int
+    constraints: int
+
+    def __str__(self):
+        return f'{self.variables:,} variables and {self.constraints:,} constraints'
+
+
+def flat_constraint_limit() -> int:
+    '''Get the largest number of constraints explorers flatten, 'IDESYDE_MAX_FLAT_CONSTRAINTS' if set'''
+    return int(os.environ.get('IDESYDE_MAX_FLAT_CONSTRAINTS', MAX_FLAT_CONSTRAINTS))
+
+
+def mpsoc_flat_size(actors: int,
+                    channels: int,
+                    procs: int,
+                    comms: int,
+                    steps: int,
+                    path_entries: int = 0,
+                    path_pairs: int = 0,
+                    zero_wcets: int = 0) -> FlatSize:
+    '''Estimate the size of 'sdf_mpsoc_linear_dmodel.mzn'
+
+    Arguments:
+        path_entries: Number of non-zero entries of 'path'.
+        path_pairs: Number of pairs of cores with a non-empty path.
+        zero_wcets: Number of zero entries of 'wcet'.
+    '''
+    (a, c, p, u, s) = (actors, channels, procs, comms, steps)
+    sends = c * p * p * s * s
+    variables = a * p * s + 3 * p * s + 2 * c * p * s + sends + 2 * sends * u + 2
+    constraints = (
+        # bounds, which the flattener still has to go through
+        3 * c * p * s + sends + c * p * s * s + 4 * p * s + 2 * a * p * s + 2 * sends * u + 2 +
+        # repetitions, buffers, initial tokens and firings
+        zero_wcets * s + a + 5 * c * p * s + c + c * p * s +
+        # send durations, busy times and timing of the steps
+        c * s * s * path_entries + 3 * p * s + p +
+        # timing of the sends, in order along their paths
+        sends * u + c * s * s * (path_entries - path_pairs) + sends + u +
+        # space-time cut, with a constraint per pair of steps of every flow, and its sums
+        sends * s * s + sends + p * p * s * s +
+        # symmetry breaking and objectives
+        2 * p + 3 * p * s + 4)
+    return FlatSize(variables=variables, constraints=constraints)
+
+
+def orders_flat_size(actors: int, channels: int, orders: int, steps: int) -> FlatSize:
+    '''Estimate the size of 'sdf_order_linear_dmodel.mzn' '''
+    (a, c, o, s) = (actors, channels, orders, steps)
+    variables = c * o * (s + 1) + o * o * (s + 1) + a * o * s
+    constraints = 1 + 2 * a + 2 * c + c * o * s + c * o * (s + 1) + s
+    return FlatSize(variables=variables, constraints=constraints)
+
+
+def estimate_flat_size(decision_model: DecisionModel) -> Optional[FlatSize]:
+    '''Estimate the size of the flattened MiniZinc model of a decision model
+
+    Returns:
+        The estimate, or None if the decision model has no MiniZinc
+        model with a known estimate.
+    '''
+    if isinstance(decision_model, SDFToOrders):
+        sdf_exec = decision_model.sdf_exec_sub
+        orders = max(len(decision_model.orderings), 1)
+        steps = -(-len(sdf_exec.sdf_pass) // orders)
+        return orders_flat_size(len(sdf_exec.sdf_actors), len(sdf_exec.sdf_channels), orders, steps)
+    if isinstance(decision_model, SDFToMultiCoreCharacterized):
+        mpsoc = decision_model.sdf_mpsoc_sub
+        steps = mpsoc.max_steps
+        zero_wcets = int(np.sum(decision_model.wcet == 0))
+    elif isinstance(decision_model, SDFToMultiCore):
+        mpsoc = decision_model
+        # this model is solved with the steps of its orders model
+        sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+        steps = -(-len(sdf_exec.sdf_pass) // max(len(mpsoc.sdf_orders_sub.orderings), 1))
+        zero_wcets = 0
+    else:
+        return None
+    sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+    path = np.asarray(mpsoc.comms_path)
+    return mpsoc_flat_size(len(sdf_exec.sdf_actors),
+                           len(sdf_exec.sdf_channels),
+                           len(mpsoc.cores),
+                           len(mpsoc.comms),
+                           steps,
+                           path_entries=int(np.count_nonzero(path)),
+                           path_pairs=int(np.count_nonzero(np.any(path > 0, axis=-1))) if path.ndim == 3 else 0,
+                           zero_wcets=zero_wcets)
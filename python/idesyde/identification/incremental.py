@@ -0,0 +1,163 @@
+'''Incremental identification of a model from a previous version and its decision models
+
+Designers usually re-run the flow after small changes, such as a new WCET
+value or one more actor. Instead of identifying everything again, the new
+model is compared with the previous one and every rule gets the chance to
+patch the decision model it identified before, through
+'IdentificationRule.patch'. Rules that cannot patch, or that identified
+nothing before, run their full identification as usual.
+'''
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
+
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.interfaces import IdentificationRule
+from idesyde.identification.compact import VertexTable
+from idesyde.identification.compact import compact_decision_models
+from idesyde.identification.compact import expand_decision_models
+from idesyde.profiling import PhaseProfiler
+from idesyde.profiling import phase
+
+# (source identifier, target identifier, key)
+EdgeId = Tuple[str, str, str]
+
+
+@dataclass
+class ModelDiff(object):
+    '''Changes between two versions of a model, by vertex identifier
+
+    A vertex is changed if it keeps its identifier but its type, ports
+    or properties differ. Edges are identified by their end points and
+    their key in the multigraph. The old and new versions of every vertex
+    involved in a change are kept in 'involved', with None for the
+    missing one if it was added or removed.
+    '''
+    added_vertexes: Set[str] = field(default_factory=set)
+    removed_vertexes: Set[str] = field(default_factory=set)
+    changed_vertexes: Set[str] = field(default_factory=set)
+    added_edges: Set[EdgeId] = field(default_factory=set)
+    removed_edges: Set[EdgeId] = field(default_factory=set)
+    involved: Dict[str, Tuple[Optional[Vertex], Optional[Vertex]]] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return not (self.added_vertexes or self.removed_vertexes or self.changed_vertexes or self.added_edges
+                    or self.removed_edges)
+
+    def edge_endpoints(self) -> Set[str]:
+        '''Get the vertexes at either end of an added or removed edge'''
+        return set(i for (s, t, _) in self.added_edges | self.removed_edges for i in (s, t))
+
+    def restructured(self, types: Tuple[type, ...]) -> bool:
+        '''Check if vertexes of the given types were added, removed, rewired or had their ports changed
+
+        Only edges between two such vertexes count as rewiring, so that for
+        instance annotating an actor does not restructure an application.
+        Property changes are not considered structural either, so that
+        rules can decide whether they can patch them.
+        '''
+
+        def is_typed(i: str) -> bool:
+            return any(isinstance(v, types) for v in self.involved[i])
+
+        if any(is_typed(i) for i in self.added_vertexes | self.removed_vertexes):
+            return True
+        if any(is_typed(s) and is_typed(t) for (s, t, _) in self.added_edges | self.removed_edges):
+            return True
+        return any(is_typed(i) and _port_ids(old) != _port_ids(new)
+                   for (i, (old, new)) in self.involved.items() if i in self.changed_vertexes)
+
+    def changed_of_type(self, types: Tuple[type, ...]) -> List[Vertex]:
+        '''Get the new versions of the changed vertexes of the given types'''
+        return [new for (i, (_, new)) in self.involved.items() if i in self.changed_vertexes and isinstance(new, types)]
+
+    def touches(self, types: Tuple[type, ...]) -> bool:
+        '''Check if any vertex of the given types is involved in any change'''
+        return any(isinstance(v, types) for pair in self.involved.values() for v in pair)
+
+
+def _port_ids(vertex: Vertex) -> Set[str]:
+    return set(p.identifier for p in vertex.ports)
+
+
+def _vertex_changed(old: Vertex, new: Vertex) -> bool:
+    return old.get_type_tag() != new.get_type_tag() or _port_ids(old) != _port_ids(new)\
+        or old.properties != new.properties
+
+
+def diff_models(old: ForSyDeModel, new: ForSyDeModel) -> ModelDiff:
+    old_by_id = {v.identifier: v for v in old}
+    new_by_id = {v.identifier: v for v in new}
+    old_edges = set((s.identifier, t.identifier, k) for (s, t, k) in old.edges(keys=True))
+    new_edges = set((s.identifier, t.identifier, k) for (s, t, k) in new.edges(keys=True))
+    diff = ModelDiff(added_vertexes=set(new_by_id) - set(old_by_id),
+                     removed_vertexes=set(old_by_id) - set(new_by_id),
+                     changed_vertexes=set(i for (i, v) in new_by_id.items()
+                                          if i in old_by_id and _vertex_changed(old_by_id[i], v)),
+                     added_edges=new_edges - old_edges,
+                     removed_edges=old_edges - new_edges)
+    for i in diff.added_vertexes | diff.removed_vertexes | diff.changed_vertexes | diff.edge_endpoints():
+        diff.involved[i] = (old_by_id.get(i), new_by_id.get(i))
+    return diff
+
+
+def rebase_decision_models(identified: List[DecisionModel], old: ForSyDeModel,
+                           new: ForSyDeModel) -> List[DecisionModel]:
+    '''Make decision models of 'old' refer to the vertexes of 'new' with the same identifiers
+
+    Vertexes removed in 'new' are kept as they were, and it is up to the
+    rules patching these decision models to notice it through the diff.
+    '''
+    old_table = VertexTable.from_model(old)
+    new_by_id = {v.identifier: v for v in new}
+    new_table = VertexTable(new_by_id.get(v.identifier, v) for v in old_table.vertexes)
+    rebased = expand_decision_models(compact_decision_models(identified, old_table), new_table)
+    # the new vertexes may hold other data under the same identifiers
+    for m in rebased:
+        m.invalidate_caches()
+    return rebased
+
+
+def identify_decision_models_incremental(model: ForSyDeModel,
+                                         previous_model: ForSyDeModel,
+                                         previous_identified: List[DecisionModel],
+                                         rules: Optional[Iterable[IdentificationRule]] = None,
+                                         profiler: Optional[PhaseProfiler] = None) -> List[DecisionModel]:
+    '''Identify the decision models of 'model' reusing the ones of a previous version of it
+
+    The fixpoint is the same as in 'identify_decision_models', except
+    that each rule first tries to patch its previous decision model and
+    only runs its identification if the patch is not possible.
+    '''
+    if rules is None:
+        from idesyde.identification.api import _get_standard_rules
+        rules = _get_standard_rules()
+    rules = list(rules)
+    with phase(profiler, 'diff'):
+        diff = diff_models(previous_model, model)
+        previous = rebase_decision_models(previous_identified, previous_model, model)
+    max_iterations = len(model) * len(rules)
+    allowed_rules = [r for r in rules]
+    identified: List[DecisionModel] = []
+    iterations = 0
+    while len(allowed_rules) > 0 and iterations < max_iterations:
+        for r in list(allowed_rules):
+            with phase(profiler, r.short_name()):
+                trial = r.patch(model, identified, previous, diff)
+                if trial is None:
+                    trial = r.identify(model, identified)
+            (fixed, subprob) = trial
+            if subprob:
+                identified.append(subprob)
+            if fixed:
+                allowed_rules.remove(r)
+        iterations += 1
+    return identified
@@ -1,5 +1,8 @@
+import hashlib
 import importlib.resources as resources
+import json
 from dataclasses import dataclass
+from dataclasses import fields
 from typing import Union
 from typing import Tuple
 from typing import Set
@@ -8,13 +11,19 @@ from typing import Optional
 from typing import Dict
 from typing import Iterable
 from typing import Any
+from typing import FrozenSet
+from typing import TYPE_CHECKING
 
 from forsyde.io.python.api import ForSyDeModel
 from forsyde.io.python.core import Vertex
 from forsyde.io.python.core import Edge
-from minizinc import Model as MznModel
-from minizinc import Instance as MznInstance
-from minizinc import Result as MznResult
+
+if TYPE_CHECKING:
+    # minizinc is only needed when decision models are actually explored
+    from minizinc import Model as MznModel
+    from minizinc import Instance as MznInstance
+    from minizinc import Result as MznResult
+    from idesyde.identification.incremental import ModelDiff
 
 
 @dataclass
@@ -33,10 +42,76 @@ class DecisionModel(object):
     this interface. This strategy is used in the identification
     procedure to gather all available DecisionModel when a specific
     list is not given.
+
+    Hashing and dominance are based on the covered elements, and equality
+    also compares the data of the decision models, such as their WCETs.
+    Both are digested once and cached. Subclasses must therefore be
+    declared with '@dataclass(eq=False)' to keep them, and call
+    'invalidate_caches' if they are changed after identification.
     """
 
+    def __eq__(self, other):
+        if not isinstance(other, DecisionModel):
+            return NotImplemented
+        return self is other or (self.__class__ is other.__class__ and self.fingerprint() == other.fingerprint()
+                                 and self.data_digest() == other.data_digest())
+
     def __hash__(self):
-        return hash((self.covered_vertexes(), self.covered_edges()))
+        return hash(self.fingerprint())
+
+    def __getstate__(self):
+        # the caches hold every covered element, so they are not worth pickling
+        return {k: v for (k, v) in self.__dict__.items() if k not in _DECISION_MODEL_CACHES}
+
+    def covered_vertex_set(self) -> FrozenSet[Vertex]:
+        '''Get the vertexes partially identified by the Decision Model, computed once'''
+        if '_covered_vertex_set' not in self.__dict__:
+            self._covered_vertex_set = frozenset(self.covered_vertexes())
+        return self._covered_vertex_set
+
+    def covered_edge_set(self) -> FrozenSet[Edge]:
+        '''Get the edges partially identified by the Decision Model, computed once'''
+        if '_covered_edge_set' not in self.__dict__:
+            self._covered_edge_set = frozenset(self.covered_edges())
+        return self._covered_edge_set
+
+    def fingerprint(self) -> str:
+        '''Get a stable digest of the decision model kind and its covered elements
+
+        The digest does not depend on the order in which the elements are
+        covered nor on the process it is computed in, so it can be used as
+        a key for caches that outlive a run.
+
+        Returns:
+            The hexadecimal SHA-256 digest.
+        '''
+        if '_fingerprint' not in self.__dict__:
+            hasher = hashlib.sha256(self.__class__.__name__.encode())
+            for identifier in sorted(v.identifier for v in self.covered_vertex_set()):
+                hasher.update(b'\0v')
+                hasher.update(identifier.encode())
+            for identifier in sorted(_edge_identifier(e) for e in self.covered_edge_set()):
+                hasher.update(b'\0e')
+                hasher.update(identifier.encode())
+            self._fingerprint = hasher.hexdigest()
+        return self._fingerprint
+
+    def data_digest(self) -> str:
+        '''Get a digest of the fields of the decision model, with vertexes and edges by identifier
+
+        Returns:
+            The hexadecimal SHA-256 digest.
+        '''
+        if '_data_digest' not in self.__dict__:
+            encoded = json.dumps({f.name: getattr(self, f.name)
+                                  for f in fields(self)}, sort_keys=True, default=_jsonable_field)
+            self._data_digest = hashlib.sha256(encoded.encode()).hexdigest()
+        return self._data_digest
+
+    def invalidate_caches(self) -> None:
+        '''Drop the cached covered elements, fingerprint and data digest after a change'''
+        for k in _DECISION_MODEL_CACHES:
+            self.__dict__.pop(k, None)
 
     def short_name(self) -> str:
         '''Get the short name representation for the decision model
@@ -91,20 +166,42 @@ class DecisionModel(object):
             other: the other decision model to be checked.
 
         Returns:
-            True if 'self' dominates other. False otherwise.
+            True if 'self' covers every vertex and edge that 'other'
+            covers, and more. False otherwise.
         '''
-        # other - self
-        vertexes_other = set(other.covered_vertexes())
-        vertexes_self = set(self.covered_vertexes())
-        edges_other = set(other.covered_edges())
-        edges_self = set(self.covered_edges())
-        # other is fully contained in self and itersection is consistent
-        # return all(v in other.covered_vertexes() for v in self.covered_vertexes())\
-        #     and all(e in other.covered_edges() for e in self.covered_edges())\
-        #     and not any(v in self.covered_vertexes() for v in other.covered_vertexes())\
-        #     and not all(e in self.covered_edges() for e in other.covered_edges())
-        return len(vertexes_self.difference(vertexes_other)) > 0\
-            or len(edges_self.difference(edges_other)) > 0
+        vertexes_other = other.covered_vertex_set()
+        vertexes_self = self.covered_vertex_set()
+        edges_other = other.covered_edge_set()
+        edges_self = self.covered_edge_set()
+        # other is strictly contained in self
+        return vertexes_other <= vertexes_self and edges_other <= edges_self\
+            and (len(vertexes_other) < len(vertexes_self) or len(edges_other) < len(edges_self))
+
+
+_DECISION_MODEL_CACHES = ('_covered_vertex_set', '_covered_edge_set', '_fingerprint', '_data_digest')
+
+
+def _edge_identifier(edge: Edge) -> str:
+    source_port = edge.source_vertex_port.identifier if edge.source_vertex_port else ''
+    target_port = edge.target_vertex_port.identifier if edge.target_vertex_port else ''
+    return f"{edge.source_vertex.identifier}:{source_port}->{edge.target_vertex.identifier}:{target_port}"\
+        f":{edge.get_type_tag()}"
+
+
+def _jsonable_field(value: Any) -> Any:
+    if isinstance(value, Vertex):
+        return value.identifier
+    if isinstance(value, Edge):
+        return _edge_identifier(value)
+    if isinstance(value, DecisionModel):
+        return value.data_digest()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, range):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'{type(value)} is not serializable')
 
 
 class MinizincableDecisionModel(DecisionModel):
@@ -129,14 +226,21 @@ class MinizincableDecisionModel(DecisionModel):
         '''
         return dict()
 
-    def populate_mzn_model(self, model: Union[MznModel, MznInstance]) -> Union[MznModel, MznInstance]:
+    def populate_mzn_model(self,
+                           model: Union["MznModel", "MznInstance"],
+                           overrides: Optional[Dict[str, Any]] = None) -> Union["MznModel", "MznInstance"]:
         '''Populate a minizinc model data dictionary
 
+        Arguments:
+            overrides: Data replacing the one given by 'get_mzn_data',
+                such as tighter bounds found before solving.
+
         Returns:
             Either an instance or a model with the data
             which then be solved by a minizinc solver.
         '''
         data_dict = self.get_mzn_data()
+        data_dict.update(overrides or dict())
         for k in data_dict:
             model[k] = data_dict[k]
         return model
@@ -151,7 +255,7 @@ class MinizincableDecisionModel(DecisionModel):
         '''
         return ""
 
-    def rebuild_forsyde_model(self, result: MznResult) -> ForSyDeModel:
+    def rebuild_forsyde_model(self, result: "MznResult") -> ForSyDeModel:
         '''Reconstruct a ForSyDeIO Model from the DecisionModel
 
         Returns:
@@ -161,7 +265,8 @@ class MinizincableDecisionModel(DecisionModel):
         '''
         return ForSyDeModel()
 
-    def build_mzn_model(self, mzn: Union[MznModel, MznInstance] = MznModel()) -> Union[MznModel, MznInstance]:
+    def build_mzn_model(self,
+                        mzn: Optional[Union["MznModel", "MznInstance"]] = None) -> Union["MznModel", "MznInstance"]:
         '''Builds the memory representaton of the minizinc model
 
         It uses the minizinc models packaged inside the python modules
@@ -169,8 +274,12 @@ class MinizincableDecisionModel(DecisionModel):
 
         Returns:
             Minzinc model populated with the information that the
-            decision model can fill.
+            decision model can fill. A new model is created if 'mzn'
+            is not given.
         '''
+        if mzn is None:
+            from minizinc import Model as MznModel
+            mzn = MznModel()
         model_txt = resources.read_text('idesyde.minizinc', self.get_mzn_model_name())
         mzn.add_string(model_txt)
         self.populate_mzn_model(mzn)
@@ -207,6 +316,25 @@ class IdentificationRule(object):
         """
         return (True, None)
 
+    def patch(self, model: ForSyDeModel, identified: List[DecisionModel], previous: List[DecisionModel],
+              diff: "ModelDiff") -> Optional[Tuple[bool, Optional[DecisionModel]]]:
+        '''Update the decision model identified in a previous version of 'model'
+
+        Used by incremental identification. Rules that can cheaply update
+        their previous decision model from the changes, for instance a
+        single WCET entry, should override it.
+
+        Arguments:
+            previous: Decision models identified in the previous version,
+                referring to the vertexes of 'model' where they still exist.
+            diff: Changes from the previous version to 'model'.
+
+        Returns:
+            The same as 'identify', or None if the rule cannot patch its
+            previous decision model and must run 'identify' instead.
+        '''
+        return None
+
     def short_name(self) -> str:
         '''Get the short name representation for the identification rule
 
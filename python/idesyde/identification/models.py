@@ -8,6 +8,9 @@ from typing import List
 import numpy as np
 
 import idesyde.sdf as sdfapi
+import idesyde.throughput as throughput
+import idesyde.identification.bounds as bounds
+import idesyde.identification.symmetry as symmetry
 from forsyde.io.python.api import ForSyDeModel
 from forsyde.io.python.core import Vertex
 from forsyde.io.python.core import Edge
@@ -24,7 +27,18 @@ from idesyde.identification.interfaces import DecisionModel
 from idesyde.identification.interfaces import MinizincableDecisionModel
 
 
-@dataclass
+def _deduced_mpsoc_data(data):
+    deduced = {**bounds.mpsoc_bounds(data), **symmetry.mpsoc_symmetries(data)}
+    # the search used to start from 'activations[a mod p]' firings in every step, out of range for a = p
+    warm = np.zeros((len(data['sdf_actors']), len(data['procs']), data['max_steps']), dtype=int)
+    for (a, p) in np.ndindex(warm.shape[:2]):
+        if (a + 1) % (p + 1) > 0:
+            warm[a, p, :data['activations'][(a + 1) % (p + 1) - 1]] = 1
+    deduced['warm_mapped_actors'] = warm.tolist()
+    return deduced
+
+
+@dataclass(eq=False)
 class SDFExecution(DecisionModel):
     """
     This decision model captures all SDF actors and channels in
@@ -33,36 +47,44 @@ class SDFExecution(DecisionModel):
     it has a PASS.
 
     After identification this decision model provides the global
-    SDF topology and the PASS with all elements included.
+    SDF topology and the PASS with all elements included, as well as
+    the actor indexes of each disjoint SDF in 'sdf_components', so that
+    they can be explored independently.
     """
 
     sdf_actors: List[Vertex] = field(default_factory=list)
     sdf_delays: List[Vertex] = field(default_factory=list)
     sdf_channels: List[Tuple[Vertex, Vertex, List[Vertex]]] = field(default_factory=list)
-    sdf_topology: np.ndarray = np.zeros((0, 0))
-    sdf_repetition_vector: np.ndarray = np.zeros((0))
-    sdf_initial_tokens: np.ndarray = np.zeros((0))
+    sdf_topology: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+    sdf_repetition_vector: np.ndarray = field(default_factory=lambda: np.zeros((0)))
+    sdf_initial_tokens: np.ndarray = field(default_factory=lambda: np.zeros((0)))
     sdf_pass: List[Vertex] = field(default_factory=list)
 
-    sdf_max_tokens: np.ndarray = np.zeros((0))
+    sdf_max_tokens: np.ndarray = field(default_factory=lambda: np.zeros((0)))
 
     def covered_vertexes(self):
         yield from self.sdf_actors
         for (_, _, p) in self.sdf_channels:
             yield from p
 
+    def sdf_pass_indexes(self) -> List[int]:
+        actors_enum = {a: i for (i, a) in enumerate(self.sdf_actors)}
+        return [actors_enum[a] for a in self.sdf_pass]
+
     def compute_deduced_properties(self):
+        self.sdf_components = sdfapi.get_components(self.sdf_topology) if len(self.sdf_actors) > 0 else []
         self.max_tokens = np.zeros((len(self.sdf_channels)), dtype=int)
-        for (cidx, c) in enumerate(self.sdf_channels):
-            self.max_tokens[cidx] = max(self.sdf_topology[cidx, aidx] * self.sdf_repetition_vector[aidx]
-                                        for (aidx, a) in enumerate(self.sdf_actors))
+        if len(self.sdf_channels) > 0:
+            # tokens produced in each channel during one whole iteration, on top of the initial ones
+            self.max_tokens = np.max(self.sdf_topology * self.sdf_repetition_vector.reshape(1, -1), axis=1)
+            self.max_tokens = self.max_tokens + np.asarray(self.sdf_initial_tokens, dtype=int).reshape(-1)
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToOrders(MinizincableDecisionModel):
 
     # sub identifications
-    sdf_exec_sub: SDFExecution = SDFExecution()
+    sdf_exec_sub: SDFExecution = field(default_factory=SDFExecution)
 
     # partial identification
     orderings: List[Vertex] = field(default_factory=list)
@@ -85,9 +107,7 @@ class SDFToOrders(MinizincableDecisionModel):
         data['max_tokens'] = sub.max_tokens.tolist()
         data['activations'] = sub.sdf_repetition_vector[:, 0].tolist()
         data['static_orders'] = range(1, len(self.orderings) + 1)
-        # TODO: find a awya to compute the initial tokens
-        # reliably
-        data['initial_tokens'] = [0 for c in sub.sdf_channels]
+        data['initial_tokens'] = np.asarray(sub.sdf_initial_tokens, dtype=int).reshape(-1).tolist()
         return data
 
     def get_mzn_model_name(self):
@@ -97,14 +117,17 @@ class SDFToOrders(MinizincableDecisionModel):
         return ForSyDeModel()
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToMultiCore(MinizincableDecisionModel):
 
+    # sub identifications
+    sdf_orders_sub: SDFToOrders = field(default_factory=SDFToOrders)
+
     # partially identified
     cores: List[List[Vertex]] = field(default_factory=list)
     comms: List[List[Vertex]] = field(default_factory=list)
     connections: List[Tuple[Vertex, Vertex, List[Vertex]]] = field(default_factory=list)
-    comms_capacity: List[int] = field(default_factory=int)
+    comms_capacity: List[int] = field(default_factory=list)
 
     # deduced properties
     # vertex_expansions: Dict[Vertex, List[Vertex]] = field(default_factory=dict)
@@ -114,7 +137,7 @@ class SDFToMultiCore(MinizincableDecisionModel):
     # expanded_cores_enum: Dict[Vertex, int] = field(default_factory=dict)
     # expanded_enum: Dict[Vertex, int] = field(default_factory=dict)
     max_steps: int = 1
-    comms_path: List[List[List[int]]] = field(default_factory=list)
+    comms_path: np.ndarray = field(default_factory=lambda: np.zeros((0, 0, 0), dtype=int))
 
     def covered_vertexes(self):
         yield from self.cores
@@ -160,20 +183,21 @@ class SDFToMultiCore(MinizincableDecisionModel):
         # self.cores_enum = cores_enum
         # self.comm_enum = comm_enum
         self.max_steps = max_steps
-        self.comms_path = [[[0 for c in self.comms] for t in self.cores] for s in self.cores]
-        for (s, t, p) in self.connections:
-            sidx = self.cores.index(s)
-            tidx = self.cores.index(t)
-            for (i, u) in enumerate(p):
-                uidx = self.comms.index(u)
-                self.comms_path[sidx][tidx][uidx] = i + 1
+        # the routing stage already fills it, so only derive it if it was not given
+        if self.comms_path.shape != (len(self.cores), len(self.cores), len(self.comms)):
+            cores_enum = {p: i for (i, p) in enumerate(self.cores)}
+            comms_enum = {c: i for (i, c) in enumerate(self.comms)}
+            self.comms_path = np.zeros((len(self.cores), len(self.cores), len(self.comms)), dtype=int)
+            for (s, t, p) in self.connections:
+                for (i, u) in enumerate(p):
+                    self.comms_path[cores_enum[s], cores_enum[t], comms_enum[u]] = i + 1
 
     def get_mzn_data(self):
         data = self.sdf_orders_sub.get_mzn_data()
         # expanded_units_enum = {**self.expanded_cores_enum, **self.expanded_comm_enum}
         data['procs'] = set(i + 1 for (i, _) in enumerate(self.cores))
         data['comms'] = set(i + 1 for (i, _) in enumerate(self.comms))
-        data['path'] = self.comms_path
+        data['path'] = self.comms_path.tolist()
         data['comms_capacity'] = self.comms_capacity
         # data['units_neighs'] = [
         #     set(self.expanded_enum[ex.target_vertex] + 1 for (e, el) in self.edge_expansions.items() for ex in el
@@ -183,14 +207,15 @@ class SDFToMultiCore(MinizincableDecisionModel):
         # ]
         # since the minizinc model requires wcet and wcct,
         # we fake it with almost unitary assumption
-        data['wcet'] = (data['max_tokens'] * np.ones((len(data['sdf_actors']), len(self.cores)), dtype=int)).tolist()
-        data['token_wcct'] = (np.ones((len(data['sdf_channels']), len(data['procs']) + len(data['comms'])),
-                                      dtype=int)).tolist()
+        data['wcet'] = np.ones((len(data['sdf_actors']), len(self.cores)), dtype=int).tolist()
+        data['token_wcct'] = np.ones((len(data['sdf_channels']), len(data['comms'])), dtype=int).tolist()
         # since the minizinc model requires objective weights,
         # we just disconsder them
         data['objective_weights'] = [0, 0]
+        data['objective_lower_bounds'] = [0, 0]
         # take away spurius extras
         data.pop('static_orders')
+        data.update(_deduced_mpsoc_data(data))
         return data
 
     def rebuild_forsyde_model(self, results):
@@ -205,7 +230,7 @@ class SDFToMultiCore(MinizincableDecisionModel):
             if not new_model.has_edge(core, ordering, key="object"):
                 new_edge = AbstractMapping(source_vertex=core,
                                 target_vertex=ordering,
-                                source_vertex_port=Port(identifier="execution", port_type=AbstractOrdering))
+                                source_vertex_port=Port(identifier="execution"))
                 new_model.add_edge(core, ordering, object=new_edge)
             slot = 0
             for t in range(max_steps):
@@ -218,7 +243,7 @@ class SDFToMultiCore(MinizincableDecisionModel):
                     if not new_model.has_edge(ordering, actor, key="object"):
                         new_edge = AbstractScheduling(source_vertex=ordering,
                                         target_vertex=actor,
-                                        source_vertex_port=Port(identifier=f"slot[{slot}]", port_type=Process))
+                                        source_vertex_port=Port(identifier=f"slot[{slot}]"))
                         new_model.add_edge(ordering, actor, object=new_edge)
                         slot += 1
         for (commidx, comm) in enumerate(self.comms):
@@ -226,10 +251,11 @@ class SDFToMultiCore(MinizincableDecisionModel):
             if not new_model.has_edge(comm, ordering, key="object"):
                 new_edge = AbstractMapping(source_vertex=comm,
                                 target_vertex=ordering,
-                                source_vertex_port=Port(identifier="timeslots", port_type=AbstractOrdering))
+                                source_vertex_port=Port(identifier="timeslots"))
                 new_model.add_edge(comm, ordering, object=new_edge)
             slots = [0 for c in sdf_channels]
-            for (c, (s, t, path)) in enumerate(sdf_channels):
+            for (c, (_, _, path)) in enumerate(sdf_channels):
+                # two sends clash if their transfer intervals overlap
                 clashes = [
                     slots[cc]
                     for (p, _) in enumerate(self.cores)
@@ -238,13 +264,17 @@ class SDFToMultiCore(MinizincableDecisionModel):
                     for tt in range(max_steps)
                     for cc in range(c)
                     if
+                    results["send_duration"][c][p][pp][t][tt][commidx] > 0
+                    and
+                    results["send_duration"][cc][p][pp][t][tt][commidx] > 0
+                    and
                     results["send_start"][c][p][pp][t][tt][commidx] +
                     results["send_duration"][c][p][pp][t][tt][commidx]
-                    >= results["send_start"][cc][p][pp][t][tt][commidx]
-                    or
+                    > results["send_start"][cc][p][pp][t][tt][commidx]
+                    and
                     results["send_start"][cc][p][pp][t][tt][commidx] +
                     results["send_duration"][cc][p][pp][t][tt][commidx]
-                    >= results["send_start"][c][p][pp][t][tt][commidx]
+                    > results["send_start"][c][p][pp][t][tt][commidx]
                 ]
                 slots[c] = min(
                     slot for slot in range(self.comms_capacity[commidx])
@@ -258,22 +288,22 @@ class SDFToMultiCore(MinizincableDecisionModel):
         return new_model
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToMultiCoreCharacterized(MinizincableDecisionModel):
 
     # covered partial identifications
-    sdf_mpsoc_sub: SDFToMultiCore = SDFToMultiCore()
+    sdf_mpsoc_sub: SDFToMultiCore = field(default_factory=SDFToMultiCore)
 
     # elements that are partially identified
     wcet_vertexes: List[Vertex] = field(default_factory=list)
     token_wcct_vertexes: List[Vertex] = field(default_factory=list)
     goals_vertexes: List[Vertex] = field(default_factory=list)
-    wcet: np.ndarray = np.zeros((0, 0), dtype=int)
-    token_wcct: np.ndarray = np.zeros((0, 0), dtype=int)
+    wcet: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=int))
+    token_wcct: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=int))
     throughput_importance: int = 0
     latency_importance: int = 0
-    send_overhead: np.ndarray = np.zeros((0, 0), dtype=int)
-    read_overhead: np.ndarray = np.zeros((0, 0), dtype=int)
+    send_overhead: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=int))
+    read_overhead: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=int))
 
     # deduced properties
     # expanded_wcet: np.ndarray = np.array((0, 0), dtype=int)
@@ -321,13 +351,50 @@ class SDFToMultiCoreCharacterized(MinizincableDecisionModel):
         data['wcet'] = self.wcet.tolist()
         data['token_wcct'] = self.token_wcct.tolist()
         data['objective_weights'] = [self.throughput_importance, self.latency_importance]
+        data.update(_deduced_mpsoc_data(data))
         return data
 
     def rebuild_forsyde_model(self, results):
         return self.sdf_mpsoc_sub.rebuild_forsyde_model(results)
 
-
-@dataclass
+    def comm_delays(self) -> np.ndarray:
+        '''Get the time for one firing of the source of each channel to send its tokens between each pair of cores'''
+        mpsoc = self.sdf_mpsoc_sub
+        sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+        delays = np.zeros((len(sdf_exec.sdf_channels), len(mpsoc.cores), len(mpsoc.cores)))
+        for (c, row) in enumerate(sdf_exec.sdf_topology):
+            produced = int(row[row > 0].sum())
+            for (p, pp, u) in zip(*np.nonzero(mpsoc.comms_path)):
+                delays[c, p, pp] += throughput.tdma_delay(produced, self.token_wcct[c, u], mpsoc.comms_capacity[u])
+        return delays
+
+    def evaluate_period(self, results) -> float:
+        '''Get the exact period of the mapping and orders in 'results', in the shape returned by MiniZinc
+
+        This is independent from the throughput approximation inside the
+        MiniZinc model, so it can validate its solutions or score
+        candidate solutions of other explorers.
+        '''
+        sdf_exec = self.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub
+        (firing_cores, orders) = throughput.mapping_from_results(sdf_exec.sdf_topology,
+                                                                 sdf_exec.sdf_repetition_vector,
+                                                                 results['mapped_actors'],
+                                                                 results['buffer_start'],
+                                                                 sdf_pass=sdf_exec.sdf_pass_indexes())
+        actors = np.repeat(np.arange(len(sdf_exec.sdf_actors)), sdf_exec.sdf_repetition_vector.reshape(-1))
+        execution_times = np.where(firing_cores >= 0, self.wcet[actors, np.maximum(firing_cores, 0)],
+                                   np.max(self.wcet, axis=1, initial=0)[actors])
+        hsdf = throughput.build_hsdf(sdf_exec.sdf_topology,
+                                     sdf_exec.sdf_repetition_vector,
+                                     sdf_exec.sdf_initial_tokens,
+                                     execution_times=execution_times,
+                                     firing_cores=firing_cores,
+                                     comm_delays=self.comm_delays(),
+                                     orders=orders)
+        return throughput.period(hsdf)
+
+
+@dataclass(eq=False)
 class CharacterizedJobShop(MinizincableDecisionModel):
 
     # models that were abstracted in jobs
@@ -343,8 +410,8 @@ class CharacterizedJobShop(MinizincableDecisionModel):
     next_job: List[Tuple[Vertex, Vertex]] = field(default_factory=list)
     wcet_vertexes: List[Vertex] = field(default_factory=list)
     wcct_vertexes: List[Vertex] = field(default_factory=list)
-    wcet: np.ndarray = np.zeros((0, 0), dtype=int)
-    wcct: np.ndarray = np.zeros((0, 0, 0), dtype=int)
+    wcet: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=int))
+    wcct: np.ndarray = field(default_factory=lambda: np.zeros((0, 0, 0), dtype=int))
     paths: List[Tuple[Vertex, Vertex, List[Vertex]]] = field(default_factory=list)
 
     def covered_vertexes(self):
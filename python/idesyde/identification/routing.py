@@ -0,0 +1,153 @@
+'''Routing between the processing elements of a platform
+
+Processing elements communicate through paths made only of communication
+elements, and the shortest of them is always the one used. The paths are
+found with one breadth first search per core over the platform alone,
+i.e. the cores, the communication elements and the edges between them,
+so the application and its annotations are never traversed.
+
+Routing depends only on the platform, which is usually shared by many
+applications, so results are cached by a fingerprint of the platform
+vertexes and the edges between them. The cache is kept in memory, and
+can also be shared between processes through files in a directory set
+with 'set_routing_cache_dir'.
+'''
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections import deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
+
+# (source core index, target core index, comm indexes along the path)
+IndexedConnection = Tuple[int, int, Tuple[int, ...]]
+
+ROUTING_CACHE_SIZE = 32
+
+_routing_cache: "OrderedDict[str, Tuple[List[IndexedConnection], np.ndarray]]" = OrderedDict()
+_routing_cache_lock = threading.Lock()
+_routing_cache_dir: Optional[str] = None
+
+
+def set_routing_cache_dir(path: Optional[str]) -> Optional[str]:
+    '''Share routes with other processes through files in 'path', or keep them only in memory if None
+
+    Returns:
+        The directory used before, so that it can be restored.
+    '''
+    global _routing_cache_dir
+    if path:
+        os.makedirs(path, exist_ok=True)
+    (previous, _routing_cache_dir) = (_routing_cache_dir, path)
+    return previous
+
+
+def _load_shared(key: str, num_cores: int, num_comms: int) -> Optional[Tuple[List[IndexedConnection], np.ndarray]]:
+    if not _routing_cache_dir:
+        return None
+    try:
+        with open(os.path.join(_routing_cache_dir, f'{key}.routes.json')) as stream:
+            stored = json.load(stream)
+        connections = [(int(s), int(t), tuple(int(c) for c in path)) for (s, t, path) in stored['connections']]
+        comms_path = np.array(stored['comms_path'], dtype=int).reshape((num_cores, num_cores, num_comms))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    # files in the directory are not trusted to fit the platform
+    if not all(0 <= s < num_cores and 0 <= t < num_cores and all(0 <= c < num_comms for c in path)
+               for (s, t, path) in connections):
+        return None
+    return (connections, comms_path)
+
+
+def _store_shared(key: str, routes: Tuple[List[IndexedConnection], np.ndarray]) -> None:
+    if not _routing_cache_dir:
+        return
+    (connections, comms_path) = routes
+    # written aside and renamed, so that other processes never read a partial file
+    (fd, temporary) = tempfile.mkstemp(dir=_routing_cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as stream:
+        json.dump({'connections': [[s, t, list(path)] for (s, t, path) in connections],
+                   'comms_path': comms_path.tolist()}, stream)
+    os.replace(temporary, os.path.join(_routing_cache_dir, f'{key}.routes.json'))
+
+
+def platform_fingerprint(model: ForSyDeModel, cores: List[Vertex], comms: List[Vertex]) -> str:
+    '''Digest of the platform elements, in order, and of the edges between them'''
+    platform = set(cores).union(comms)
+    hasher = hashlib.sha256()
+    for v in cores:
+        hasher.update(b'p' + v.identifier.encode() + b'\0')
+    for v in comms:
+        hasher.update(b'c' + v.identifier.encode() + b'\0')
+    for (s, t) in sorted((s.identifier, t.identifier) for v in platform for (s, t) in model.out_edges(v)
+                         if t in platform):
+        hasher.update(b'e' + s.encode() + b'\0' + t.encode() + b'\0')
+    return hasher.hexdigest()
+
+
+def _route(model: ForSyDeModel, cores: List[Vertex], comms: List[Vertex]) -> Tuple[List[IndexedConnection], np.ndarray]:
+    cores_enum: Dict[Vertex, int] = {p: i for (i, p) in enumerate(cores)}
+    comms_enum: Dict[Vertex, int] = {c: i for (i, c) in enumerate(comms)}
+    connections: List[IndexedConnection] = []
+    comms_path = np.zeros((len(cores), len(cores), len(comms)), dtype=int)
+    for (sidx, s) in enumerate(cores):
+        # only communication elements are expanded, so that cores are end points of paths
+        parents: Dict[Vertex, Vertex] = {s: s}
+        queue = deque([s])
+        while queue:
+            u = queue.popleft()
+            for v in model.successors(u):
+                if v in parents or (v not in comms_enum and v not in cores_enum):
+                    continue
+                parents[v] = u
+                if v in comms_enum:
+                    queue.append(v)
+                    continue
+                path: List[int] = []
+                w = u
+                while w is not s:
+                    path.append(comms_enum[w])
+                    w = parents[w]
+                path.reverse()
+                tidx = cores_enum[v]
+                connections.append((sidx, tidx, tuple(path)))
+                comms_path[sidx, tidx, path] = np.arange(1, len(path) + 1)
+    return (connections, comms_path)
+
+
+def route_platform(model: ForSyDeModel, cores: List[Vertex],
+                   comms: List[Vertex]) -> Tuple[List[Tuple[Vertex, Vertex, List[Vertex]]], np.ndarray]:
+    '''Find the shortest communication path between every pair of cores
+
+    Returns:
+        The connections as '(source, target, path)' tuples, and the
+        '(cores, cores, comms)' array where entry '[s, t, c]' is the
+        position, starting at 1, of 'comms[c]' in the path from 'cores[s]'
+        to 'cores[t]', or 0 if it is not in it.
+    '''
+    key = platform_fingerprint(model, cores, comms)
+    with _routing_cache_lock:
+        cached = _routing_cache.get(key)
+        if cached:
+            _routing_cache.move_to_end(key)
+    if not cached:
+        cached = _load_shared(key, len(cores), len(comms))
+        if not cached:
+            cached = _route(model, cores, comms)
+            _store_shared(key, cached)
+        with _routing_cache_lock:
+            _routing_cache[key] = cached
+            while len(_routing_cache) > ROUTING_CACHE_SIZE:
+                _routing_cache.popitem(last=False)
+    (indexed, comms_path) = cached
+    connections = [(cores[s], cores[t], [comms[c] for c in path]) for (s, t, path) in indexed]
+    return (connections, comms_path.copy())
@@ -3,6 +3,7 @@ import numpy as np
 import sympy
 from typing import List
 from typing import Dict
+from typing import Optional
 from typing import Tuple
 
 from forsyde.io.python.core import Vertex
@@ -28,6 +29,7 @@ from idesyde.identification.models import SDFToOrders
 from idesyde.identification.models import SDFToMultiCore
 from idesyde.identification.models import SDFToMultiCoreCharacterized
 from idesyde.identification.models import CharacterizedJobShop
+from idesyde.identification.routing import route_platform
 
 
 class SDFAppRule(IdentificationRule):
@@ -36,9 +38,14 @@ class SDFAppRule(IdentificationRule):
         '''This Rule identifies (H)SDF applications that are consistent.
 
         To be consistent, the (H)SDF applications must:
-            1. The topology matrix must have a null space of dimension 1,
-                if there exists at least one channel in the application.
+            1. The topology matrix of each connected component must have
+                a null space of dimension 1, if there exists at least one
+                channel in the component.
             2. There must be a PASS for the application.
+
+        Disjoint applications are thus identified together, each with its
+        own repetition vector, which is also cheaper than computing the
+        null space of the whole topology at once.
         '''
         result = None
         constructors = [c for c in model if isinstance(c, SDFComb)]
@@ -80,54 +87,19 @@ class SDFAppRule(IdentificationRule):
         initial_tokens = np.array(
             [sum(1 for v in p if v in sdf_delays) for (_, _, p) in sdf_channels], dtype=int)
         # 1: build the topology matrix
-        sdf_topology = np.zeros(
-            (len(sdf_channels), len(sdf_actors)), dtype=int)
-        for (cidx, (s, t, path)) in enumerate(sdf_channels):
-            sidx = sdf_actors.index(s)
-            tidx = sdf_actors.index(t)
-            # get the relevant port for the source and target actors
-            # in this channel, assuming there is only one edge
-            # connecting them
-            # TODO: maybe find a way to generalize properly to multigraphs?
-            out_port = next(v["object"].source_vertex_port for (
-                k, v) in model[s][path[0]].items())
-            in_port = next(v["object"].target_vertex_port for (
-                k, v) in model[path[-1]][t].items())
-            # get the constructor of the actors
-            s_constructor = next(c for c in constructors if s in model[c])
-            t_constructor = next(c for c in constructors if t in model[c])
-            # look in their properties what is the production associated
-            # with the channel, for the source...
-            sdf_topology[cidx, sidx] = int(
-                s_constructor.get_production()[out_port.identifier])
-            sdf_topology[cidx, tidx] = - \
-                int(t_constructor.get_consumption()[in_port.identifier])
-            # if out_port.identifier in s_constructor.get_production():
-            # else:
-            #     sdf_topology[cidx, sidx] = int(s_constructor.get_consumption()[out_port.identifier])
-            # .. and for the target
-            # if in_port.identifier in t_constructor.get_production():
-            #     sdf_topology[cidx, tidx] = -int(s_constructor.get_production()[in_port.identifier])
-            # else:
-        # 1: calculate the null space
-        null_space = sympy.Matrix(sdf_topology).nullspace()
-        if len(null_space) == 1:
-            # 2: transform the vector into the least integer multiple possible
-            repetition_vector = math_util.integralize_vector(null_space[0])
-            # 2: cast it to a numpy
-            repetition_vector = np.array(repetition_vector, dtype=int)
-            # 2: calculate a PASS!
-            schedule = sdf_lib.get_PASS(
-                sdf_topology, repetition_vector, initial_tokens)
-            # and if it exists, create the model with the schedule
-            if schedule != []:
-                sdf_pass = [sdf_actors[idx] for idx in schedule]
-                result = SDFExecution(sdf_actors=sdf_actors,
-                                      sdf_channels=sdf_channels,
-                                      sdf_topology=sdf_topology,
-                                      sdf_repetition_vector=repetition_vector,
-                                      sdf_initial_tokens=initial_tokens,
-                                      sdf_pass=sdf_pass)
+        sdf_topology = _sdf_topology(model, constructors, sdf_actors, sdf_channels)
+        # 1: calculate the null space of every component
+        repetition_vector = np.zeros((len(sdf_actors), 1), dtype=int)
+        consistent = True
+        for component in sdf_lib.get_components(sdf_topology):
+            component_vector = _component_repetition_vector(sdf_topology, component)
+            if component_vector is None:
+                consistent = False
+                break
+            repetition_vector[component, :] = component_vector
+        if consistent:
+            result = _sdf_execution_with_pass(sdf_actors, sdf_delays, sdf_channels, sdf_topology, repetition_vector,
+                                              initial_tokens)
         # conditions for fixpoints and partial identification
         if result:
             result.compute_deduced_properties()
@@ -135,6 +107,89 @@ class SDFAppRule(IdentificationRule):
         else:
             return (False, None)
 
+    def patch(self, model, identified, previous, diff):
+        '''Reuse the previous SDF application if only actor rates changed
+
+        The repetition vector is recomputed only for the connected
+        components of the application that have actors with new rates.
+        '''
+        prev = next((p for p in previous if isinstance(p, SDFExecution)), None)
+        if not prev or diff.restructured((SDFComb, SDFPrefix, Process, Signal)):
+            return None
+        changed_constructors = diff.changed_of_type((SDFComb, ))
+        if not changed_constructors:
+            return (True, prev)
+        constructors = [c for c in model if isinstance(c, SDFComb)]
+        sdf_topology = _sdf_topology(model, constructors, prev.sdf_actors, prev.sdf_channels)
+        changed_actors = set(
+            prev.sdf_actors.index(a) for c in changed_constructors for a in model.adj[c] if a in prev.sdf_actors)
+        repetition_vector = prev.sdf_repetition_vector.copy().reshape((-1, 1))
+        for component in sdf_lib.get_components(sdf_topology):
+            if not changed_actors.intersection(component):
+                continue
+            component_vector = _component_repetition_vector(sdf_topology, component)
+            if component_vector is None:
+                return (False, None)
+            repetition_vector[component, :] = component_vector
+        result = _sdf_execution_with_pass(prev.sdf_actors, prev.sdf_delays, prev.sdf_channels, sdf_topology,
+                                          repetition_vector, prev.sdf_initial_tokens)
+        if result:
+            result.compute_deduced_properties()
+            return (True, result)
+        return (False, None)
+
+
+def _sdf_topology(model, constructors: List[Vertex], sdf_actors: List[Vertex],
+                  sdf_channels: List[Tuple[Vertex, Vertex, List[Vertex]]]) -> np.ndarray:
+    sdf_topology = np.zeros((len(sdf_channels), len(sdf_actors)), dtype=int)
+    actors_enum = {a: i for (i, a) in enumerate(sdf_actors)}
+    for (cidx, (s, t, path)) in enumerate(sdf_channels):
+        sidx = actors_enum[s]
+        tidx = actors_enum[t]
+        # get the relevant port for the source and target actors
+        # in this channel, assuming there is only one edge
+        # connecting them
+        # TODO: maybe find a way to generalize properly to multigraphs?
+        out_port = next(v["object"].source_vertex_port for (k, v) in model[s][path[0]].items())
+        in_port = next(v["object"].target_vertex_port for (k, v) in model[path[-1]][t].items())
+        # get the constructor of the actors
+        s_constructor = next(c for c in constructors if s in model[c])
+        t_constructor = next(c for c in constructors if t in model[c])
+        # look in their properties what is the production associated
+        # with the channel, for the source and for the target
+        sdf_topology[cidx, sidx] = int(s_constructor.get_production()[out_port.identifier])
+        sdf_topology[cidx, tidx] = -int(t_constructor.get_consumption()[in_port.identifier])
+    return sdf_topology
+
+
+def _component_repetition_vector(sdf_topology: np.ndarray, component: List[int]) -> Optional[np.ndarray]:
+    '''Get the repetition vector of a connected component, as a column, or None if it is inconsistent'''
+    if len(component) == 1:
+        return np.ones((1, 1), dtype=int)
+    rows = np.nonzero(np.any(sdf_topology[:, component] != 0, axis=1))[0]
+    null_space = sympy.Matrix(sdf_topology[np.ix_(rows, component)]).nullspace()
+    if len(null_space) != 1:
+        return None
+    # transform the vector into the least integer multiple possible
+    return np.array(math_util.integralize_vector(null_space[0]), dtype=int).reshape((-1, 1))
+
+
+def _sdf_execution_with_pass(sdf_actors, sdf_delays, sdf_channels, sdf_topology, repetition_vector,
+                             initial_tokens) -> Optional[SDFExecution]:
+    # 2: calculate a PASS!
+    schedule = sdf_lib.get_PASS(sdf_topology, repetition_vector, initial_tokens)
+    # and if it exists, create the model with the schedule
+    if schedule != []:
+        sdf_pass = [sdf_actors[idx] for idx in schedule]
+        return SDFExecution(sdf_actors=sdf_actors,
+                            sdf_channels=sdf_channels,
+                            sdf_delays=sdf_delays,
+                            sdf_topology=sdf_topology,
+                            sdf_repetition_vector=repetition_vector,
+                            sdf_initial_tokens=initial_tokens,
+                            sdf_pass=sdf_pass)
+    return None
+
 
 class SDFOrderRule(IdentificationRule):
     '''This Rule Identifies possible parallel ordered schedules atop 'SDFExecution'.
@@ -161,6 +216,17 @@ class SDFOrderRule(IdentificationRule):
         else:
             return (False, None)
 
+    def patch(self, model, identified, previous, diff):
+        prev = next((p for p in previous if isinstance(p, SDFToOrders)), None)
+        sdf_exec_sub = next((p for p in identified if isinstance(p, SDFExecution)), None)
+        if not prev or diff.restructured((AbstractOrdering, )):
+            return None
+        if not sdf_exec_sub:
+            return (False, None)
+        res = SDFToOrders(sdf_exec_sub=sdf_exec_sub, orderings=prev.orderings)
+        res.compute_deduced_properties()
+        return (True, res)
+
 
 class SDFToCoresRule(IdentificationRule):
     '''This 'IdentificationRule' identifies processing units atop 'SDFToOrders'
@@ -184,35 +250,16 @@ class SDFToCoresRule(IdentificationRule):
             comms = [p for p in model if isinstance(
                 p, AbstractCommunicationComponent)]
             # find all cores that are connected between each other
-            connections: List[Tuple[Vertex, Vertex, List[Vertex]]] = []
-            for s in cores:
-                for t in cores:
-                    if s != t:
-                        try:
-                            for path in nx.all_shortest_paths(model, s, t):
-                                path = path[1:-1]
-                                if all(isinstance(v, AbstractCommunicationComponent) for v in path):
-                                    connections.append((s, t, path))
-                        except nx.exception.NetworkXNoPath:
-                            pass
-            # for (cidx, (s, t, _)) in enumerate(connections):
-            #     for path in nx.all_shortest_paths(model, s, t):
-            #         path = path[1:-1]
-            #         if all(isinstance(v, AbstractCommunicationComponent) for v in path):
-            #             connections[cidx] = (s, t, path)
-            # take away any non connected paths
-            # connections = [(s, t, p) for (s, t, p) in connections if p]
+            (connections, comms_path) = route_platform(model, cores, comms)
             # there must be orderings for both execution and communication
-            comms_capacity = [1 for c in comms]
-            for (i, c) in enumerate(comms):
-                if isinstance(c, TimeDivisionMultiplexer):
-                    comms_capacity[i] = int(c.get_slots())
+            comms_capacity = _comms_capacity(comms)
             if len(cores) + len(comms) >= len(sdf_orders_sub.orderings):
                 res = SDFToMultiCore(sdf_orders_sub=sdf_orders_sub,
                                      cores=cores,
                                      comms=comms,
                                      connections=connections,
-                                     comms_capacity=comms_capacity)
+                                     comms_capacity=comms_capacity,
+                                     comms_path=comms_path)
         # conditions for fixpoints and partial identification
         if res:
             res.compute_deduced_properties()
@@ -222,6 +269,33 @@ class SDFToCoresRule(IdentificationRule):
         else:
             return (False, None)
 
+    def patch(self, model, identified, previous, diff):
+        '''Reuse the previous platform, and its paths, if it was not rewired'''
+        prev = next((p for p in previous if isinstance(p, SDFToMultiCore)), None)
+        sdf_orders_sub = next((p for p in identified if isinstance(p, SDFToOrders)), None)
+        if not prev or diff.restructured((AbstractProcessingComponent, AbstractCommunicationComponent)):
+            return None
+        if not sdf_orders_sub:
+            return (False, None)
+        if len(prev.cores) + len(prev.comms) < len(sdf_orders_sub.orderings):
+            return (True, None)
+        res = SDFToMultiCore(sdf_orders_sub=sdf_orders_sub,
+                             cores=prev.cores,
+                             comms=prev.comms,
+                             connections=prev.connections,
+                             comms_capacity=_comms_capacity(prev.comms),
+                             comms_path=prev.comms_path)
+        res.compute_deduced_properties()
+        return (True, res)
+
+
+def _comms_capacity(comms: List[Vertex]) -> List[int]:
+    comms_capacity = [1 for c in comms]
+    for (i, c) in enumerate(comms):
+        if isinstance(c, TimeDivisionMultiplexer):
+            comms_capacity[i] = int(c.get_slots())
+    return comms_capacity
+
 
 class SDFToCoresCharacterizedRule(IdentificationRule):
     '''This 'IdentificationRule' add WCET and WCCT atop 'SDFToCoresRule'
@@ -240,7 +314,7 @@ class SDFToCoresCharacterizedRule(IdentificationRule):
             wcet_vertexes = [w for w in model if isinstance(w, WCET)]
             token_wcct_vertexes = [w for w in model
                                    if isinstance(w, WCCT)]  # list(model.get_vertexes(WCCT.get_instance()))
-            wcet = np.zeros((len(cores), len(sdf_actors)), dtype=int)
+            wcet = np.zeros((len(sdf_actors), len(cores)), dtype=int)
             token_wcct = np.zeros((len(sdf_channels), len(comms)), dtype=int)
             # information is available for all actors
             # for all p,a; exists a wcet connected to them
@@ -266,33 +340,19 @@ class SDFToCoresCharacterizedRule(IdentificationRule):
             # the WCET resulting from their interaction
             for (aidx, a) in enumerate(sdf_actors):
                 for (pidx, p) in enumerate(cores):
-                    wcet[aidx, pidx] = max(
-                        (int(w.properties['time'])
-                         for w in model.predecessors(a) if w in model.predecessors(p) and isinstance(w, WCET)),
-                        default=0)
+                    wcet[aidx, pidx] = _wcet(model, a, p)
             # iterate through all elements of a channel and take the
             # maximum of the WCCTs for that path, since in a channels it is
             # expected that the data type is the same along the entire path
             for (cidx, (_, _, path)) in enumerate(sdf_channels):
                 for (pidx, p) in enumerate(comms):
-                    token_wcct[cidx, pidx] = max(
-                        (int(w.properties['time']) for e in path
-                         for w in model.predecessors(e) if w in model.predecessors(p) and isinstance(w, WCCT)),
-                        default=0)
+                    token_wcct[cidx, pidx] = _token_wcct(model, path, p)
             # although there should be only one Th vertex
             # per application, we apply maximun just in case
             # someone forgot to make sure there is only one annotation
             # per application
             goals_vertexes = [v for v in model if isinstance(v, Goal)]
-            throughput_vertexes = [
-                v for v in goals_vertexes if isinstance(v, MinimumThroughput)]
-            throughput_importance = 0
-            # check that all actors are covered by a throughput goal
-            if all(
-                    sum(1 for p in nx.all_simple_paths(model, g, a)) > 0 for g in throughput_vertexes
-                    for a in sdf_actors):
-                throughput_importance = max((int(v.properties['apriori_importance']) for v in throughput_vertexes),
-                                            default=0)
+            throughput_importance = _throughput_importance(model, goals_vertexes, sdf_actors)
             # if all wcets are valid, the model is considered characterized
             if 0 not in np.unique(wcet):
                 res = SDFToMultiCoreCharacterized(sdf_mpsoc_sub=sdf_mpsoc_sub,
@@ -311,6 +371,79 @@ class SDFToCoresCharacterizedRule(IdentificationRule):
         else:
             return (False, None)
 
+    def patch(self, model, identified, previous, diff):
+        '''Recompute only the WCET and WCCT entries affected by the changes
+
+        Rows of actors and channels that were already characterized and
+        whose annotations did not change are copied from the previous
+        matrices. The platform must be the same as before.
+        '''
+        prev = next((p for p in previous if isinstance(p, SDFToMultiCoreCharacterized)), None)
+        sdf_mpsoc_sub = next((p for p in identified if isinstance(p, SDFToMultiCore)), None)
+        if not prev:
+            return None
+        if not sdf_mpsoc_sub:
+            return (False, None)
+        (cores, comms) = (sdf_mpsoc_sub.cores, sdf_mpsoc_sub.comms)
+        if cores != prev.sdf_mpsoc_sub.cores or comms != prev.sdf_mpsoc_sub.comms:
+            return None
+        sdf_exec = sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub
+        prev_exec = prev.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub
+        # anything that was (un)annotated or is annotated by a changed annotation must be recomputed
+        stale = diff.edge_endpoints()
+        stale.update(t.identifier for w in diff.changed_of_type((WCET, WCCT)) for t in model.successors(w))
+        prev_actors = {a: i for (i, a) in enumerate(prev_exec.sdf_actors)}
+        wcet = np.zeros((len(sdf_exec.sdf_actors), len(cores)), dtype=int)
+        for (aidx, a) in enumerate(sdf_exec.sdf_actors):
+            if a in prev_actors and a.identifier not in stale:
+                wcet[aidx, :] = prev.wcet[prev_actors[a], :]
+            else:
+                wcet[aidx, :] = [_wcet(model, a, p) for p in cores]
+        prev_channels = {(s, t, tuple(path)): i for (i, (s, t, path)) in enumerate(prev_exec.sdf_channels)}
+        token_wcct = np.zeros((len(sdf_exec.sdf_channels), len(comms)), dtype=int)
+        for (cidx, (s, t, path)) in enumerate(sdf_exec.sdf_channels):
+            key = (s, t, tuple(path))
+            if key in prev_channels and not any(e.identifier in stale for e in path):
+                token_wcct[cidx, :] = prev.token_wcct[prev_channels[key], :]
+            else:
+                token_wcct[cidx, :] = [_token_wcct(model, path, p) for p in comms]
+        goals_vertexes = [v for v in model if isinstance(v, Goal)]
+        throughput_importance = prev.throughput_importance
+        if diff.touches((Goal, )) or sdf_exec.sdf_actors != prev_exec.sdf_actors:
+            throughput_importance = _throughput_importance(model, goals_vertexes, sdf_exec.sdf_actors)
+        if 0 in np.unique(wcet):
+            return (True, None)
+        res = SDFToMultiCoreCharacterized(sdf_mpsoc_sub=sdf_mpsoc_sub,
+                                          wcet_vertexes=[w for w in model if isinstance(w, WCET)],
+                                          token_wcct_vertexes=[w for w in model if isinstance(w, WCCT)],
+                                          wcet=wcet,
+                                          token_wcct=token_wcct,
+                                          throughput_importance=throughput_importance,
+                                          latency_importance=prev.latency_importance,
+                                          goals_vertexes=goals_vertexes)
+        res.compute_deduced_properties()
+        return (True, res)
+
+
+def _wcet(model, actor: Vertex, core: Vertex) -> int:
+    return max((int(w.properties['time'])
+                for w in model.predecessors(actor) if w in model.predecessors(core) and isinstance(w, WCET)),
+               default=0)
+
+
+def _token_wcct(model, path: List[Vertex], comm: Vertex) -> int:
+    return max((int(w.properties['time'])
+                for e in path for w in model.predecessors(e) if w in model.predecessors(comm) and isinstance(w, WCCT)),
+               default=0)
+
+
+def _throughput_importance(model, goals_vertexes: List[Vertex], sdf_actors: List[Vertex]) -> int:
+    throughput_vertexes = [v for v in goals_vertexes if isinstance(v, MinimumThroughput)]
+    # check that all actors are covered by a throughput goal
+    if all(nx.has_path(model, g, a) for g in throughput_vertexes for a in sdf_actors):
+        return max((int(v.properties['apriori_importance']) for v in throughput_vertexes), default=0)
+    return 0
+
 
 class SDFMulticoreToJobsRule(IdentificationRule):
 
@@ -366,6 +499,6 @@ class SDFMulticoreToJobsRule(IdentificationRule):
             return (False, None)
 
 
-_standard_rules_classes=[
-    SDFAppRule, SDFOrderRule, SDFToCoresRule, SDFToCoresCharacterizedRule, SDFMulticoreToJobsRule
-]
+# 'SDFMulticoreToJobsRule' is not standard, as 'sdf_lib.sdf_to_hsdf' does not
+# expand the actors into jobs yet and the rule cannot run to completion.
+_standard_rules_classes = [SDFAppRule, SDFOrderRule, SDFToCoresRule, SDFToCoresCharacterizedRule]
@@ -0,0 +1,118 @@
+'''Symmetries of the platform in the data of the MPSoC MiniZinc model
+
+Platforms often have many identical cores, i.e. with the same WCETs for
+every actor and connected in the same way to the rest of the platform,
+so every solution of the MiniZinc model comes with a copy for every
+permutation of them. The cores and communication elements are split in
+equivalence classes, first by colour refinement of the platform graph,
+where the colour of an element starts as its characterization and is
+refined by the colours of the paths through it, and then by checking
+that swapping two cores of a class, together with the communication
+elements their paths go through, leaves all the data unchanged.
+
+Every core of a class can then take the place of any other, so the model
+orders the mapping of the cores of a class lexicographically and only
+one solution of every permutation is explored.
+'''
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+
+def _refine(colours: List[Any], signatures: List[Any]) -> List[int]:
+    keys = [(c, s) for (c, s) in zip(colours, signatures)]
+    index = {k: i for (i, k) in enumerate(sorted(set(keys), key=repr))}
+    return [index[k] for k in keys]
+
+
+def _paths_from(path: np.ndarray, comms: List[int], p: int, q: int) -> Tuple[int, ...]:
+    return tuple(comms[u] for u in sorted(np.nonzero(path[p, q])[0], key=lambda u: path[p, q, u]))
+
+
+def _colour_refinement(wcet: np.ndarray, token_wcct: np.ndarray, capacity: np.ndarray,
+                       path: np.ndarray) -> Tuple[List[int], List[int]]:
+    (num_procs, num_comms) = (wcet.shape[1], token_wcct.shape[1])
+    procs = _refine([0] * num_procs, [tuple(wcet[:, p].tolist()) for p in range(num_procs)])
+    comms = _refine([0] * num_comms, [(tuple(token_wcct[:, u].tolist()), int(capacity[u])) for u in range(num_comms)])
+    while True:
+        proc_signatures = []
+        for p in range(num_procs):
+            outgoing = sorted((procs[q], _paths_from(path, comms, p, q)) for q in range(num_procs) if q != p)
+            incoming = sorted((procs[q], _paths_from(path, comms, q, p)) for q in range(num_procs) if q != p)
+            proc_signatures.append((tuple(outgoing), tuple(incoming)))
+        comm_signatures = []
+        for u in range(num_comms):
+            through = zip(*np.nonzero(path[:, :, u]))
+            comm_signatures.append(tuple(sorted((procs[p], procs[q], int(path[p, q, u])) for (p, q) in through)))
+        refined_procs = _refine(procs, proc_signatures)
+        refined_comms = _refine(comms, comm_signatures)
+        if len(set(refined_procs)) == len(set(procs)) and len(set(refined_comms)) == len(set(comms)):
+            return (refined_procs, refined_comms)
+        (procs, comms) = (refined_procs, refined_comms)
+
+
+def _swap_comms(path: np.ndarray, swap: np.ndarray) -> Optional[np.ndarray]:
+    '''Get the permutation of the comms that goes with the permutation 'swap' of the cores, if there is one'''
+    mapping = -np.ones(path.shape[2], dtype=int)
+    for x in range(path.shape[0]):
+        for y in range(path.shape[0]):
+            before = sorted(np.nonzero(path[x, y])[0], key=lambda u: path[x, y, u])
+            after = sorted(np.nonzero(path[swap[x], swap[y]])[0], key=lambda u: path[swap[x], swap[y], u])
+            if len(before) != len(after):
+                return None
+            for (u, v) in zip(before, after):
+                if mapping[u] not in (-1, v):
+                    return None
+                mapping[u] = v
+    # elements not in any path stay in place
+    unused = mapping < 0
+    mapping[unused] = np.nonzero(unused)[0]
+    if len(set(mapping.tolist())) < len(mapping):
+        return None
+    return mapping
+
+
+def _is_symmetry(wcet: np.ndarray, token_wcct: np.ndarray, capacity: np.ndarray, path: np.ndarray, p: int,
+                 q: int) -> bool:
+    swap = np.arange(path.shape[0])
+    (swap[p], swap[q]) = (q, p)
+    # cores sharing the same elements, as in a bus, swap without moving any element
+    shared = np.array_equal(path[np.ix_(swap, swap)], path)
+    mapping = np.arange(path.shape[2]) if shared else _swap_comms(path, swap)
+    if mapping is None:
+        return False
+    return bool(
+        np.array_equal(wcet[:, p], wcet[:, q]) and np.array_equal(token_wcct[:, mapping], token_wcct)
+        and np.array_equal(capacity[mapping], capacity) and np.array_equal(path[np.ix_(swap, swap, mapping)], path))
+
+
+def mpsoc_symmetries(data: Dict[str, Any]) -> Dict[str, Any]:
+    '''Find the classes of interchangeable cores in the data of 'sdf_mpsoc_linear_dmodel.mzn'
+
+    Returns:
+        The data array 'proc_class', with the 1-based index of the first
+        core of the class of every core. Cores are only classed together
+        if swapping them is a symmetry of the data. The send variables
+        follow from the paths of the cores, so the communication elements
+        need no class of their own.
+    '''
+    (num_procs, num_comms) = (len(data['procs']), len(data['comms']))
+    wcet = np.array(data['wcet'], dtype=int).reshape((len(data['sdf_actors']), num_procs))
+    token_wcct = np.array(data['token_wcct'], dtype=int).reshape((len(data['sdf_channels']), num_comms))
+    capacity = np.array(data['comms_capacity'], dtype=int).reshape(-1)
+    path = np.array(data['path'], dtype=int).reshape((num_procs, num_procs, num_comms))
+    (procs, _) = _colour_refinement(wcet, token_wcct, capacity, path)
+    proc_class = list(range(1, num_procs + 1))
+    for p in range(num_procs):
+        if proc_class[p] != p + 1:
+            continue
+        # swaps with the first core generate every permutation of the class
+        for q in range(p + 1, num_procs):
+            if proc_class[q] == q + 1 and procs[q] == procs[p] and _is_symmetry(
+                    wcet, token_wcct, capacity, path, p, q):
+                proc_class[q] = p + 1
+    return {'proc_class': proc_class}
@@ -0,0 +1,341 @@
+'''MILP models of the linear decision models, solved with SciPy and HiGHS
+
+The MiniZinc models of the SDF decision models only use linear
+constraints besides the sharing of the communication elements, so they
+are built here as sparse mixed integer linear programs, straight from
+the matrices of the decision models, and solved by 'scipy.optimize.milp',
+which runs HiGHS in process.
+
+The MPSoC model has the same variables as 'sdf_mpsoc_linear_dmodel.mzn',
+and the transfers of tokens between cores wait for the step producing
+them, go through the elements of their path in order and end before the
+step consuming them, with big-M constraints on whether tokens flow. The
+slots of the TDMA elements are only counted in the throughput objective,
+i.e. the largest load of a core or of an element per slot, so the
+transfers of a solution are then list scheduled in the order of the
+solution to share the slots, which gives its start times and latency.
+
+The orders model follows 'sdf_order_linear_dmodel.mzn', with at most one
+firing in every step of an order, and is only checked for feasibility.
+'''
+import datetime
+import time
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds
+from scipy.optimize import LinearConstraint
+from scipy.optimize import milp
+
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+# status name, solution in the shape of the MiniZinc results or None, and solver statistics
+MILPOutput = Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]
+
+# names of the statuses of 'scipy.optimize.milp', by whether a solution was found
+MILP_STATUS = {0: 'OPTIMAL', 1: 'UNKNOWN', 2: 'INFEASIBLE', 3: 'UNBOUNDED', 4: 'ERROR'}
+
+
+def milp_size(decision_model) -> int:
+    '''Estimate the number of variables of the MILP model of 'decision_model' '''
+    if isinstance(decision_model, SDFToMultiCoreCharacterized):
+        mpsoc = decision_model.sdf_mpsoc_sub
+        sdf_exec = mpsoc.sdf_orders_sub.sdf_exec_sub
+        (c, p, s) = (len(sdf_exec.sdf_channels), len(mpsoc.cores), mpsoc.max_steps)
+        hops = int(np.count_nonzero(mpsoc.comms_path))
+        return len(sdf_exec.sdf_actors) * p * s + p * s + c * (p * s + (p * p + hops) * s * s * 2) + 2
+    sdf_exec = decision_model.sdf_exec_sub
+    o = max(len(decision_model.orderings), 1)
+    s = -(-len(sdf_exec.sdf_pass) // o)
+    return len(sdf_exec.sdf_channels) * o * (s + 1) * (o + 1) + len(sdf_exec.sdf_actors) * o * s
+
+
+class _LinearModel(object):
+    '''Columns and sparse rows of a MILP, assembled as coordinates'''
+
+    def __init__(self):
+        self.lower: List[np.ndarray] = []
+        self.upper: List[np.ndarray] = []
+        self.integral: List[np.ndarray] = []
+        self.columns = 0
+        (self.row_index, self.col_index, self.coefs) = ([], [], [])
+        (self.row_lower, self.row_upper) = ([], [])
+
+    def add_variables(self, count: int, lower: Any = 0, upper: Any = np.inf, integral: bool = True) -> np.ndarray:
+        '''Add 'count' variables and get their columns'''
+        columns = np.arange(self.columns, self.columns + count)
+        self.columns += count
+        self.lower.append(np.broadcast_to(np.asarray(lower, dtype=float), (count, )))
+        self.upper.append(np.broadcast_to(np.asarray(upper, dtype=float), (count, )))
+        self.integral.append(np.full(count, 1 if integral else 0))
+        return columns
+
+    def add_row(self, columns: Any, coefs: Any, lower: float = -np.inf, upper: float = np.inf) -> None:
+        '''Add the constraint lower <= sum(coefs * columns) <= upper'''
+        columns = np.asarray(columns, dtype=int).reshape(-1)
+        self.row_index.append(np.full(len(columns), len(self.row_lower)))
+        self.col_index.append(columns)
+        self.coefs.append(np.broadcast_to(np.asarray(coefs, dtype=float).reshape(-1), columns.shape))
+        self.row_lower.append(lower)
+        self.row_upper.append(upper)
+
+    def solve(self, objective: np.ndarray, time_limit: Optional[datetime.timedelta] = None):
+        matrix = sparse.coo_matrix((np.concatenate(self.coefs), (np.concatenate(self.row_index),
+                                                                 np.concatenate(self.col_index))),
+                                   shape=(len(self.row_lower), self.columns)).tocsr()
+        options = {'disp': False}
+        if time_limit is not None:
+            options['time_limit'] = time_limit.total_seconds()
+        return milp(objective,
+                    constraints=LinearConstraint(matrix, self.row_lower, self.row_upper),
+                    integrality=np.concatenate(self.integral),
+                    bounds=Bounds(np.concatenate(self.lower), np.concatenate(self.upper)),
+                    options=options)
+
+
+def _solve(model: _LinearModel, objective: np.ndarray,
+           time_limit: Optional[datetime.timedelta]) -> Tuple[str, Any, Dict[str, Any]]:
+    start = time.perf_counter()
+    res = model.solve(objective, time_limit)
+    wall_time = time.perf_counter() - start
+    status = MILP_STATUS.get(res.status, 'ERROR')
+    if res.status == 1 and res.x is not None:
+        status = 'FEASIBLE'
+    statistics = {
+        'solveTime': wall_time,
+        'variables': model.columns,
+        'constraints': len(model.row_lower),
+        'nodes': getattr(res, 'mip_node_count', None),
+        'objectiveBound': getattr(res, 'mip_dual_bound', None),
+        'gap': getattr(res, 'mip_gap', None),
+        # HiGHS does not report intermediate solutions through SciPy
+        'solutions': [(wall_time, float(res.fun))] if res.x is not None else []
+    }
+    return (status, res.x if res.x is not None else None, statistics)
+
+
+def _list_schedule(precedences: nx.DiGraph, durations: Dict[Any, int], elements: Dict[Any, int],
+                   capacity: List[int], order: Dict[Any, float]) -> Dict[Any, int]:
+    '''Start every task as soon as its predecessors end and its element, if any, has a free slot'''
+    starts: Dict[Any, int] = dict()
+    busy: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for task in nx.lexicographical_topological_sort(precedences, key=lambda t: (order[t], str(t))):
+        ready = max((starts[p] + durations[p] for p in precedences.predecessors(task)), default=0)
+        duration = durations[task]
+        u = elements.get(task, None)
+        if u is not None and duration > 0:
+            candidates = sorted(set([ready] + [e for (_, e) in busy[u] if e > ready]))
+            for begin in candidates:
+                overlapping = [(s, e) for (s, e) in busy[u] if s < begin + duration and e > begin]
+                points = [begin] + [s for (s, _) in overlapping if s > begin]
+                if all(sum(1 for (s, e) in overlapping if s <= x < e) < capacity[u] for x in points):
+                    ready = begin
+                    break
+            busy[u].append((ready, ready + duration))
+        starts[task] = ready
+    return starts
+
+
+def solve_mpsoc(decision_model: SDFToMultiCoreCharacterized,
+                time_limit: Optional[datetime.timedelta] = None) -> MILPOutput:
+    '''Solve the MPSoC decision model as a MILP
+
+    Returns:
+        The status name, the solution in the shape of the MiniZinc
+        results or None if none was found, and the solver statistics.
+    '''
+    data = decision_model.get_mzn_data()
+    wcet = np.array(data['wcet'], dtype=int)
+    topology = np.array(data['sdf_topology'], dtype=int)
+    token_wcct = np.array(data['token_wcct'], dtype=int)
+    path = np.array(data['path'], dtype=int)
+    activations = np.array(data['activations'], dtype=int)
+    max_tokens = [int(t) for t in data['max_tokens']]
+    capacity = [int(k) for k in data['comms_capacity']]
+    (num_actors, num_procs) = wcet.shape
+    (num_channels, num_comms) = token_wcct.shape
+    num_steps = int(data['max_steps'])
+    horizon = int(np.sum(activations.reshape((-1, 1)) * wcet)) + sum(
+        max_tokens[c] * int(np.sum(token_wcct[c])) for c in range(num_channels)) * num_procs * num_steps * num_steps
+    model = _LinearModel()
+    # mapping and steps
+    usable = np.repeat((wcet > 0)[:, :, None], num_steps, axis=2)
+    mapped = model.add_variables(num_actors * num_procs * num_steps, 0,
+                                 np.where(usable, activations[:, None, None], 0).reshape(-1)).reshape(
+                                     (num_actors, num_procs, num_steps))
+    for a in range(num_actors):
+        model.add_row(mapped[a], 1, activations[a], activations[a])
+    start = model.add_variables(num_procs * num_steps, 0, horizon, integral=False).reshape((num_procs, num_steps))
+    for p in range(num_procs):
+        for t in range(1, num_steps):
+            # start[p, t - 1] + busy[p, t - 1] <= start[p, t]
+            model.add_row(np.concatenate([[start[p, t - 1], start[p, t]], mapped[:, p, t - 1]]),
+                          np.concatenate([[1, -1], wcet[:, p]]),
+                          upper=0)
+    # token flows between steps, only to the next step within a core
+    # and only between cores with a path between them
+    hops = {(p, pp): [int(u) for u in sorted(np.nonzero(path[p, pp])[0], key=lambda u: path[p, pp, u])]
+            for p in range(num_procs) for pp in range(num_procs)}
+    keys = [(c, p, pp, t, tt) for c in range(num_channels) for (p, pp) in hops for t in range(num_steps)
+            for tt in range(num_steps) if (p == pp and tt == t + 1) or (p != pp and hops[p, pp])]
+    flows = model.add_variables(len(keys), 0, [max_tokens[k[0]] for k in keys])
+    flow = dict(zip(keys, flows))
+    (inflow, outflow) = (defaultdict(list), defaultdict(list))
+    for ((c, p, pp, t, tt), f) in flow.items():
+        outflow[c, p, t].append(f)
+        inflow[c, pp, tt].append(f)
+    for c in range(num_channels):
+        for p in range(num_procs):
+            for t in range(num_steps):
+                (ins, outs) = (inflow[c, p, t], outflow[c, p, t])
+                # buffer_start + firings = buffer_end
+                model.add_row(np.concatenate([ins, outs, mapped[:, p, t]]),
+                              np.concatenate([np.ones(len(ins)), -np.ones(len(outs)), topology[c]]), 0, 0)
+                model.add_row(ins, 1, upper=max_tokens[c])
+                model.add_row(outs, 1, upper=max_tokens[c])
+        model.add_row(np.concatenate([inflow[c, p, 0] for p in range(num_procs)] + [[]]), 1,
+                      lower=int(data['initial_tokens'][c]))
+    # transfers through the elements of their paths
+    crossing = [k for k in keys if k[1] != k[2]]
+    present = dict(zip(crossing, model.add_variables(len(crossing), 0, 1)))
+    sends: Dict[Tuple[int, ...], int] = dict()
+    loads: List[List[Tuple[int, int]]] = [[] for _ in range(num_comms)]
+    for (key, b) in present.items():
+        (c, p, pp, t, tt) = key
+        f = flow[key]
+        model.add_row([f, b], [1, -max_tokens[c]], upper=0)
+        model.add_row([f, b], [1, -1], lower=0)
+        # the previous hop ends, or the producing step, before the next hop starts if tokens flow
+        (previous, coefs) = (np.concatenate([[start[p, t]], mapped[:, p, t]]), np.concatenate([[1], wcet[:, p]]))
+        for u in hops[p, pp]:
+            s = model.add_variables(1, 0, horizon, integral=False)[0]
+            model.add_row([s, b], [1, -horizon], upper=0)
+            model.add_row(np.concatenate([[s, b], previous]), np.concatenate([[1, -horizon], -coefs]), lower=-horizon)
+            sends[key + (u, )] = s
+            loads[u].append((f, int(token_wcct[c, u])))
+            (previous, coefs) = (np.array([s, f]), np.array([1, token_wcct[c, u]]))
+        model.add_row(np.concatenate([[start[pp, tt], b], previous]),
+                      np.concatenate([[1, -horizon], -coefs]),
+                      lower=-horizon)
+    # objectives
+    (throughput, latency) = model.add_variables(2, 0, horizon, integral=False)
+    for p in range(num_procs):
+        model.add_row(np.concatenate([[throughput], mapped[:, p, :].reshape(-1)]),
+                      np.concatenate([[1], -np.repeat(wcet[:, p], num_steps)]),
+                      lower=0)
+        model.add_row(np.concatenate([[latency, start[p, -1]], mapped[:, p, -1]]),
+                      np.concatenate([[1, -1], -wcet[:, p]]),
+                      lower=0)
+    for u in range(num_comms):
+        if loads[u]:
+            model.add_row([throughput] + [f for (f, _) in loads[u]],
+                          [max(capacity[u], 1)] + [-w for (_, w) in loads[u]],
+                          lower=0)
+    weights = np.array(data['objective_weights'], dtype=float)
+    objective = np.zeros(model.columns)
+    objective[[throughput, latency]] = weights
+    (status, x, statistics) = _solve(model, objective, time_limit)
+    if x is None:
+        return (status, None, statistics)
+    # share the slots of the elements, keeping the order of the solution
+    mapped_values = np.rint(x[mapped]).astype(int)
+    busy = np.einsum('ap,apt->pt', wcet, mapped_values)
+    flow_values = {k: int(round(x[f])) for (k, f) in flow.items()}
+    precedences = nx.DiGraph()
+    (durations, elements, order) = (dict(), dict(), dict())
+    for p in range(num_procs):
+        for t in range(num_steps):
+            (durations[p, t], order[p, t]) = (int(busy[p, t]), float(x[start[p, t]]))
+            precedences.add_node((p, t))
+            if t > 0:
+                precedences.add_edge((p, t - 1), (p, t))
+    for key in crossing:
+        if flow_values[key] == 0:
+            continue
+        (c, p, pp, t, tt) = key
+        previous = (p, t)
+        for u in hops[p, pp]:
+            hop = key + (u, )
+            (durations[hop], elements[hop]) = (flow_values[key] * int(token_wcct[c, u]), u)
+            order[hop] = float(x[sends[hop]])
+            precedences.add_edge(previous, hop)
+            previous = hop
+        precedences.add_edge(previous, (pp, tt))
+    starts = _list_schedule(precedences, durations, elements, capacity, order)
+    send_start = np.zeros((num_channels, num_procs, num_procs, num_steps, num_steps, num_comms), dtype=int)
+    send_duration = np.zeros_like(send_start)
+    for hop in elements:
+        (send_start[hop], send_duration[hop]) = (starts[hop], durations[hop])
+    buffer_start = np.zeros((num_channels, num_procs, num_steps), dtype=int)
+    for ((c, p, pp, t, tt), v) in flow_values.items():
+        buffer_start[c, pp, tt] += v
+    values = [
+        max(int(np.max(np.sum(busy, axis=1))),
+            max([-(-int(np.sum(send_duration[..., u])) // max(capacity[u], 1)) for u in range(num_comms)], default=0)),
+        max(starts[p, num_steps - 1] + durations[p, num_steps - 1] for p in range(num_procs))
+    ]
+    results = {
+        'mapped_actors': mapped_values.tolist(),
+        'buffer_start': buffer_start.tolist(),
+        'send_start': send_start.tolist(),
+        'send_duration': send_duration.tolist(),
+        'start': [[starts[p, t] for t in range(num_steps)] for p in range(num_procs)],
+        'objective_values': values,
+        'objective': int(np.dot(weights, values))
+    }
+    return (status, results, statistics)
+
+
+def solve_orders(decision_model: SDFToOrders,
+                 time_limit: Optional[datetime.timedelta] = None) -> MILPOutput:
+    '''Find firings of the orders model as a MILP, with the same return as 'solve_mpsoc' '''
+    data = decision_model.get_mzn_data()
+    topology = np.array(data['sdf_topology'], dtype=int)
+    activations = np.array(data['activations'], dtype=int)
+    initial_tokens = np.array(data['initial_tokens'], dtype=int)
+    (num_channels, num_actors) = topology.shape
+    (num_orders, num_steps) = (len(data['static_orders']), int(data['max_steps']))
+    max_tokens = int(max(data['max_tokens'], default=0))
+    model = _LinearModel()
+    buffer = model.add_variables(num_channels * num_orders * (num_steps + 1), 0,
+                                 max_tokens).reshape((num_channels, num_orders, num_steps + 1))
+    # tokens sent at a step arrive at the next one, and none are sent at the first
+    send = model.add_variables(num_channels * num_orders * num_orders * (num_steps + 1), 0,
+                               max_tokens).reshape((num_channels, num_orders, num_orders, num_steps + 1))
+    mapped = model.add_variables(num_actors * num_orders * num_steps, 0,
+                                 int(max(activations, default=0))).reshape((num_actors, num_orders, num_steps))
+    model.add_row(send[..., 0], 1, 0, 0)
+    for a in range(num_actors):
+        model.add_row(mapped[a], 1, activations[a], activations[a])
+    for c in range(num_channels):
+        model.add_row(buffer[c, :, 0], 1, initial_tokens[c], initial_tokens[c])
+        model.add_row(buffer[c, :, num_steps], 1, initial_tokens[c], initial_tokens[c])
+        for o in range(num_orders):
+            others = [oo for oo in range(num_orders) if oo != o]
+            for t in range(1, num_steps + 1):
+                # buffer[t] = buffer[t - 1] + firings + received - sent
+                model.add_row(
+                    np.concatenate([[buffer[c, o, t], buffer[c, o, t - 1]], mapped[:, o, t - 1],
+                                    send[c, others, o, t - 1], send[c, o, others, t]]),
+                    np.concatenate([[1, -1], -topology[c], -np.ones(len(others)), np.ones(len(others))]), 0, 0)
+    for o in range(num_orders):
+        for t in range(num_steps):
+            model.add_row(mapped[:, o, t], 1, upper=1)
+    (status, x, statistics) = _solve(model, np.zeros(model.columns), time_limit)
+    if x is None:
+        return (status, None, statistics)
+    results = {
+        'mapped': np.rint(x[mapped]).astype(int).tolist(),
+        'buffer': np.rint(x[buffer]).astype(int).tolist(),
+        'send': np.rint(x[send]).astype(int).tolist(),
+        'objective': 0
+    }
+    return (status, results, statistics)
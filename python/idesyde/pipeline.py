@@ -0,0 +1,412 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import forsyde.io.python.api as forsyde_io
+import networkx as nx
+from forsyde.io.python.api import ForSyDeModel
+
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.api import choose_decision_models
+from idesyde.identification.incremental import identify_decision_models_incremental
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.exploration import choose_explorer
+from idesyde.exploration import MinizincExplorer
+from idesyde.exploration import ComponentsParallelExplorer
+from idesyde.exploration import CPSATExplorer
+from idesyde.exploration import LNSExplorer
+from idesyde.exploration import MILPExplorer
+from idesyde.exploration import ParetoExplorer
+from idesyde.exploration import ParetoPoint
+from idesyde.exploration import pareto_table
+from idesyde.profiling import PhaseProfiler
+from idesyde.profiling import phase
+from idesyde import checkpoint
+from idesyde import snapshot
+from idesyde import sweep
+from idesyde.sweep import SweepPoint
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    '''Compute the content digest of a file
+
+    The digest is used as the key for all caches that depend on
+    an input model, so that renaming or touching a file does not
+    invalidate them but any change in its content does.
+
+    Returns:
+        The hexadecimal SHA-256 digest of the file content.
+    '''
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class PipelineCache(object):
+    '''Bounded cache of parsed models and their identification results
+
+    Entries are keyed by the content digest of the input file and
+    evicted in least recently used order. The cache is thread safe
+    so that it can be shared between concurrent pipeline runs.
+    '''
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[ForSyDeModel, List[DecisionModel]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, digest: str) -> Optional[Tuple[ForSyDeModel, List[DecisionModel]]]:
+        with self._lock:
+            entry = self._entries.get(digest, None)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            return entry
+
+    def put(self, digest: str, model: ForSyDeModel, identified: List[DecisionModel]) -> None:
+        with self._lock:
+            self._entries[digest] = (model, identified)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def parse_and_identify(model_path: str,
+                       logger: logging.Logger,
+                       cache: Optional[PipelineCache] = None,
+                       profiler: Optional[PhaseProfiler] = None,
+                       use_snapshot: bool = False,
+                       incremental: bool = False) -> Tuple[ForSyDeModel, List[DecisionModel]]:
+    '''Parse the input model and identify its decision models
+
+    If a cache is given, the input file content digest is looked up
+    first and both parsing and identification are skipped on a hit.
+    If 'use_snapshot' is set, the same happens when a snapshot of the
+    same content is found next to the input, and a fresh snapshot is
+    written otherwise. With 'incremental' also set, a stale snapshot is
+    taken as the previous version of the input, and its decision models
+    are patched instead of identified from scratch.
+    '''
+    digest = file_digest(model_path) if cache is not None or use_snapshot else None
+    if cache is not None and digest:
+        cached = cache.get(digest)
+        if cached:
+            logger.info('Model and decision model(s) taken from cache')
+            return cached
+    previous = None
+    if use_snapshot and digest:
+        loaded = None
+        with phase(profiler, 'load_snapshot'):
+            try:
+                loaded = snapshot.load_snapshot(model_path, digest)
+                if not loaded and incremental and os.path.isfile(snapshot.snapshot_path(model_path)):
+                    previous = snapshot.read_snapshot(snapshot.snapshot_path(model_path))
+            except Exception as e:
+                # e.g. written by a version with different decision models
+                logger.warning(f'Ignoring unreadable snapshot of {model_path}: {e}')
+        if loaded:
+            logger.info(f'Model and {len(loaded.identified)} decision model(s) loaded from snapshot')
+            if cache is not None:
+                cache.put(digest, loaded.model, loaded.identified)
+            return (loaded.model, loaded.identified)
+    with phase(profiler, 'parse'):
+        in_model = forsyde_io.load_model(model_path)
+    logger.info('Model parsed')
+    with phase(profiler, 'identify'):
+        if previous:
+            logger.info('Patching the decision model(s) of the previous snapshot')
+            identified = identify_decision_models_incremental(in_model,
+                                                              previous.model,
+                                                              previous.identified,
+                                                              profiler=profiler)
+        else:
+            identified = identify_decision_models(in_model, profiler=profiler)
+    logger.info(f'{len(identified)} Decision model(s) identified')
+    logger.debug(f"Decision models identified: {identified}")
+    if cache is not None and digest:
+        cache.put(digest, in_model, identified)
+    if use_snapshot and digest:
+        with phase(profiler, 'write_snapshot'):
+            try:
+                snapshot.write_snapshot(snapshot.snapshot_path(model_path), digest, in_model, identified)
+                logger.info(f'Snapshot written to {snapshot.snapshot_path(model_path)}')
+            except ValueError as e:
+                logger.warning(f'No snapshot written for {model_path}: {e}')
+    return (in_model, identified)
+
+
+def explore_decision_models(identified: List[DecisionModel],
+                            logger: logging.Logger,
+                            desired_names: List[str] = [],
+                            mzn_solver: str = 'gecode',
+                            profiler: Optional[PhaseProfiler] = None,
+                            explorer_names: List[str] = [],
+                            checkpoint_path: Optional[str] = None,
+                            resume_path: Optional[str] = None,
+                            outcome: Optional[Dict[str, Any]] = None) -> Optional[ForSyDeModel]:
+    '''Choose decision models and explorers and run the exploration
+
+    Arguments:
+        checkpoint_path: File where MiniZinc explorations keep their best
+            solution so far.
+        resume_path: Checkpoint to carry on from. The decision model it was
+            taken for is explored again, starting from its solution, and
+            checkpoints are written back to it unless 'checkpoint_path' is
+            given. It is an error if that decision model is not identified.
+        outcome: If given, the short names of the decision model and explorer
+            are put into it, with the status and objective of the solution
+            and the report of the exploration when the explorer makes them.
+
+    Returns:
+        The ForSyDe model built from the exploration decisions, or None
+        if no explorer could be chosen or no solution was found.
+    '''
+    outcome = outcome if outcome is not None else dict()
+    if resume_path:
+        resulting_model = _resume_exploration(identified, logger, resume_path, checkpoint_path or resume_path,
+                                              profiler, outcome)
+        _log_report(logger, outcome)
+        return resulting_model
+    with phase(profiler, 'choose_models'):
+        models_chosen = choose_decision_models(identified, desired_names=desired_names)
+    logger.info(f'{len(models_chosen)} Decision model(s) chosen')
+    with phase(profiler, 'choose_explorer'):
+        explorer_and_models = choose_explorer(models_chosen, desired_names=explorer_names)
+    logger.info(f'{len(explorer_and_models)} Explorer(s) and Model(s) chosen')
+    resulting_model = None
+    if len(explorer_and_models) > 0:
+        if len(explorer_and_models) > 1:
+            logger.warning("More than one explorer and model chosen. Picking one randomly")
+        (explorer, model) = random.choice(explorer_and_models)
+        logger.info(f'Exploring {model.short_name()} with {explorer.short_name()}')
+        outcome.update(decision_model=model.short_name(), explorer=explorer.short_name())
+        with phase(profiler, 'explore'):
+            if isinstance(explorer, MinizincExplorer):
+                resulting_model = explorer.explore(model,
+                                                   backend_solver_name=mzn_solver,
+                                                   profiler=profiler,
+                                                   checkpoint_path=checkpoint_path,
+                                                   outcome=outcome)
+            elif isinstance(explorer, (CPSATExplorer, MILPExplorer)):
+                resulting_model = explorer.explore(model, profiler=profiler, outcome=outcome)
+            elif isinstance(explorer, (ComponentsParallelExplorer, ParetoExplorer, LNSExplorer)):
+                resulting_model = explorer.explore(model, backend_solver_name=mzn_solver, profiler=profiler)
+            else:
+                resulting_model = explorer.explore(model)
+        logger.info('Exploration complete')
+        _log_report(logger, outcome)
+    return resulting_model
+
+
+def _log_report(logger: logging.Logger, outcome: Dict[str, Any]) -> None:
+    if outcome.get('report', None) is not None:
+        logger.info(f'Exploration report: {outcome["report"].summary()}')
+
+
+def write_exploration_report(path: str, outcome: Dict[str, Any]) -> bool:
+    '''Write the exploration report in an outcome as JSON, if the explorer made one'''
+    if outcome.get('report', None) is None:
+        return False
+    with open(path, 'w') as stream:
+        json.dump(outcome['report'].to_dict(), stream, indent=2)
+    return True
+
+
+def _resume_exploration(identified: List[DecisionModel], logger: logging.Logger, resume_path: str,
+                        checkpoint_path: str, profiler: Optional[PhaseProfiler],
+                        outcome: Dict[str, Any]) -> Optional[ForSyDeModel]:
+    resume = checkpoint.read_checkpoint(resume_path)
+    model = checkpoint.find_checkpointed(resume, identified)
+    if model is None:
+        raise ValueError(f'The checkpoint {resume_path} is for a {resume.decision_model} that is not '
+                         'identified in the input as it was, so the exploration cannot be resumed')
+    logger.info(f'Resuming {model.short_name()} from objective {resume.objective} with {resume.solver}')
+    explorer = MinizincExplorer()
+    outcome.update(decision_model=model.short_name(), explorer=explorer.short_name())
+    with phase(profiler, 'explore'):
+        resulting_model = explorer.explore(model,
+                                           backend_solver_name=resume.solver,
+                                           profiler=profiler,
+                                           checkpoint_path=checkpoint_path,
+                                           resume=resume,
+                                           outcome=outcome)
+    logger.info('Exploration complete')
+    return resulting_model
+
+
+def explore_pareto_front(identified: List[DecisionModel],
+                         logger: logging.Logger,
+                         desired_names: List[str] = [],
+                         mzn_solver: str = 'gecode',
+                         profiler: Optional[PhaseProfiler] = None,
+                         points: int = 0) -> List[ParetoPoint]:
+    '''Explore the Pareto front of throughput and latency of the first chosen decision model that has one
+
+    Arguments:
+        points: Number of latency bounds solved in parallel between the
+            extremes of the front, or 0 to sweep the whole front.
+
+    Returns:
+        The points of the front, sorted by throughput, each with the
+        ForSyDe model built from its decisions.
+    '''
+    with phase(profiler, 'choose_models'):
+        models_chosen = choose_decision_models(identified, desired_names=desired_names)
+    explorer = ParetoExplorer()
+    candidates = [m for m in models_chosen if explorer.can_explore(m)]
+    if not candidates:
+        logger.warning('No chosen decision model has throughput and latency objectives')
+        return []
+    logger.info(f'Exploring the Pareto front of {candidates[0].short_name()}')
+    with phase(profiler, 'explore'):
+        front = explorer.explore_front(candidates[0], backend_solver_name=mzn_solver, profiler=profiler, points=points)
+    logger.info(f'{len(front)} Pareto point(s) found\n{pareto_table(front)}')
+    return front
+
+
+def explore_platform_sweep(identified: List[DecisionModel],
+                           logger: logging.Logger,
+                           core_counts: List[int] = [],
+                           slot_counts: List[int] = [],
+                           mzn_solver: str = 'gecode',
+                           workers: int = 4,
+                           profiler: Optional[PhaseProfiler] = None) -> List[SweepPoint]:
+    '''Explore the first identified characterized MPSoC decision model on a grid of platforms
+
+    Arguments:
+        core_counts: Numbers of cores kept, the first ones of the platform.
+        slot_counts: Numbers of slots given to every communication element.
+        workers: Number of platforms solved at once.
+
+    Returns:
+        The result of every platform, in grid order.
+    '''
+    candidates = [m for m in identified if isinstance(m, SDFToMultiCoreCharacterized)]
+    if not candidates:
+        logger.warning('No characterized SDF to MPSoC decision model to sweep the platform of')
+        return []
+    configs = sweep.platform_grid(candidates[0], core_counts, slot_counts)
+    logger.info(f'Sweeping {len(configs)} platform(s) of {candidates[0].short_name()}')
+    with phase(profiler, 'explore'):
+        points = sweep.sweep_platform(candidates[0], configs, mzn_solver, workers=workers, profiler=profiler)
+    logger.info(f'Platform sweep complete\n{sweep.sweep_table(points)}')
+    return points
+
+
+def pareto_output_path(path: str, index: int) -> str:
+    '''Get the output path of a Pareto point, with its index before all extensions'''
+    (directory, name) = os.path.split(path)
+    (stem, dot, extensions) = name.partition('.')
+    return os.path.join(directory, f'{stem}_pareto{index}{dot}{extensions}')
+
+
+def write_outputs(in_model: ForSyDeModel,
+                  resulting_model: ForSyDeModel,
+                  outputs: List[str],
+                  logger: logging.Logger,
+                  profiler: Optional[PhaseProfiler] = None) -> List[str]:
+    with phase(profiler, 'write'):
+        out_model = nx.compose(in_model, resulting_model)
+        for out_file in outputs:
+            forsyde_io.write_model(out_model, out_file)
+            logger.info(f'Writting output model {out_file}')
+    return outputs
+
+
+def run_pipeline(model_path: str,
+                 outputs: List[str] = [],
+                 desired_names: List[str] = [],
+                 mzn_solver: str = 'gecode',
+                 logger: Optional[logging.Logger] = None,
+                 cache: Optional[PipelineCache] = None,
+                 profiler: Optional[PhaseProfiler] = None,
+                 use_snapshot: bool = False,
+                 incremental: bool = False,
+                 explorer_names: List[str] = [],
+                 pareto_points: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None,
+                 resume_path: Optional[str] = None,
+                 outcome: Optional[Dict[str, Any]] = None,
+                 report_path: Optional[str] = None) -> List[str]:
+    '''Run the full parse, identify, explore and write flow for one model
+
+    This is the flow behind the command line interface, exposed so that
+    other front-ends (such as the long running service) can reuse it.
+
+    Arguments:
+        model_path: Input ForSyDe-IO model.
+        outputs: Output files. Defaults to 'out_' prefixed to the input.
+        desired_names: Filter decision model to match these short names.
+        mzn_solver: Minizinc solver used by minizinc based explorers.
+        logger: Logger where progress is reported.
+        cache: Optional cache for parsed models and identification results.
+        profiler: Optional profiler where the time spent in each phase is kept.
+        use_snapshot: Load the parsed and identified model from a snapshot
+            next to the input if it is up to date, and write one otherwise.
+        incremental: Patch the decision models of an out of date snapshot
+            instead of identifying from scratch. Only used with 'use_snapshot'.
+        explorer_names: Filter explorers to match these short names.
+        pareto_points: Explore the Pareto front of throughput and latency
+            instead, writing one output per point, with the number of
+            points solved in parallel or 0 for a full sweep.
+        checkpoint_path: Keep the best solution so far of MiniZinc
+            explorations in this file.
+        resume_path: Carry on the exploration kept in this checkpoint,
+            with the solver it was started with.
+        outcome: Filled with what was explored and its objective, as in
+            'explore_decision_models'.
+        report_path: Write the statistics and convergence of the
+            exploration to this file as JSON, if the explorer reports them.
+
+    Returns:
+        The list of output files written, which is empty if the
+        exploration did not produce any model.
+    '''
+    logger = logger or logging.getLogger('CLI')
+    (in_model, identified) = parse_and_identify(model_path,
+                                                logger,
+                                                cache=cache,
+                                                profiler=profiler,
+                                                use_snapshot=use_snapshot,
+                                                incremental=incremental)
+    if pareto_points is not None:
+        front = explore_pareto_front(identified,
+                                     logger,
+                                     desired_names=desired_names,
+                                     mzn_solver=mzn_solver,
+                                     profiler=profiler,
+                                     points=pareto_points)
+        written = []
+        for (i, point) in enumerate(front):
+            paths = [pareto_output_path(o, i) for o in outputs or [f'out_{model_path}']]
+            written += write_outputs(in_model, point.model, paths, logger, profiler=profiler)
+        return written
+    outcome = outcome if outcome is not None else dict()
+    resulting_model = explore_decision_models(identified,
+                                              logger,
+                                              desired_names=desired_names,
+                                              mzn_solver=mzn_solver,
+                                              profiler=profiler,
+                                              explorer_names=explorer_names,
+                                              checkpoint_path=checkpoint_path,
+                                              resume_path=resume_path,
+                                              outcome=outcome)
+    if report_path and write_exploration_report(report_path, outcome):
+        logger.info(f'Exploration report written to {report_path}')
+    if resulting_model:
+        return write_outputs(in_model, resulting_model, outputs or [f'out_{model_path}'], logger, profiler=profiler)
+    return []
@@ -0,0 +1,210 @@
+'''Per-phase instrumentation of the DSE flow
+
+A 'PhaseProfiler' is handed down the flow (parsing, identification,
+choices, exploration and writing) and each step wraps its work in a named
+phase. Phases nest, so that for instance every identification rule
+invocation is accounted inside the 'identify' phase. Repeated phases with
+the same path are aggregated.
+
+The report can be written as JSON or as folded stacks, which is the input
+format of flamegraph tools such as 'flamegraph.pl' or speedscope.
+'''
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore
+
+
+def _peak_rss_kb(who: int = 0) -> int:
+    '''Get the peak resident set size of this process (or its children) in KiB'''
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who else resource.RUSAGE_SELF)
+    # linux reports KiB while macOS reports bytes
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def _current_rss_kb() -> int:
+    '''Get the current resident set size of this process in KiB, or 0 where /proc is not available'''
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * (os.sysconf('SC_PAGE_SIZE') // 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _high_water_rss_kb() -> int:
+    '''Get the peak resident set size of this process since the last reset in KiB, or 0 where /proc is not available'''
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _reset_high_water_rss() -> bool:
+    '''Reset the peak resident set size of this process to the current one, which Linux allows since 4.0'''
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+@dataclass
+class PhaseRecord(object):
+    '''Aggregated measurements of all executions of one phase path
+
+    The peak RSS is the largest resident set size of this process during
+    any execution of the phase. On Linux the high water mark of the
+    process is reset when a phase starts and read when it ends, so it is
+    the peak within the phase. Elsewhere, or if the reset is not allowed,
+    only the sizes at the start and at the end of the phase are seen.
+    '''
+    path: Tuple[str, ...]
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_rss_kb: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phase': ';'.join(self.path),
+            'calls': self.calls,
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'peak_rss_kb': self.peak_rss_kb
+        }
+
+
+@dataclass
+class PhaseProfiler(object):
+    '''Collects wall time, CPU time and peak memory of nested phases
+
+    Arguments:
+        cprofile_dir: If given, a cProfile dump is written to this
+            directory for every execution of a top level phase. Nested
+            phases are included in the dump of their top level phase,
+            since only one profiler can be active at a time.
+    '''
+    cprofile_dir: Optional[str] = None
+    records: Dict[Tuple[str, ...], PhaseRecord] = field(default_factory=dict)
+    _stack: List[str] = field(default_factory=list)
+    _dumps: int = 0
+    # peak RSS seen so far by each open phase, and by the whole run, as
+    # resetting the high water mark also resets the one getrusage reports
+    _peaks: List[int] = field(default_factory=list)
+    _run_peak_kb: int = 0
+    _resets_high_water: bool = False
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        self._stack.append(name)
+        path = tuple(self._stack)
+        profile = None
+        if self.cprofile_dir and len(self._stack) == 1:
+            profile = cProfile.Profile()
+            profile.enable()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        self._enter_peak()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            if profile:
+                profile.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.cprofile_dir, f'{self._dumps:03d}_{name}.prof'))
+                self._dumps += 1
+            self._stack.pop()
+            self._add(path, wall, cpu, self._exit_peak())
+
+    def _seen_peak(self) -> int:
+        '''Get the peak RSS since the last reset, or the current RSS if the high water mark is not reset'''
+        high_water = _high_water_rss_kb()
+        self._run_peak_kb = max(self._run_peak_kb, high_water)
+        return max(_current_rss_kb(), high_water if self._resets_high_water else 0)
+
+    def _enter_peak(self) -> None:
+        # the enclosing phases keep what they saw before the reset
+        seen = self._seen_peak()
+        self._peaks = [max(p, seen) for p in self._peaks]
+        self._resets_high_water = _reset_high_water_rss()
+        self._peaks.append(_current_rss_kb())
+
+    def _exit_peak(self) -> int:
+        peak = max(self._peaks.pop(), self._seen_peak())
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return peak
+
+    def record(self, name: str, wall: float, cpu: float = 0.0) -> None:
+        '''Account a phase measured elsewhere, e.g. reported by a solver, under the current phase'''
+        self._add(tuple(self._stack) + (name, ), wall, cpu)
+
+    def _add(self, path: Tuple[str, ...], wall: float, cpu: float, peak_rss_kb: int = 0) -> None:
+        record = self.records.setdefault(path, PhaseRecord(path=path))
+        record.calls += 1
+        record.wall += wall
+        record.cpu += cpu
+        record.peak_rss_kb = max(record.peak_rss_kb, peak_rss_kb)
+
+    def self_time(self, path: Tuple[str, ...]) -> float:
+        '''Wall time of a phase minus the wall time of its direct children'''
+        children = sum(r.wall for (p, r) in self.records.items() if len(p) == len(path) + 1 and p[:-1] == path)
+        return max(self.records[path].wall - children, 0.0)
+
+    def report(self) -> Dict[str, Any]:
+        top_level = [r for r in self.records.values() if len(r.path) == 1]
+        # the peaks are high water marks of the whole run, for this process
+        # and for its children (such as solvers)
+        return {
+            'total_wall_s': sum(r.wall for r in top_level),
+            'total_cpu_s': sum(r.cpu for r in top_level),
+            'peak_rss_kb': max(_peak_rss_kb(), self._seen_peak(), self._run_peak_kb),
+            'children_peak_rss_kb': _peak_rss_kb(who=1),
+            # parents are closed after their children, so sort for readability
+            'phases': [r.to_dict() for r in sorted(self.records.values(), key=lambda r: r.path)]
+        }
+
+    def folded(self) -> str:
+        '''Folded stacks with the self time of each phase in microseconds'''
+        lines = []
+        for path in sorted(self.records):
+            micros = int(self.self_time(path) * 1e6)
+            if micros > 0:
+                lines.append(f"{';'.join(p.replace(' ', '_') for p in path)} {micros}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, sink: str) -> None:
+        '''Write the report, as folded stacks if 'sink' ends in .folded and as JSON otherwise'''
+        with open(sink, 'w') as stream:
+            if sink.endswith('.folded'):
+                stream.write(self.folded())
+            else:
+                json.dump(self.report(), stream, indent=2)
+
+
+def phase(profiler: Optional[PhaseProfiler], name: str):
+    '''Enter 'name' on 'profiler' if there is one, so that callers need no checks'''
+    return profiler.phase(name) if profiler else contextlib.nullcontext()
@@ -1,6 +1,7 @@
 from typing import List, Optional, Dict, Tuple
 
 import numpy as np
+from forsyde.io.python.core import Vertex
 
 
 def get_PASS(sdf_topology: np.ndarray,
@@ -28,17 +29,17 @@ def get_PASS(sdf_topology: np.ndarray,
             Actor 1 fires, then 9 then 4.
     '''
     if initial_tokens is None:
-        initial_tokens = np.zeros((sdf_topology.shape[2], 1))
-    tokens = initial_tokens
-    repetition = np.array(repetition_vector, copy=True)
+        initial_tokens = np.zeros((sdf_topology.shape[0]))
+    # vectors may come either flat or as columns, so work on flat copies
+    tokens = np.array(initial_tokens).reshape(-1)
+    repetition = np.array(repetition_vector, copy=True).reshape(-1)
     firings = []
     num_firings = repetition.sum()
     for i in range(num_firings):
         for (idx, qi) in enumerate(repetition):
             if qi > 0:
-                fire_vector = np.zeros((sdf_topology.shape[1], 1))
-                fire_vector[idx] = 1
-                candidate = np.dot(sdf_topology, fire_vector) + tokens
+                # firing actor 'idx' adds its column of the topology to the tokens
+                candidate = sdf_topology[:, idx] + tokens
                 if (candidate >= 0).all():
                     repetition[idx] -= 1
                     tokens = candidate
@@ -51,6 +52,36 @@ def get_PASS(sdf_topology: np.ndarray,
         return firings
 
 
+def get_components(sdf_topology: np.ndarray) -> List[List[int]]:
+    '''Returns the connected components of a SDF graph
+
+    Actors are connected if they share a channel, i.e. if both have
+    nonzero entries in the same row of the topology.
+
+    Returns:
+        A list with the sorted actor indexes of each component, ordered
+        by the smallest index in them.
+    '''
+    parent = list(range(sdf_topology.shape[1]))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for row in sdf_topology:
+        ends = np.nonzero(row)[0]
+        for other in ends[1:]:
+            (a, b) = (find(ends[0]), find(other))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+    components: Dict[int, List[int]] = dict()
+    for i in range(len(parent)):
+        components.setdefault(find(i), []).append(i)
+    return list(components.values())
+
+
 def check_sdf_consistency(sdf_topology) -> bool:
     return False
 
@@ -62,8 +93,6 @@ def sdf_to_hsdf(actors: List[Vertex],
                 initial_tokens: np.ndarray) -> Tuple[List[Vertex], np.ndarray]:
     jobs = [a for (i, a) in enumerate(actors) for j in range(repetition_vector[i])]
     next_job = np.zeros((len(jobs), len(jobs)), dtype=bool)
-    for (i, (s, t, p)) in enumerate(channels):
-        
     for j in jobs:
         for jj in jobs:
             if j != jj:
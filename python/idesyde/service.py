@@ -0,0 +1,268 @@
+'''Long running DSE service and its thin client
+
+Starting the tool pays for importing all the heavy dependencies and for
+parsing and identifying the input model. The service keeps one warm process
+that accepts jobs on a local socket, runs them through the same pipeline as
+the command line interface and caches parsed models and identification
+results by the input file content.
+
+The protocol is line based JSON. A client sends a single request object,
+
+    {"model": "/abs/path/model.forxml", "output": [...],
+     "decision_model": [...], "explorer": [...], "mzn_solver": "gecode",
+     "snapshot": false, "incremental": false, "pareto": null,
+     "checkpoint": null, "resume": null, "exploration_report": null,
+     "verbosity": "INFO"}
+
+and then receives events until a terminal one ('done', 'failed' or
+'rejected') arrives. Malformed requests are rejected before queueing:
+
+    {"event": "queued", "job": 3, "position": 1}
+    {"event": "started", "job": 3}
+    {"event": "progress", "job": 3, "level": "INFO", "message": "Model parsed"}
+    {"event": "done", "job": 3, "outputs": [...], "elapsed": 1.2}
+'''
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8657
+
+TERMINAL_EVENTS = ('done', 'failed', 'rejected')
+
+
+@dataclass
+class Job(object):
+    identifier: int
+    request: Dict[str, Any]
+    events: "asyncio.Queue[Dict[str, Any]]" = field(default_factory=asyncio.Queue)
+
+
+class _JobLogHandler(logging.Handler):
+    '''Forwards the log records of the jobs running in worker threads to their event queues
+
+    Records are told apart by the job identifier their adapter puts in
+    them, and only those at or above the verbosity of their job are sent.
+    '''
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self.loop = loop
+        self.jobs: Dict[int, Tuple[Job, int]] = dict()
+
+    def emit(self, record):
+        (job, level) = self.jobs.get(getattr(record, 'job', None), (None, logging.NOTSET))
+        if job is None or record.levelno < level:
+            return
+        event = {'event': 'progress', 'job': job.identifier, 'level': record.levelname, 'message': self.format(record)}
+        self.loop.call_soon_threadsafe(job.events.put_nowait, event)
+
+
+class DSEService(object):
+    '''Warm DSE process serving jobs from a bounded queue
+
+    Arguments:
+        concurrency: Number of jobs run simultaneously.
+        max_queue: Number of jobs that can wait for a free worker before
+            new submissions are rejected.
+        cache_size: Number of input models kept parsed and identified.
+    '''
+
+    def __init__(self, concurrency: int = 1, max_queue: int = 16, cache_size: int = 8):
+        # the pipeline brings in all the heavy dependencies, which is
+        # exactly what the service pays for once to keep them warm
+        from idesyde.pipeline import PipelineCache
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.cache = PipelineCache(max_entries=cache_size)
+        self.logger = logging.getLogger('CLI')
+        self._ids = itertools.count(1)
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._log_handler: Optional[_JobLogHandler] = None
+        # set once serving, with the port bound if 0 was asked for
+        self.address: Optional[Tuple[str, int]] = None
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency)
+        self._log_handler = _JobLogHandler(asyncio.get_event_loop())
+        self.logger.addHandler(self._log_handler)
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        server = await asyncio.start_server(self._handle_client, host, port)
+        self.address = server.sockets[0].getsockname()[:2]
+        self.logger.info(f'Serving on {self.address[0]}:{self.address[1]} with {self.concurrency} worker(s)')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for w in workers:
+                w.cancel()
+            self._executor.shutdown(wait=False)
+            self.logger.removeHandler(self._log_handler)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            try:
+                request = json.loads(line)
+                validate_request(request)
+            except ValueError as e:
+                await _send(writer, {'event': 'rejected', 'reason': f'Malformed request: {e}'})
+                return
+            job = Job(identifier=next(self._ids), request=request)
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                await _send(writer, {'event': 'rejected', 'reason': 'Job queue is full'})
+                return
+            self.logger.info(f'Job {job.identifier} queued for {request["model"]}')
+            await _send(writer, {'event': 'queued', 'job': job.identifier, 'position': self._queue.qsize()})
+            while True:
+                event = await job.events.get()
+                await _send(writer, event)
+                if event['event'] in TERMINAL_EVENTS:
+                    break
+        except ConnectionError:
+            self.logger.warning('Client disconnected before its job finished')
+        finally:
+            writer.close()
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            job = await self._queue.get()
+            job.events.put_nowait({'event': 'started', 'job': job.identifier})
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self._executor, self._run_job, job)
+                job.events.put_nowait({
+                    'event': 'done',
+                    'job': job.identifier,
+                    'outputs': outputs,
+                    'elapsed': time.perf_counter() - start
+                })
+                self.logger.info(f'Job {job.identifier} done')
+            except Exception as e:
+                self.logger.exception(f'Job {job.identifier} failed')
+                job.events.put_nowait({'event': 'failed', 'job': job.identifier, 'reason': repr(e)})
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: Job) -> List[str]:
+        from idesyde.pipeline import run_pipeline
+        request = job.request
+        level = logging.getLevelName(request.get('verbosity', 'INFO').upper())
+        # records below the level of the shared logger never reach the handler
+        if not self.logger.isEnabledFor(level):
+            self.logger.setLevel(level)
+        self._log_handler.jobs[job.identifier] = (job, level)
+        try:
+            return run_pipeline(request['model'],
+                                outputs=request.get('output', []),
+                                desired_names=request.get('decision_model', []),
+                                mzn_solver=request.get('mzn_solver', 'gecode'),
+                                logger=logging.LoggerAdapter(self.logger, {'job': job.identifier}),
+                                cache=self.cache,
+                                use_snapshot=request.get('snapshot', False),
+                                incremental=request.get('incremental', False),
+                                explorer_names=request.get('explorer', []),
+                                pareto_points=request.get('pareto', None),
+                                checkpoint_path=request.get('checkpoint', None),
+                                resume_path=request.get('resume', None),
+                                report_path=request.get('exploration_report', None))
+        finally:
+            del self._log_handler.jobs[job.identifier]
+
+
+def _is_strings(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _is_optional_string(value: Any) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def _is_optional_count(value: Any) -> bool:
+    return value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0)
+
+
+# expected type of each request entry, by its description and its check
+_REQUEST_TYPES: Dict[str, Tuple[str, Callable[[Any], bool]]] = {
+    'model': ('a string', lambda v: isinstance(v, str)),
+    'output': ('a list of strings', _is_strings),
+    'decision_model': ('a list of strings', _is_strings),
+    'explorer': ('a list of strings', _is_strings),
+    'mzn_solver': ('a string', lambda v: isinstance(v, str)),
+    'snapshot': ('a boolean', lambda v: isinstance(v, bool)),
+    'incremental': ('a boolean', lambda v: isinstance(v, bool)),
+    'pareto': ('null or a non negative integer', _is_optional_count),
+    'checkpoint': ('null or a string', _is_optional_string),
+    'resume': ('null or a string', _is_optional_string),
+    'exploration_report': ('null or a string', _is_optional_string)
+}
+
+
+def validate_request(request: Any) -> None:
+    '''Check a job request before it is queued
+
+    Raises:
+        ValueError: If the request is not an object with a 'model' entry,
+            if one of its entries has the wrong type, or if its verbosity
+            is not a logging level name.
+    '''
+    if not isinstance(request, dict) or 'model' not in request:
+        raise ValueError("request must be an object with a 'model' entry")
+    for (key, (expected, check)) in _REQUEST_TYPES.items():
+        if key in request and not check(request[key]):
+            raise ValueError(f'{key} must be {expected}, not {request[key]!r}')
+    verbosity = request.get('verbosity', 'INFO')
+    if not isinstance(verbosity, str) or not isinstance(logging.getLevelName(verbosity.upper()), int):
+        raise ValueError(f'unknown verbosity {verbosity!r}')
+
+
+async def _send(writer: asyncio.StreamWriter, event: Dict[str, Any]) -> None:
+    writer.write(json.dumps(event).encode() + b'\n')
+    await writer.drain()
+
+
+async def submit(request: Dict[str, Any],
+                 host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    '''Submit a job to a running service and follow it until it ends
+
+    Arguments:
+        request: The job request, see the module documentation.
+        on_event: Called for every non terminal event received, so that
+            progress can be streamed to the user.
+
+    Returns:
+        The terminal event of the job.
+    '''
+    (reader, writer) = await asyncio.open_connection(host, port)
+    try:
+        await _send(writer, request)
+        while True:
+            line = await reader.readline()
+            if not line:
+                return {'event': 'failed', 'reason': 'Connection closed by the service'}
+            event = json.loads(line)
+            if event['event'] in TERMINAL_EVENTS:
+                return event
+            if on_event:
+                on_event(event)
+    finally:
+        writer.close()
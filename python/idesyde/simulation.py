@@ -0,0 +1,224 @@
+'''Self-timed simulation of mapped and ordered SDF applications
+
+Every core runs its static order of actor firings cyclically, starting
+each firing as soon as the core is free and the input channels hold
+enough tokens, and finishing it after the execution time of the actor on
+that core. Tokens sent to a different core arrive after the time to
+cross the communication elements between them. Events are kept in a heap
+and the tokens in plain lists indexed by channel, so that the simulation
+does the least work per firing.
+
+Since it runs the schedules as they would run on the platform, the
+simulation validates exploration results independently from both the
+MiniZinc models and the analytical throughput, and it doubles as a
+cheap fitness function for heuristic explorers.
+'''
+import heapq
+import itertools
+from dataclasses import dataclass
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+
+import idesyde.throughput as throughput
+
+
+@dataclass
+class SimulationResult(object):
+    '''Outcome of a self-timed simulation
+
+    Arguments:
+        iteration_ends: Time at which each complete iteration of the
+            application finished, i.e. all actors fired as many times as
+            in the repetition vector.
+        firings: Number of firings simulated.
+        deadlocked: Whether the simulation stopped before completing all
+            iterations because no firing could start.
+    '''
+    iteration_ends: np.ndarray
+    firings: int
+    deadlocked: bool
+
+    def period(self) -> float:
+        '''Get the average time between iterations in the second half of the simulation, i.e. in steady state'''
+        if self.deadlocked or len(self.iteration_ends) < 2:
+            return np.inf
+        steady = self.iteration_ends[len(self.iteration_ends) // 2:]
+        if len(steady) < 2:
+            steady = self.iteration_ends
+        return float(steady[-1] - steady[0]) / (len(steady) - 1)
+
+    def throughput(self) -> float:
+        p = self.period()
+        return 0.0 if p == np.inf else (np.inf if p == 0 else 1.0 / p)
+
+
+def simulate(sdf_topology: np.ndarray,
+             repetition_vector: np.ndarray,
+             orders: Sequence[Sequence[int]],
+             execution_times: np.ndarray,
+             initial_tokens: Optional[np.ndarray] = None,
+             comm_delays: Optional[np.ndarray] = None,
+             iterations: int = 100) -> SimulationResult:
+    '''Simulate the self-timed execution of a mapped and ordered SDF application
+
+    Arguments:
+        orders: The actor indexes fired by each core, in order, repeated
+            cyclically. An actor fired by several cores sends its tokens
+            with the largest delay to any of them.
+        execution_times: Array '(actors, cores)' of execution times.
+        comm_delays: Array '(channels, cores, cores)' with the time for
+            one firing of the source of a channel to send its tokens from
+            one core to another.
+        iterations: Number of iterations of the application to simulate.
+    '''
+    (num_channels, num_actors) = sdf_topology.shape
+    repetitions = np.array(repetition_vector, dtype=int).reshape(-1).tolist()
+    tokens: List[int] = [0] * num_channels if initial_tokens is None\
+        else np.array(initial_tokens, dtype=int).reshape(-1).tolist()
+    inputs: List[List[Tuple[int, int]]] = [[] for _ in range(num_actors)]
+    outputs: List[List[Tuple[int, int]]] = [[] for _ in range(num_actors)]
+    targets: List[int] = [0] * num_channels
+    for (c, row) in enumerate(sdf_topology.tolist()):
+        s = next(a for (a, v) in enumerate(row) if v > 0)
+        t = next(a for (a, v) in enumerate(row) if v < 0)
+        inputs[t].append((c, -row[t]))
+        outputs[s].append((c, row[s]))
+        targets[c] = t
+    orders = [list(o) for o in orders]
+    cores_of: List[List[int]] = [[] for _ in range(num_actors)]
+    for (p, order) in enumerate(orders):
+        for a in set(order):
+            cores_of[a].append(p)
+    # delay of the tokens of channel c fired on core p, and the cores waiting on each channel
+    delays: List[List[float]] = [[0.0] * num_channels for _ in range(len(orders))]
+    consumers: List[List[int]] = [cores_of[t] for t in targets]
+    for a in range(num_actors):
+        for (c, _) in outputs[a]:
+            if comm_delays is not None:
+                for p in cores_of[a]:
+                    delays[p][c] = max((float(comm_delays[c, p, pp]) for pp in cores_of[targets[c]]), default=0.0)
+    times = np.asarray(execution_times, dtype=float).tolist()
+    position = [0] * len(orders)
+    busy = [False] * len(orders)
+    fired = [0] * num_actors
+    iteration_ends = [0.0] * iterations
+    events: List[Tuple[float, int, int, int, int]] = []
+    # events are (time, sequence, core or -1 for arrivals, actor or channel, tokens arriving)
+    sequence = itertools.count()
+    firings = 0
+    target = [q * iterations for q in repetitions]
+    (push, pop) = (heapq.heappush, heapq.heappop)
+
+    def try_start(p: int, now: float) -> None:
+        if busy[p] or not orders[p]:
+            return
+        a = orders[p][position[p]]
+        if fired[a] >= target[a]:
+            return
+        needed = inputs[a]
+        for (c, consumed) in needed:
+            if tokens[c] < consumed:
+                return
+        for (c, consumed) in needed:
+            tokens[c] -= consumed
+        busy[p] = True
+        push(events, (now + times[a][p], next(sequence), p, a, 0))
+
+    for p in range(len(orders)):
+        try_start(p, 0.0)
+    while events:
+        (now, _, p, x, arriving) = pop(events)
+        if p < 0:
+            tokens[x] += arriving
+            for pp in consumers[x]:
+                try_start(pp, now)
+            continue
+        busy[p] = False
+        position[p] += 1
+        if position[p] == len(orders[p]):
+            position[p] = 0
+        firings += 1
+        fired[x] += 1
+        if fired[x] % repetitions[x] == 0:
+            i = fired[x] // repetitions[x] - 1
+            if now > iteration_ends[i]:
+                iteration_ends[i] = now
+        delays_of = delays[p]
+        for (c, produced) in outputs[x]:
+            delay = delays_of[c]
+            if delay > 0:
+                push(events, (now + delay, next(sequence), -1, c, produced))
+            else:
+                tokens[c] += produced
+                for pp in consumers[c]:
+                    if pp != p:
+                        try_start(pp, now)
+        try_start(p, now)
+    deadlocked = any(f < t for (f, t) in zip(fired, target))
+    return SimulationResult(iteration_ends=np.array(iteration_ends), firings=firings, deadlocked=deadlocked)
+
+
+def simulate_results(decision_model: Any, results: Any, iterations: int = 100) -> SimulationResult:
+    '''Simulate the mapping and orders in the exploration results of an 'SDFToMultiCoreCharacterized'
+
+    Arguments:
+        results: Results in the shape returned by the MiniZinc models.
+    '''
+    sdf_exec = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub
+    (_, orders) = throughput.mapping_from_results(sdf_exec.sdf_topology,
+                                                  sdf_exec.sdf_repetition_vector,
+                                                  results['mapped_actors'],
+                                                  results['buffer_start'],
+                                                  sdf_pass=sdf_exec.sdf_pass_indexes())
+    actor_of = np.repeat(np.arange(len(sdf_exec.sdf_actors)), sdf_exec.sdf_repetition_vector.reshape(-1))
+    return simulate(sdf_exec.sdf_topology,
+                    sdf_exec.sdf_repetition_vector, [actor_of[o].tolist() for o in orders],
+                    decision_model.wcet,
+                    initial_tokens=sdf_exec.sdf_initial_tokens,
+                    comm_delays=decision_model.comm_delays(),
+                    iterations=iterations)
+
+
+def validate_results(decision_model: Any,
+                     results: Any,
+                     iterations: int = 100,
+                     min_throughput: Optional[float] = None,
+                     rel_tol: float = 1e-6) -> List[str]:
+    '''Check that exploration results run as expected on the platform
+
+    The results must map every firing, run without deadlocks, have the
+    period predicted by the throughput analysis and, if given, reach
+    'min_throughput' iterations per time unit.
+
+    Returns:
+        A description of every problem found, empty if there are none.
+    '''
+    problems = []
+    sdf_exec = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub
+    (firing_cores, _) = throughput.mapping_from_results(sdf_exec.sdf_topology,
+                                                        sdf_exec.sdf_repetition_vector,
+                                                        results['mapped_actors'],
+                                                        results['buffer_start'],
+                                                        sdf_pass=sdf_exec.sdf_pass_indexes())
+    unmapped = int(np.count_nonzero(firing_cores < 0))
+    if unmapped > 0:
+        problems.append(f'{unmapped} firing(s) are not mapped to any core')
+    simulated = simulate_results(decision_model, results, iterations=iterations)
+    if simulated.deadlocked:
+        problems.append(f'Deadlock after {simulated.firings} firing(s)')
+        return problems
+    expected = decision_model.evaluate_period(results)
+    # the analysis is exact only when every actor runs on a single core
+    single_core = all(len(set(firing_cores[b:e].tolist())) <= 1 for (b, e) in zip(
+        np.cumsum(sdf_exec.sdf_repetition_vector.reshape(-1)) - sdf_exec.sdf_repetition_vector.reshape(-1),
+        np.cumsum(sdf_exec.sdf_repetition_vector.reshape(-1))))
+    if single_core and not np.isclose(simulated.period(), expected, rtol=rel_tol):
+        problems.append(f'Simulated period {simulated.period()} differs from the analysed period {expected}')
+    if min_throughput is not None and simulated.throughput() < min_throughput:
+        problems.append(f'Throughput {simulated.throughput()} is below the required {min_throughput}')
+    return problems
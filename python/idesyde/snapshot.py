@@ -0,0 +1,349 @@
+'''Binary snapshots of parsed models and their identified decision models
+
+Parsing a ForSyDe IO file and identifying its decision models are the
+most expensive steps before exploration, and both are repeated on every
+run. A snapshot keeps their results next to the input file, keyed by the
+digest of the input content, so that later runs can skip both.
+
+The layout is a fixed header, a JSON metadata block and a sequence of
+64 byte aligned arrays,
+
+    magic (8 bytes) | version (u32) | reserved (u32) | metadata size (u64)
+    metadata (JSON, utf-8) | padding | array | padding | array ...
+
+The metadata holds the input digest, the digest of the identification
+code the snapshot was written by, the strings of the model (vertex
+identifiers, type names, ports, properties, edge keys), the compact
+decision models and the offset, dtype and shape of every array. The
+arrays hold the integer indexed adjacency, the vertex and edge type
+indexes and the arrays of the compact decision models, and are read
+straight from a memory map.
+
+A snapshot is only read back by the same identification code, so that
+a fix of a rule is never hidden by decision models identified before it.
+Nothing is pickled, so reading a snapshot never runs code from it. The
+values that JSON has no type for, such as tuples and arrays, are stored
+as objects with a single key naming their type, and decision models
+are rebuilt only for the known subclasses of 'DecisionModel'.
+'''
+import functools
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Port
+from forsyde.io.python.types import EdgeFactory
+from forsyde.io.python.types import VertexFactory
+
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.compact import CSRPaths
+from idesyde.identification.compact import CompactDecisionModel
+from idesyde.identification.compact import SparseArray
+from idesyde.identification.compact import VertexTable
+from idesyde.identification.compact import compact_decision_models
+from idesyde.identification.compact import expand_decision_models
+
+MAGIC = b'IDESNAP\0'
+VERSION = 2
+SNAPSHOT_SUFFIX = '.idesyde-snapshot'
+
+_HEADER = struct.Struct('<8sIIQ')
+_ALIGNMENT = 64
+
+
+@dataclass
+class Snapshot(object):
+    '''A model and its identified decision models, as stored for an input file
+
+    Arguments:
+        input_digest: Content digest of the input file the snapshot was taken from.
+    '''
+    input_digest: str
+    model: ForSyDeModel
+    identified: List[DecisionModel] = field(default_factory=list)
+
+
+def snapshot_path(model_path: str) -> str:
+    return model_path + SNAPSHOT_SUFFIX
+
+
+def _string_table(strings: List[str]) -> Tuple[List[str], Dict[str, int]]:
+    indexes: Dict[str, int] = dict()
+    for s in strings:
+        indexes.setdefault(s, len(indexes))
+    return (list(indexes), indexes)
+
+
+def _pad(stream: BinaryIO) -> int:
+    position = stream.tell()
+    padding = -position % _ALIGNMENT
+    stream.write(b'\0' * padding)
+    return position + padding
+
+
+@functools.lru_cache(maxsize=None)
+def identification_digest() -> str:
+    '''Get the digest of the sources that identification depends on, which snapshots are keyed on'''
+    package = os.path.dirname(os.path.abspath(__file__))
+    hasher = hashlib.sha256(str(VERSION).encode())
+    sources = sorted(glob.glob(os.path.join(package, 'identification', '*.py')))
+    for path in sources + [os.path.join(package, m) for m in ('sdf.py', 'math.py', 'throughput.py')]:
+        hasher.update(os.path.relpath(path, package).encode() + b'\0')
+        with open(path, 'rb') as stream:
+            hasher.update(stream.read())
+    return hasher.hexdigest()
+
+
+def _decision_model_classes() -> Dict[str, type]:
+    classes: Dict[str, type] = dict()
+    pending = [DecisionModel]
+    while pending:
+        cls = pending.pop()
+        classes[f'{cls.__module__}.{cls.__qualname__}'] = cls
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+def _encode(value: Any, arrays: Dict[str, np.ndarray]) -> Any:
+    '''Encode 'value' as JSON, moving its arrays to 'arrays'
+
+    Raises:
+        ValueError: If the value has a type that cannot be stored.
+    '''
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode(v, arrays) for v in value]
+    if isinstance(value, tuple):
+        return {'tuple': [_encode(v, arrays) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {type(value).__name__: [_encode(v, arrays) for v in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode(k, arrays), _encode(v, arrays)] for (k, v) in value.items()]}
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise ValueError('Arrays of objects cannot be stored in a snapshot')
+        name = f'value{len(arrays)}'
+        arrays[name] = np.ascontiguousarray(value)
+        return {'array': name}
+    if isinstance(value, np.generic):
+        return {'scalar': [value.dtype.str, value.item()]}
+    if isinstance(value, CSRPaths):
+        return {'csr': [_encode(getattr(value, a), arrays) for a in CSRPaths.__slots__]}
+    if isinstance(value, SparseArray):
+        return {
+            'sparse': [list(value.shape), value.dtype.str,
+                       _encode(value.coords, arrays),
+                       _encode(value.values, arrays)]
+        }
+    if isinstance(value, CompactDecisionModel):
+        return {
+            'compact': [
+                f'{value.model_class.__module__}.{value.model_class.__qualname__}',
+                {name: [kind, _encode(v, arrays)] for (name, (kind, v)) in value.encoded.items()}
+            ]
+        }
+    raise ValueError(f'Values of type {type(value).__name__} cannot be stored in a snapshot')
+
+
+def _decode(value: Any, arrays: Dict[str, np.ndarray]) -> Any:
+    '''Decode a value encoded by '_encode', copying its arrays out of 'arrays' '''
+    if isinstance(value, list):
+        return [_decode(v, arrays) for v in value]
+    if not isinstance(value, dict):
+        return value
+    ((kind, encoded), ) = value.items()
+    if kind == 'tuple':
+        return tuple(_decode(v, arrays) for v in encoded)
+    if kind == 'set':
+        return set(_decode(v, arrays) for v in encoded)
+    if kind == 'frozenset':
+        return frozenset(_decode(v, arrays) for v in encoded)
+    if kind == 'dict':
+        return {_decode(k, arrays): _decode(v, arrays) for (k, v) in encoded}
+    if kind == 'array':
+        return np.array(arrays[encoded])
+    if kind == 'scalar':
+        return np.dtype(encoded[0]).type(encoded[1])
+    if kind == 'csr':
+        return CSRPaths(*(_decode(v, arrays) for v in encoded))
+    if kind == 'sparse':
+        (shape, dtype, coords, values) = encoded
+        return SparseArray(tuple(shape), np.dtype(dtype), _decode(coords, arrays), _decode(values, arrays))
+    if kind == 'compact':
+        (class_name, fields) = encoded
+        model_class = _decision_model_classes().get(class_name, None)
+        if model_class is None:
+            raise ValueError(f'Unknown decision model {class_name} in snapshot')
+        return CompactDecisionModel(model_class=model_class,
+                                    encoded={name: (k, _decode(v, arrays))
+                                             for (name, (k, v)) in fields.items()})
+    raise ValueError(f'Unknown value of type {kind} in snapshot')
+
+
+def write_snapshot(path: str, input_digest: str, model: ForSyDeModel, identified: List[DecisionModel] = []) -> None:
+    '''Write the snapshot of 'model' and 'identified' to 'path'
+
+    The file is written under a temporary name and then renamed, so that
+    concurrent readers never see a partial snapshot.
+
+    Raises:
+        ValueError: If a decision model holds a value that cannot be stored.
+    '''
+    table = VertexTable.from_model(model)
+    (vertex_type_names, vertex_type_idx) = _string_table([v.get_type_tag() for v in table.vertexes])
+    edges = [(s, t, k, e['object']) for (s, t, k, e) in model.edges(keys=True, data=True)]
+    (edge_type_names, edge_type_idx) = _string_table([e.get_type_tag() for (_, _, _, e) in edges])
+    (port_names, port_idx) = _string_table([
+        p.identifier for (_, _, _, e) in edges for p in (e.source_vertex_port, e.target_vertex_port) if p is not None
+    ])
+    arrays = {
+        'vertex_types': np.array([vertex_type_idx[v.get_type_tag()] for v in table.vertexes], dtype=np.int32),
+        'edge_sources': table.encode(s for (s, _, _, _) in edges),
+        'edge_targets': table.encode(t for (_, t, _, _) in edges),
+        'edge_types': np.array([edge_type_idx[e.get_type_tag()] for (_, _, _, e) in edges], dtype=np.int32),
+        'edge_source_ports': np.array(
+            [port_idx[e.source_vertex_port.identifier] if e.source_vertex_port else -1 for (_, _, _, e) in edges],
+            dtype=np.int32),
+        'edge_target_ports': np.array(
+            [port_idx[e.target_vertex_port.identifier] if e.target_vertex_port else -1 for (_, _, _, e) in edges],
+            dtype=np.int32),
+    }
+    decision_models = _encode(compact_decision_models(identified, table), arrays)
+    metadata: Dict[str, Any] = {
+        'input_digest': input_digest,
+        'identification_digest': identification_digest(),
+        'vertex_identifiers': [v.identifier for v in table.vertexes],
+        'vertex_type_names': vertex_type_names,
+        'vertex_ports': [sorted(p.identifier for p in v.ports) for v in table.vertexes],
+        'vertex_properties': [_encode(v.properties, arrays) for v in table.vertexes],
+        'edge_type_names': edge_type_names,
+        'edge_keys': [k for (_, _, k, _) in edges],
+        'port_names': port_names,
+        'decision_models': decision_models,
+        'arrays': dict()
+    }
+    # the offsets depend on the metadata size, which depends on the offsets,
+    # so the arrays are laid out relative to the end of the metadata first
+    relative = 0
+    for (name, array) in arrays.items():
+        metadata['arrays'][name] = [relative, array.dtype.str, list(array.shape)]
+        relative += array.nbytes + (-array.nbytes % _ALIGNMENT)
+    encoded = json.dumps(metadata).encode()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as stream:
+        stream.write(_HEADER.pack(MAGIC, VERSION, 0, len(encoded)))
+        stream.write(encoded)
+        for (name, array) in arrays.items():
+            _pad(stream)
+            stream.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_digest(path: str) -> Optional[str]:
+    '''Get the input digest of a snapshot, or None if it is unreadable or from another identification'''
+    try:
+        with open(path, 'rb') as stream:
+            (metadata, _) = _read_metadata(stream)
+        return metadata['input_digest']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_snapshot(model_path: str, input_digest: str) -> Optional[Snapshot]:
+    '''Load the snapshot of an input file if it exists and was taken from the same content
+
+    Returns:
+        The snapshot, or None if there is none or it is stale.
+    '''
+    path = snapshot_path(model_path)
+    if read_snapshot_digest(path) != input_digest:
+        return None
+    return read_snapshot(path)
+
+
+def _read_metadata(stream: BinaryIO) -> Tuple[Dict[str, Any], int]:
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError('Truncated snapshot header')
+    (magic, version, _, size) = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'Not a version {VERSION} snapshot')
+    metadata = json.loads(stream.read(size))
+    if metadata.get('identification_digest', None) != identification_digest():
+        raise ValueError('Snapshot written by a different version of the identification')
+    return (metadata, _HEADER.size + size + (-(_HEADER.size + size) % _ALIGNMENT))
+
+
+def read_snapshot(path: str) -> Snapshot:
+    '''Read a snapshot, mapping its arrays from the file instead of copying them
+
+    Raises:
+        ValueError: If the file is not a snapshot of the current version.
+    '''
+    with open(path, 'rb') as stream:
+        (metadata, start) = _read_metadata(stream)
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            arrays = {
+                name: np.frombuffer(mapped, dtype=np.dtype(dtype), count=int(np.prod(shape)),
+                                    offset=start + offset).reshape(shape)
+                for (name, (offset, dtype, shape)) in metadata['arrays'].items()
+            }
+            (model, table) = _rebuild_model(metadata, arrays)
+            compacts = _decode(metadata['decision_models'], arrays)
+            # the arrays are views of the map, which can only be closed once they are gone
+            del arrays
+    return Snapshot(input_digest=metadata['input_digest'],
+                    model=model,
+                    identified=expand_decision_models(compacts, table))
+
+
+def _rebuild_model(metadata: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> Tuple[ForSyDeModel, VertexTable]:
+    model = ForSyDeModel()
+    vertex_type_names = metadata['vertex_type_names']
+    vertexes = []
+    for (identifier, type_idx, ports, properties) in zip(metadata['vertex_identifiers'],
+                                                         arrays['vertex_types'].tolist(),
+                                                         metadata['vertex_ports'],
+                                                         metadata['vertex_properties']):
+        vertex = VertexFactory.build(identifier=identifier,
+                                     type_name=vertex_type_names[type_idx],
+                                     ports=set(Port(identifier=p) for p in ports),
+                                     properties=_decode(properties, arrays))
+        model.add_node(vertex, label=identifier)
+        vertexes.append(vertex)
+    table = VertexTable(vertexes)
+    (edge_type_names, port_names) = (metadata['edge_type_names'], metadata['port_names'])
+    for (s, t, type_idx, sport, tport, key) in zip(arrays['edge_sources'].tolist(), arrays['edge_targets'].tolist(),
+                                                   arrays['edge_types'].tolist(),
+                                                   arrays['edge_source_ports'].tolist(),
+                                                   arrays['edge_target_ports'].tolist(), metadata['edge_keys']):
+        (source, target) = (vertexes[s], vertexes[t])
+        edge = EdgeFactory.build(source=source, target=target, type_name=edge_type_names[type_idx])
+        if sport >= 0:
+            edge.source_vertex_port = _get_port(source, port_names[sport])
+        if tport >= 0:
+            edge.target_vertex_port = _get_port(target, port_names[tport])
+        model.add_edge(source, target, key=key, object=edge)
+    return (model, table)
+
+
+def _get_port(vertex, name: str) -> Port:
+    # edges built programmatically may use ports that were not declared in the vertex
+    try:
+        return vertex.get_port(name)
+    except AttributeError:
+        return Port(identifier=name)
@@ -0,0 +1,214 @@
+'''Sweeps of the platform of an identified SDF to MPSoC decision model
+
+Seeing how the result changes with the number of cores or the slots of
+the TDMA communication elements would otherwise take one input model and
+one full run per platform. A sweep identifies the input once and derives
+the decision model of every platform of a grid by restricting the cores
+and replacing the slots of the identified one, so the application side
+is shared by all of them.
+
+Platforms are explored in parallel, cheaper ones first. A platform is
+screened by presolving before it is solved, and is pruned if a cheaper
+one, i.e. with a subset of its cores and no more slots, already reached
+a weighted objective that its presolve bound shows it cannot improve.
+'''
+import asyncio
+import csv
+import json
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+
+from idesyde.exploration import MinizincExplorer
+from idesyde.exploration import presolve
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.profiling import PhaseProfiler
+
+SWEEP_COLUMNS = ('platform', 'status', 'throughput', 'latency', 'objective', 'lower_bound', 'reason')
+
+
+@dataclass(frozen=True)
+class PlatformConfig(object):
+    '''A platform of a sweep
+
+    Arguments:
+        cores: Indexes of the cores of the decision model that are kept.
+        comms_capacity: Slots of every communication element.
+    '''
+    cores: Tuple[int, ...]
+    comms_capacity: Tuple[int, ...]
+
+    def label(self) -> str:
+        slots = '/'.join(str(s) for s in sorted(set(self.comms_capacity)))
+        return f'{len(self.cores)} cores, {slots} slots' if slots else f'{len(self.cores)} cores'
+
+    def is_cheaper(self, other: "PlatformConfig") -> bool:
+        '''Whether this platform has a subset of the cores of 'other' and no more slots in any element'''
+        return self != other and set(self.cores) <= set(other.cores) and all(
+            s <= o for (s, o) in zip(self.comms_capacity, other.comms_capacity))
+
+
+@dataclass
+class SweepPoint(object):
+    '''Result of one platform of a sweep
+
+    Arguments:
+        status: 'solved', 'no solution', 'infeasible' if presolving
+            rejects the platform, or 'pruned' if a cheaper one is as good.
+        lower_bound: Presolve bound on the weighted objective.
+        reason: Why the platform was not solved.
+    '''
+    config: PlatformConfig
+    status: str
+    throughput: Optional[int] = None
+    latency: Optional[int] = None
+    objective: Optional[int] = None
+    lower_bound: Optional[int] = None
+    reason: str = ''
+
+
+def platform_grid(decision_model: SDFToMultiCoreCharacterized,
+                  core_counts: Sequence[int] = (),
+                  slot_counts: Sequence[int] = ()) -> List[PlatformConfig]:
+    '''Get the platforms with the first 'n' cores for every count, and every slot count in all elements
+
+    Counts above the number of cores are taken as all cores. Without
+    counts, the cores or slots of the decision model are kept.
+    '''
+    mpsoc = decision_model.sdf_mpsoc_sub
+    counts = sorted(set(min(n, len(mpsoc.cores)) for n in core_counts if n > 0)) or [len(mpsoc.cores)]
+    capacities = [tuple(s for _ in mpsoc.comms) for s in sorted(set(slot_counts)) if s > 0]
+    return [
+        PlatformConfig(cores=tuple(range(n)), comms_capacity=c)
+        for n in counts for c in capacities or [tuple(mpsoc.comms_capacity)]
+    ]
+
+
+def restrict_platform(decision_model: SDFToMultiCoreCharacterized,
+                      config: PlatformConfig) -> SDFToMultiCoreCharacterized:
+    '''Restrict a decision model to the cores of 'config', with its slots
+
+    All communication elements are kept, together with the orderings of
+    the cores kept and of the elements.
+    '''
+    mpsoc = decision_model.sdf_mpsoc_sub
+    cores = list(config.cores)
+    kept = set(mpsoc.cores[p] for p in cores)
+    orderings = mpsoc.sdf_orders_sub.orderings
+    orders = SDFToOrders(sdf_exec_sub=mpsoc.sdf_orders_sub.sdf_exec_sub,
+                         orderings=[orderings[p] for p in cores] + orderings[len(mpsoc.cores):])
+    orders.compute_deduced_properties()
+    restricted = SDFToMultiCore(sdf_orders_sub=orders,
+                                cores=[mpsoc.cores[p] for p in cores],
+                                comms=mpsoc.comms,
+                                connections=[(s, t, p) for (s, t, p) in mpsoc.connections if s in kept and t in kept],
+                                comms_capacity=list(config.comms_capacity),
+                                comms_path=mpsoc.comms_path[np.ix_(cores, cores)])
+    restricted.compute_deduced_properties()
+    res = SDFToMultiCoreCharacterized(sdf_mpsoc_sub=restricted,
+                                      wcet_vertexes=decision_model.wcet_vertexes,
+                                      token_wcct_vertexes=decision_model.token_wcct_vertexes,
+                                      goals_vertexes=decision_model.goals_vertexes,
+                                      wcet=decision_model.wcet[:, cores],
+                                      token_wcct=decision_model.token_wcct,
+                                      throughput_importance=decision_model.throughput_importance,
+                                      latency_importance=decision_model.latency_importance)
+    res.compute_deduced_properties()
+    return res
+
+
+async def sweep_platform_async(decision_model: SDFToMultiCoreCharacterized,
+                               configs: Sequence[PlatformConfig],
+                               backend_solver_name: str = 'gecode',
+                               workers: int = 4,
+                               profiler: Optional[PhaseProfiler] = None) -> List[SweepPoint]:
+    '''Explore 'decision_model' on every platform of 'configs', with up to 'workers' solved at once
+
+    Returns:
+        A point per platform, in the order of 'configs'.
+    '''
+    weights = [decision_model.throughput_importance, decision_model.latency_importance]
+    explorer = MinizincExplorer()
+    semaphore = asyncio.Semaphore(max(1, workers))
+    points: Dict[PlatformConfig, SweepPoint] = dict()
+    models: Dict[PlatformConfig, SDFToMultiCoreCharacterized] = dict()
+    for config in configs:
+        model = restrict_platform(decision_model, config)
+        report = presolve(model)
+        bound = sum(w * b for (w, b) in zip(weights, report.objective_lower_bounds or []))
+        if report.feasible:
+            models[config] = model
+            points[config] = SweepPoint(config, 'no solution', lower_bound=bound)
+        else:
+            points[config] = SweepPoint(config, 'infeasible', lower_bound=bound, reason='; '.join(report.reasons))
+
+    async def solve(config: PlatformConfig) -> None:
+        async with semaphore:
+            result = await explorer.solve_async(models[config], backend_solver_name, profiler=profiler)
+        point = points[config]
+        if result is not None and result.status.has_solution():
+            (point.throughput, point.latency) = result['objective_values']
+            (point.status, point.objective) = ('solved', result.objective)
+
+    remaining = [c for c in configs if c in models]
+    while remaining:
+        # platforms whose cheaper ones are all done, so they can be pruned by them
+        ready = [c for c in remaining if not any(o.is_cheaper(c) for o in remaining)]
+        remaining = [c for c in remaining if c not in ready]
+        to_solve = []
+        for config in ready:
+            point = points[config]
+            better = [
+                p for p in points.values()
+                if p.config.is_cheaper(config) and p.objective is not None and p.objective <= point.lower_bound
+            ]
+            if any(weights) and better:
+                (point.status, point.reason) = ('pruned', f'no better than {better[0].config.label()}')
+            else:
+                to_solve.append(config)
+        await asyncio.gather(*[solve(c) for c in to_solve])
+    return [points[c] for c in configs]
+
+
+def sweep_platform(decision_model: SDFToMultiCoreCharacterized,
+                   configs: Sequence[PlatformConfig],
+                   backend_solver_name: str = 'gecode',
+                   workers: int = 4,
+                   profiler: Optional[PhaseProfiler] = None) -> List[SweepPoint]:
+    return asyncio.run(sweep_platform_async(decision_model, configs, backend_solver_name, workers, profiler))
+
+
+def sweep_table(points: List[SweepPoint]) -> str:
+    '''Get a summary table of a sweep, one platform per line'''
+    lines = [f'{"platform":<24} {"status":<12} {"throughput":>12} {"latency":>12}']
+    lines += [
+        f'{p.config.label():<24} {p.status:<12} {"-" if p.throughput is None else p.throughput:>12} '
+        f'{"-" if p.latency is None else p.latency:>12}' for p in points
+    ]
+    return '\n'.join(lines)
+
+
+def write_sweep_report(path: str, points: List[SweepPoint]) -> None:
+    '''Write the points of a sweep as CSV if 'path' ends in .csv, and JSON otherwise'''
+    rows = [{
+        'platform': p.config.label(),
+        'cores': list(p.config.cores),
+        'comms_capacity': list(p.config.comms_capacity),
+        **{c: getattr(p, c) for c in SWEEP_COLUMNS[1:]}
+    } for p in points]
+    if not path.endswith('.csv'):
+        with open(path, 'w') as stream:
+            json.dump(rows, stream, indent=2)
+        return
+    with open(path, 'w', newline='') as stream:
+        writer = csv.writer(stream)
+        writer.writerow(SWEEP_COLUMNS)
+        for row in rows:
+            writer.writerow(['' if row[c] is None else row[c] for c in SWEEP_COLUMNS])
@@ -0,0 +1,266 @@
+'''Throughput analysis of mapped and ordered SDF applications
+
+A mapped SDF application is expanded into its HSDF graph, with one node
+per actor firing in an iteration and one edge per token dependency,
+weighted by the execution time of the source firing plus the time to
+send its tokens to the target core. Edges carry the number of iterations
+between the firings they connect, which comes from the initial tokens.
+The static order of every core adds a cycle through its firings, and
+firings of the same actor are never concurrent.
+
+The period of the application is the maximum cycle ratio of this graph,
+i.e. the maximum over all cycles of the sum of their weights divided by
+the sum of their iteration distances. It is computed exactly by reducing
+the graph to its max-plus matrix over the initial tokens, where the
+period is the maximum cycle mean, and running Karp's algorithm on each
+strongly connected component of the matrix.
+'''
+import math
+from dataclasses import dataclass
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import networkx as nx
+import numpy as np
+
+import idesyde.sdf as sdfapi
+
+
+@dataclass
+class HSDFGraph(object):
+    '''Edge list of an HSDF graph, node 'offsets[a] + k' being the firing 'k' of actor 'a'
+
+    Arguments:
+        delays: Iteration distance of each edge, i.e. the edge goes from
+            the source firing of iteration 'i - delay' to the target
+            firing of iteration 'i'.
+    '''
+    offsets: np.ndarray
+    sources: np.ndarray
+    targets: np.ndarray
+    weights: np.ndarray
+    delays: np.ndarray
+
+    @property
+    def num_nodes(self) -> int:
+        return int(self.offsets[-1])
+
+
+def tdma_delay(tokens: int, token_time: float, slots: int, allocated: int = 1) -> float:
+    '''Worst case time to send 'tokens' through a TDMA element with 'allocated' of its 'slots'
+
+    Every slot sends one token in 'token_time', and in the worst case
+    the sender waits for all the slots it was not allocated in every round.
+    '''
+    if tokens <= 0:
+        return 0.0
+    rounds = math.ceil(tokens / allocated)
+    return tokens * token_time + rounds * (slots - allocated) * token_time
+
+
+def build_hsdf(sdf_topology: np.ndarray,
+               repetition_vector: np.ndarray,
+               initial_tokens: Optional[np.ndarray] = None,
+               execution_times: Optional[np.ndarray] = None,
+               firing_cores: Optional[np.ndarray] = None,
+               comm_delays: Optional[np.ndarray] = None,
+               orders: Sequence[Sequence[int]] = []) -> HSDFGraph:
+    '''Expand a mapped and ordered SDF graph into its HSDF graph
+
+    Arguments:
+        execution_times: Execution time of every firing, by HSDF node.
+            Defaults to 1 for all of them.
+        firing_cores: Core of every firing, by HSDF node, or -1 if it
+            is not mapped.
+        comm_delays: Array '(channels, cores, cores)' with the time for
+            one firing of the source of a channel to send its tokens from
+            one core to another.
+        orders: The HSDF nodes executed by each core, in order.
+    '''
+    repetitions = np.array(repetition_vector, dtype=int).reshape(-1)
+    tokens = np.zeros(sdf_topology.shape[0], dtype=int) if initial_tokens is None\
+        else np.array(initial_tokens, dtype=int).reshape(-1)
+    offsets = np.zeros(len(repetitions) + 1, dtype=int)
+    offsets[1:] = np.cumsum(repetitions)
+    times = np.ones(offsets[-1]) if execution_times is None else np.asarray(execution_times, dtype=float)
+    edges: List[Tuple[int, int, float, int]] = []
+    for (c, row) in enumerate(sdf_topology):
+        s = int(np.nonzero(row > 0)[0][0])
+        t = int(np.nonzero(row < 0)[0][0])
+        (produced, consumed, initial) = (int(row[s]), int(-row[t]), int(tokens[c]))
+        for k in range(repetitions[t]):
+            # tokens consumed by firing k, in consumption order, and the absolute firings producing them
+            first = (k * consumed - initial) // produced
+            last = ((k + 1) * consumed - 1 - initial) // produced
+            for f in range(first, last + 1):
+                (distance, j) = divmod(f, repetitions[s])
+                (u, v) = (offsets[s] + j, offsets[t] + k)
+                weight = times[u]
+                if comm_delays is not None and firing_cores is not None\
+                        and firing_cores[u] >= 0 and firing_cores[v] >= 0 and firing_cores[u] != firing_cores[v]:
+                    weight += comm_delays[c, firing_cores[u], firing_cores[v]]
+                edges.append((u, v, weight, -distance))
+    # firings of an actor are sequential, and so are the firings of a core
+    sequences = [list(range(offsets[a], offsets[a + 1])) for a in range(len(repetitions))]
+    for sequence in list(sequences) + [list(o) for o in orders if len(o) > 0]:
+        for (u, v) in zip(sequence, sequence[1:]):
+            edges.append((u, v, times[u], 0))
+        edges.append((sequence[-1], sequence[0], times[sequence[-1]], 1))
+    return HSDFGraph(offsets=offsets,
+                     sources=np.array([e[0] for e in edges], dtype=int),
+                     targets=np.array([e[1] for e in edges], dtype=int),
+                     weights=np.array([e[2] for e in edges], dtype=float),
+                     delays=np.array([e[3] for e in edges], dtype=int))
+
+
+def maxplus_matrix(hsdf: HSDFGraph) -> Optional[np.ndarray]:
+    '''Reduce an HSDF graph to its max-plus matrix over the initial tokens
+
+    Every edge with a delay of 'd' holds 'd' tokens in sequence. Entry
+    '[i, j]' of the matrix is the longest time from token 'j' being
+    available to token 'i' being produced in the next iteration, or
+    minus infinity if 'i' does not depend on 'j'.
+
+    Returns:
+        The matrix, or None if the graph deadlocks, i.e. it has a cycle
+        without tokens.
+    '''
+    zero = hsdf.delays == 0
+    dag = nx.DiGraph()
+    dag.add_nodes_from(range(hsdf.num_nodes))
+    dag.add_edges_from(zip(hsdf.sources[zero].tolist(), hsdf.targets[zero].tolist()))
+    try:
+        order = list(nx.topological_sort(dag))
+    except nx.NetworkXUnfeasible:
+        return None
+    token_edges = np.nonzero(~zero)[0]
+    # the first token of every delayed edge, then the last, as token indexes
+    first = np.zeros(len(token_edges), dtype=int)
+    first[1:] = np.cumsum(hsdf.delays[token_edges])[:-1]
+    last = first + hsdf.delays[token_edges] - 1
+    num_tokens = int(hsdf.delays[token_edges].sum())
+    # longest time from every token being available to every node starting
+    longest = np.full((hsdf.num_nodes, num_tokens), -np.inf)
+    longest[hsdf.targets[token_edges], last] = 0.0
+    outgoing: List[List[Tuple[int, float]]] = [[] for _ in range(hsdf.num_nodes)]
+    for e in np.nonzero(zero)[0]:
+        outgoing[hsdf.sources[e]].append((hsdf.targets[e], hsdf.weights[e]))
+    for u in order:
+        for (v, w) in outgoing[u]:
+            np.maximum(longest[v], longest[u] + w, out=longest[v])
+    matrix = np.full((num_tokens, num_tokens), -np.inf)
+    matrix[first] = longest[hsdf.sources[token_edges]] + hsdf.weights[token_edges].reshape((-1, 1))
+    # tokens further down a delayed edge just move one position each iteration
+    inner = np.nonzero(hsdf.delays[token_edges] > 1)[0]
+    for i in inner:
+        positions = np.arange(first[i] + 1, last[i] + 1)
+        matrix[positions, positions - 1] = 0.0
+    return matrix
+
+
+def _karp(matrix: np.ndarray) -> float:
+    n = matrix.shape[0]
+    walks = np.full((n + 1, n), -np.inf)
+    walks[0] = 0.0
+    for k in range(1, n + 1):
+        walks[k] = np.max(matrix + walks[k - 1].reshape((1, -1)), axis=1)
+    finite = np.isfinite(walks[n])
+    if not finite.any():
+        return -np.inf
+    lengths = (n - np.arange(n)).reshape((-1, 1))
+    with np.errstate(invalid='ignore'):
+        means = np.where(np.isfinite(walks[:n]), (walks[n].reshape((1, -1)) - walks[:n]) / lengths, np.inf)
+    return float(np.max(np.min(means[:, finite], axis=0)))
+
+
+def max_cycle_mean(matrix: np.ndarray) -> float:
+    '''Get the maximum cycle mean of a max-plus matrix, or minus infinity if it has no cycles
+
+    Karp's algorithm is quadratic in memory and cubic in time, so it is
+    run separately on each strongly connected component.
+    '''
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(matrix.shape[0]))
+    graph.add_edges_from(zip(*(i.tolist() for i in np.nonzero(np.isfinite(matrix.T)))))
+    best = -np.inf
+    for component in nx.strongly_connected_components(graph):
+        nodes = sorted(component)
+        sub = matrix[np.ix_(nodes, nodes)]
+        if len(nodes) == 1 and not np.isfinite(sub[0, 0]):
+            continue
+        best = max(best, _karp(sub))
+    return best
+
+
+def period(hsdf: HSDFGraph) -> float:
+    '''Get the time between iterations of the HSDF graph in steady state, infinite if it deadlocks'''
+    matrix = maxplus_matrix(hsdf)
+    if matrix is None:
+        return np.inf
+    return max(max_cycle_mean(matrix), 0.0)
+
+
+def throughput(hsdf: HSDFGraph) -> float:
+    '''Get the iterations per time unit of the HSDF graph in steady state'''
+    p = period(hsdf)
+    return 0.0 if p == np.inf else (np.inf if p == 0 else 1.0 / p)
+
+
+def mapping_from_results(sdf_topology: np.ndarray,
+                         repetition_vector: np.ndarray,
+                         mapped_actors: Any,
+                         buffer_start: Any,
+                         sdf_pass: Sequence[int] = []) -> Tuple[np.ndarray, List[List[int]]]:
+    '''Get the core and the static orders of every firing from exploration results
+
+    The results are in the shape returned by the MiniZinc models, with
+    the firings of each core and step ordered by their PASS, as done when
+    rebuilding a ForSyDe model from them. Firings of an actor are numbered
+    by step first and then by core.
+
+    Arguments:
+        sdf_pass: Actor indexes of a PASS of the whole application. The
+            firings of a core and step without a PASS of their own are
+            ordered as in it, so that the simulation or the analysis can
+            tell whether that order runs.
+
+    Returns:
+        The core of every HSDF node and the HSDF nodes of every core, in order.
+    '''
+    mapped = np.array(mapped_actors, dtype=int)
+    buffers = np.array(buffer_start, dtype=int).reshape((sdf_topology.shape[0], mapped.shape[1], mapped.shape[2]))
+    repetitions = np.array(repetition_vector, dtype=int).reshape(-1)
+    offsets = np.zeros(len(repetitions) + 1, dtype=int)
+    offsets[1:] = np.cumsum(repetitions)
+    fired = np.zeros(len(repetitions), dtype=int)
+    firing_cores = np.full(offsets[-1], -1, dtype=int)
+    orders: List[List[int]] = [[] for _ in range(mapped.shape[1])]
+    for t in range(mapped.shape[2]):
+        for p in range(mapped.shape[1]):
+            step_pass = sdfapi.get_PASS(sdf_topology, mapped[:, p, t], buffers[:, p, t])
+            if not step_pass and mapped[:, p, t].any():
+                step_pass = _follow_pass(sdf_pass, mapped[:, p, t])
+            for a in step_pass:
+                node = offsets[a] + fired[a] % max(repetitions[a], 1)
+                fired[a] += 1
+                firing_cores[node] = p
+                orders[p].append(node)
+    return (firing_cores, orders)
+
+
+def _follow_pass(sdf_pass: Sequence[int], counts: np.ndarray) -> List[int]:
+    remaining = np.array(counts, copy=True)
+    firings: List[int] = []
+    # a step may hold more firings than one pass, which then repeats
+    progress = True
+    while remaining.any() and progress:
+        progress = False
+        for a in sdf_pass:
+            if remaining[a] > 0:
+                remaining[a] -= 1
+                firings.append(a)
+                progress = True
+    return firings
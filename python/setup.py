@@ -11,5 +11,6 @@ setup(name='idesyde',
       include_package_data=True,
       packages=find_packages(),
       install_requires=['forsyde-io-python', 'minizinc', 'numpy'],
+      extras_require={'cpsat': ['ortools'], 'milp': ['scipy']},
       entry_points={"console_scripts": ["idesyde = idesyde.cli:cli_entry"]},
       zip_safe=True)
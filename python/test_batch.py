@@ -0,0 +1,68 @@
+import csv
+import os
+
+import forsyde.io.python.api as forsyde_io
+
+from idesyde import batch
+from idesyde.benchmark import generators
+from idesyde.identification import routing
+
+
+def test_inputs_from_patterns_and_manifest(tmp_path):
+    for name in ('b.forxml', 'a.forxml', 'notes.txt'):
+        (tmp_path / name).write_text('')
+    (tmp_path / 'manifest').write_text('# nightly models\nb.forxml\n\nmissing.forxml  # not there yet\n')
+    inputs = batch.batch_inputs([str(tmp_path / '*.forxml')], manifest=str(tmp_path / 'manifest'))
+    assert inputs == [str(tmp_path / 'a.forxml'), str(tmp_path / 'b.forxml'), str(tmp_path / 'missing.forxml')]
+    assert batch.batch_output_path(inputs[0]) == str(tmp_path / 'out_a.forxml')
+    assert batch.batch_output_path(inputs[0], 'results') == 'results/out_a.forxml'
+
+
+def test_batch_reports_every_input(tmp_path):
+    model_path = str(tmp_path / 'model.forxml')
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(), 2), model_path)
+    missing_path = str(tmp_path / 'missing.forxml')
+    # no explorer has this name, so the exploration ends without solving
+    results = batch.run_batch([model_path, missing_path], request={'explorer': ['NoExplorer']}, workers=1)
+    assert [r.status for r in results] == ['no solution', 'failed']
+    assert 'identify' in results[0].phases
+    assert results[1].error
+    report = str(tmp_path / 'report.csv')
+    batch.write_batch_report(report, results)
+    with open(report) as stream:
+        rows = list(csv.DictReader(stream))
+    assert [r['model'] for r in rows] == [model_path, missing_path]
+    assert float(rows[0]['identify_s']) > 0
+
+
+def test_workers_share_routes_and_keep_the_input_order(tmp_path, monkeypatch):
+    # forked workers would otherwise find the routes of previous tests in memory
+    monkeypatch.setattr(routing, '_routing_cache', type(routing._routing_cache)())
+    paths = []
+    for (i, channels) in enumerate((generators.sobel_channels(), generators.chain_channels(4, seed=0))):
+        paths.append(str(tmp_path / f'model{i}.forxml'))
+        forsyde_io.write_model(generators.sdf_mpsoc_model(channels, 2), paths[-1])
+    paths.insert(1, str(tmp_path / 'missing.forxml'))
+    cache_dir = str(tmp_path / 'cache')
+    ended = []
+    results = batch.run_batch(paths,
+                              request={'explorer': ['NoExplorer']},
+                              workers=2,
+                              cache_dir=cache_dir,
+                              on_result=lambda r: ended.append(r.model))
+    assert [r.model for r in results] == paths
+    assert [r.status for r in results] == ['no solution', 'failed', 'no solution']
+    assert sorted(ended) == sorted(paths)
+    # both models are on the same platform, whose routes all workers share in one file
+    assert [f for f in os.listdir(cache_dir) if f.endswith('.routes.json')] == os.listdir(cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_single_worker_restores_the_routes_dir(tmp_path, monkeypatch):
+    model_path = str(tmp_path / 'model.forxml')
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(), 3), model_path)
+    monkeypatch.setattr(routing, '_routing_cache', type(routing._routing_cache)())
+    monkeypatch.setattr(routing, '_routing_cache_dir', None)
+    batch.run_batch([model_path], request={'explorer': ['NoExplorer']}, workers=1, cache_dir=str(tmp_path / 'cache'))
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+    assert routing._routing_cache_dir is None
@@ -0,0 +1,38 @@
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.benchmark import runner
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFExecution
+
+
+def test_generated_applications_are_consistent():
+    for channels in [
+            generators.chain_channels(6, max_repetition=3, seed=1),
+            generators.fork_join_channels(3, 2, max_repetition=3, seed=2),
+            generators.sobel_channels(2),
+            generators.random_dag_channels(10, 5, max_repetition=4, seed=3)
+    ]:
+        model = generators.sdf_mpsoc_model(channels, 3)
+        identified = identify_decision_models(model)
+        sdf_exec = next(m for m in identified if isinstance(m, SDFExecution))
+        assert len(sdf_exec.sdf_actors) == 1 + max(max(s, t) for (s, t, _, _) in channels)
+        assert len(sdf_exec.sdf_channels) == len(channels)
+        assert np.all(sdf_exec.sdf_topology @ sdf_exec.sdf_repetition_vector == 0)
+        assert len(identified) == 4
+
+
+def test_run_case_times_every_stage():
+    case = runner.BenchmarkCase(name='sobel', build=lambda: generators.sdf_mpsoc_model(generators.sobel_channels(), 2))
+    stages = runner.run_case(case, repeat=1, flatten=False)
+    for stage in ['generate', 'identify', 'identify;SDFAppRule', 'get_PASS', 'mzn_data', 'rebuild']:
+        assert stage in stages
+
+
+def test_compare_flags_regressions_only_above_threshold():
+    baseline = {'cases': {'a': {'identify': 0.1, 'rebuild': 0.1, 'noise': 1e-5}}}
+    current = {'cases': {'a': {'identify': 0.2, 'rebuild': 0.11, 'noise': 1e-4}}}
+    comparison = {e['stage']: e for e in runner.compare_results(baseline, current, threshold=0.25)}
+    assert comparison['identify']['regression']
+    assert not comparison['rebuild']['regression']
+    assert 'noise' not in comparison
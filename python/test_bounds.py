@@ -0,0 +1,55 @@
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.bounds import mpsoc_bounds
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def test_bounds_are_tighter_than_the_declared_domains():
+    model = generators.sdf_mpsoc_model(generators.random_dag_channels(10, 5, max_repetition=3, seed=1), 3)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    data = decision_model.get_mzn_data()
+    wcet = np.array(data['wcet'])
+    assert data['start_horizon'] <= np.sum(wcet) + np.sum(data['token_wcct'])
+    assert data['objective_upper_bounds'][0] == np.sum(wcet)
+    assert max(data['objective_upper_bounds']) <= 2 * np.sum(wcet)
+    assert np.max(data['send_horizon']) <= len(data['comms']) * max(data['max_tokens']) * np.max(data['token_wcct'])
+
+
+def test_bounds_follow_from_the_firings_of_each_core():
+    data = {
+        'sdf_actors': range(1, 3),
+        'sdf_channels': range(1, 2),
+        'procs': {1, 2},
+        'comms': {1},
+        'max_steps': 3,
+        'activations': [2, 1],
+        'max_tokens': [2],
+        'wcet': [[3, 0], [1, 2]],
+        'token_wcct': [[5]]
+    }
+    bounds = mpsoc_bounds(data)
+    assert 'proc_steps' not in bounds
+    assert bounds['max_busy'] == [6, 2]
+    assert bounds['start_horizon'] == 11
+    assert bounds['send_horizon'] == [[10]]
+    assert bounds['objective_upper_bounds'] == [6, 12]
+
+
+def test_cores_can_wait_beyond_their_own_wcets():
+    # the second actor only runs in the second core, after the slow firing of the first one
+    data = {
+        'sdf_actors': range(1, 3),
+        'sdf_channels': range(1, 2),
+        'procs': {1, 2},
+        'comms': {1},
+        'max_steps': 3,
+        'activations': [1, 1],
+        'max_tokens': [1],
+        'wcet': [[10, 0], [0, 1]],
+        'token_wcct': [[1]]
+    }
+    bounds = mpsoc_bounds(data)
+    assert bounds['start_horizon'] >= 10 + 1
+    assert bounds['objective_upper_bounds'][0] >= 10 + 1
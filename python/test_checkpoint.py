@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from idesyde import checkpoint
+from idesyde.benchmark import generators
+from idesyde.exploration import MinizincExplorer
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def _characterized():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 3)
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    decision_model = _characterized()
+    data = decision_model.get_mzn_data()
+    solution = {'mapped_actors': data['warm_mapped_actors'], 'objective_values': [7, 9]}
+    written = checkpoint.make_checkpoint(decision_model, 'gecode', solution, objective=25, bound=20)
+    path = str(tmp_path / 'run.ckpt')
+    checkpoint.write_checkpoint(path, written)
+    read = checkpoint.read_checkpoint(path)
+    assert read == written
+    assert read.matches(decision_model)
+    assert checkpoint.resume_data(read) == {'warm_mapped_actors': data['warm_mapped_actors']}
+    assert '< 25;' in checkpoint.improvement_constraint(read)
+
+
+def test_checkpoint_is_only_found_for_the_same_data():
+    decision_model = _characterized()
+    written = checkpoint.make_checkpoint(decision_model, 'gecode', {'mapped_actors': []}, objective=1)
+    assert checkpoint.find_checkpointed(written, [decision_model]) is decision_model
+    # same platform and application, but different WCETs
+    other = _characterized()
+    other.wcet = other.wcet + 1
+    assert other.fingerprint() == decision_model.fingerprint()
+    assert not written.matches(other)
+    assert checkpoint.find_checkpointed(written, [other]) is None
+
+
+def test_checkpoint_without_objective_cannot_be_resumed():
+    decision_model = _characterized()
+    written = checkpoint.make_checkpoint(decision_model, 'gecode', {'mapped_actors': []})
+    with pytest.raises(ValueError, match='no objective'):
+        checkpoint.improvement_constraint(written)
+    with pytest.raises(ValueError, match='no objective'):
+        asyncio.run(MinizincExplorer().solve_async(decision_model, resume=written))
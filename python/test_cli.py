@@ -0,0 +1,19 @@
+import logging
+
+import pytest
+
+import idesyde.pipeline
+from idesyde.cli import cli_entry
+
+
+def test_rejected_requests_exit_with_an_error(monkeypatch, caplog):
+
+    def run_pipeline(model_path, **kwargs):
+        raise ValueError('No explorer can take the decision model(s) without running out of memory')
+
+    monkeypatch.setattr(idesyde.pipeline, 'run_pipeline', run_pipeline)
+    monkeypatch.setattr('sys.argv', ['idesyde', 'model.forxml', '--mzn-log', ''])
+    with caplog.at_level(logging.ERROR, logger='CLI'), pytest.raises(SystemExit) as exit_info:
+        cli_entry()
+    assert exit_info.value.code == 1
+    assert 'running out of memory' in caplog.text
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Budget for 'import idesyde.cli', measured with 'python -X importtime'.
+# Timings depend on the machine, so the check only runs when a budget in
+# milliseconds is given through the IDESYDE_STARTUP_BUDGET_MS environment
+# variable. The heavy dependencies are always checked, as that does not
+# depend on timing.
+STARTUP_BUDGET_MS = os.environ.get('IDESYDE_STARTUP_BUDGET_MS')
+
+HEAVY_MODULES = ['numpy', 'sympy', 'networkx', 'minizinc', 'forsyde']
+
+PYTHON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_times(statement):
+    '''Run 'statement' in a fresh interpreter and collect its -X importtime report
+
+    Returns:
+        A dictionary from each imported module to its cumulative import
+        time in microseconds.
+    '''
+    env = dict(os.environ, PYTHONPATH=PYTHON_DIR)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          env=env,
+                          check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        (_, cumulative, name) = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_avoids_heavy_dependencies():
+    times = _import_times('import idesyde.cli')
+    loaded = [m for m in times if m.split('.')[0] in HEAVY_MODULES]
+    assert loaded == [], f'idesyde.cli eagerly imports {loaded}'
+
+
+@pytest.mark.skipif(STARTUP_BUDGET_MS is None, reason='IDESYDE_STARTUP_BUDGET_MS is not set')
+def test_cli_import_within_budget():
+    # best of a few runs to smooth out noise from the machine
+    best = min(_import_times('import idesyde.cli')['idesyde.cli'] for _ in range(3))
+    assert best / 1000 <= float(STARTUP_BUDGET_MS), f'idesyde.cli took {best / 1000:.1f}ms to import'
+
+
+def test_help_has_no_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=PYTHON_DIR)
+    proc = subprocess.run([sys.executable, '-m', 'idesyde.cli', '--help'],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          cwd=str(tmp_path),
+                          env=env)
+    assert proc.returncode == 0
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,46 @@
+import pickle
+
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.api import identify_decision_models_parallel
+from idesyde.identification.compact import VertexTable
+from idesyde.identification.compact import compact_decision_models
+from idesyde.identification.compact import expand_decision_models
+
+
+def _model():
+    return generators.sdf_mpsoc_model(generators.random_dag_channels(12, 6, max_repetition=3, seed=4), 3)
+
+
+def test_round_trip_keeps_decision_models():
+    model = _model()
+    identified = identify_decision_models(model)
+    table = VertexTable.from_model(model)
+    compacts = compact_decision_models(identified, table)
+    expanded = expand_decision_models(pickle.loads(pickle.dumps(compacts)), table)
+    assert [m.short_name() for m in expanded] == [m.short_name() for m in identified]
+    for (original, copy) in zip(identified, expanded):
+        assert list(copy.covered_vertexes()) == list(original.covered_vertexes())
+    assert expanded[0].sdf_channels == identified[0].sdf_channels
+    assert np.array_equal(expanded[0].sdf_topology, identified[0].sdf_topology)
+    assert np.array_equal(expanded[3].wcet, identified[3].wcet)
+    # nested sub models point to the already expanded ones
+    assert expanded[1].sdf_exec_sub is expanded[0]
+
+
+def test_compact_form_is_smaller():
+    model = generators.sdf_mpsoc_model(generators.chain_channels(48, max_repetition=3, seed=1), 4)
+    identified = identify_decision_models(model)
+    compacts = compact_decision_models(identified, VertexTable.from_model(model))
+    assert len(pickle.dumps(compacts)) * 4 < len(pickle.dumps(identified))
+
+
+def test_parallel_identification_matches_serial():
+    model = _model()
+    serial = identify_decision_models(model)
+    parallel = identify_decision_models_parallel(model, concurrent_idents=2)
+    assert sorted(m.short_name() for m in parallel) == sorted(m.short_name() for m in serial)
+    for m in parallel:
+        assert all(v in model for v in m.covered_vertexes())
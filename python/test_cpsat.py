@@ -0,0 +1,41 @@
+import pytest
+
+from idesyde.benchmark import generators
+from idesyde.exploration import CPSATExplorer
+from idesyde.exploration import MinizincExplorer
+from idesyde.exploration import choose_explorer
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+pytest.importorskip('ortools')
+
+
+def _characterized(cores):
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), cores)
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_cpsat_solves_and_rebuilds():
+    from idesyde import cpsat
+    decision_model = _characterized(2)
+    (status, results, statistics) = cpsat.SDFMPSoCModel(decision_model).solve(workers=2)
+    assert status == 'OPTIMAL'
+    mapped = results['mapped_actors']
+    activations = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector[:, 0]
+    assert [sum(sum(s) for s in a) for a in mapped] == activations.tolist()
+    # the throughput objective is the load of the busiest core
+    wcet = decision_model.wcet
+    loads = [sum(wcet[a, p] * sum(mapped[a][p]) for a in range(len(mapped))) for p in range(2)]
+    assert results['objective_values'][0] == max(loads)
+    assert statistics['solutions']
+    outcome = dict()
+    assert CPSATExplorer(workers=2).explore(decision_model, outcome=outcome) is not None
+    assert outcome['status'] == 'OPTIMAL' and outcome['report'].time_to_first_solution is not None
+
+
+def test_minizinc_is_preferred_when_it_fits():
+    decision_model = _characterized(2)
+    explorers = set([MinizincExplorer(), CPSATExplorer()])
+    assert [type(e) for (e, _) in choose_explorer([decision_model], explorers)] == [MinizincExplorer]
+    assert [type(e) for (e, _) in choose_explorer([decision_model], explorers, desired_names=['CPSATExplorer'])
+            ] == [CPSATExplorer]
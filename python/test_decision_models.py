@@ -0,0 +1,98 @@
+import pickle
+
+import pytest
+
+from idesyde.benchmark import generators
+from idesyde.identification.api import choose_decision_models
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.dominance import dominance_graph
+from idesyde.identification.dominance import non_dominated
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.rules import SDFMulticoreToJobsRule
+from idesyde.identification.rules import _standard_rules_classes
+
+
+def _identified():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    return (model, identify_decision_models(model))
+
+
+def test_fingerprint_is_content_based():
+    (model, identified) = _identified()
+    again = identify_decision_models(model)
+    for (m, other) in zip(identified, again):
+        assert m is not other
+        assert m == other
+        assert hash(m) == hash(other)
+        assert m.fingerprint() == other.fingerprint()
+    assert len(set(identified + again)) == len(identified)
+    # the order in which elements are covered does not matter
+    reordered = SDFExecution(sdf_actors=list(reversed(identified[0].sdf_actors)),
+                             sdf_channels=identified[0].sdf_channels)
+    assert reordered.fingerprint() == identified[0].fingerprint()
+    assert pickle.loads(pickle.dumps(identified[0])) == identified[0]
+
+
+def test_invalidate_caches_after_change():
+    (_, identified) = _identified()
+    sdf_exec = identified[0]
+    before = sdf_exec.fingerprint()
+    sdf_exec.sdf_actors = sdf_exec.sdf_actors[1:]
+    assert sdf_exec.fingerprint() == before
+    sdf_exec.invalidate_caches()
+    assert sdf_exec.fingerprint() != before
+
+
+def test_equality_compares_the_data():
+    (model, identified) = _identified()
+    characterized = identified[-1]
+    other = identify_decision_models(model)[-1]
+    assert other == characterized
+    # the data digest is cached, like the fingerprint
+    other.wcet = other.wcet + 1
+    assert other == characterized
+    other.invalidate_caches()
+    assert other.fingerprint() == characterized.fingerprint()
+    assert other != characterized
+    assert len({characterized, other}) == 2
+    other.wcet = other.wcet - 1
+    other.invalidate_caches()
+    assert other == characterized
+
+
+def test_default_capacities_are_independent_lists():
+    (first, second) = (SDFToMultiCore(), SDFToMultiCore())
+    first.comms_capacity.append(1)
+    assert second.comms_capacity == []
+
+
+def test_dominance_is_strict_coverage():
+    (_, identified) = _identified()
+    (sdf_exec, orders, mpsoc, characterized) = identified
+    assert orders.dominates(sdf_exec)
+    assert characterized.dominates(mpsoc)
+    assert not sdf_exec.dominates(orders)
+    assert not sdf_exec.dominates(sdf_exec)
+    # models covering disjoint parts of the input do not dominate each other
+    (first, second) = (SDFExecution(sdf_actors=sdf_exec.sdf_actors[:2]), SDFExecution(sdf_actors=sdf_exec.sdf_actors[2:]))
+    assert not first.dominates(second) and not second.dominates(first)
+    assert choose_decision_models(identified) == [characterized]
+    assert len(choose_decision_models([first, second])) == 2
+
+
+def test_dominance_graph_links_refinements():
+    (_, identified) = _identified()
+    graph = dominance_graph(identified)
+    assert sorted(graph.edges) == [(1, 0), (2, 1), (3, 2)]
+    assert not graph.has_edge(3, 0)
+    assert dominance_graph(identified, reduced=False).has_edge(3, 0)
+    assert non_dominated(list(reversed(identified))) == [identified[3]]
+
+
+
+def test_job_shop_rule_is_not_standard_while_it_cannot_run():
+    (model, identified) = _identified()
+    assert SDFMulticoreToJobsRule not in _standard_rules_classes
+    with pytest.raises(TypeError):
+        SDFMulticoreToJobsRule().identify(model, identified)
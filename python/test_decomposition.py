@@ -0,0 +1,51 @@
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.benchmark.runner import synthetic_results
+from idesyde.exploration import choose_explorer
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.decomposition import compose_results
+from idesyde.identification.decomposition import composed_model
+from idesyde.identification.decomposition import split_by_components
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+_APPS = [generators.chain_channels(4, max_repetition=3, seed=1), generators.sobel_channels(1)]
+
+
+def _characterized(model):
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_disjoint_applications_are_identified_separately():
+    sdf_exec = next(m for m in identify_decision_models(generators.independent_sdf_mpsoc_model(_APPS, 3))
+                    if isinstance(m, SDFExecution))
+    assert [len(c) for c in sdf_exec.sdf_components] == [4, 4]
+    for (i, channels) in enumerate(_APPS):
+        alone = next(m for m in identify_decision_models(generators.sdf_mpsoc_model(channels, 3))
+                     if isinstance(m, SDFExecution))
+        component = sdf_exec.sdf_components[i]
+        assert np.array_equal(sdf_exec.sdf_repetition_vector[component, :], alone.sdf_repetition_vector)
+
+
+def test_split_parts_compose_into_one_schedule():
+    decision_model = _characterized(generators.independent_sdf_mpsoc_model(_APPS, 3))
+    parts = split_by_components(decision_model)
+    assert len(parts) == 2
+    assert [p.wcet.shape[0] for p in parts] == [4, 4]
+    results = [synthetic_results(p.sdf_mpsoc_sub) for p in parts]
+    composed = compose_results(decision_model, parts, results)
+    mpsoc = composed_model(decision_model, parts)
+    assert mpsoc.max_steps == sum(p.sdf_mpsoc_sub.max_steps for p in parts)
+    mapped = np.array(composed['mapped_actors'])
+    assert np.array_equal(mapped.sum(axis=(1, 2)),
+                          decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector.reshape(-1))
+    rebuilt = mpsoc.rebuild_forsyde_model(composed)
+    assert all(a in rebuilt for a in mpsoc.sdf_orders_sub.sdf_exec_sub.sdf_actors)
+
+
+def test_parallel_explorer_is_chosen_only_by_name():
+    decision_model = _characterized(generators.independent_sdf_mpsoc_model(_APPS, 3))
+    assert [e.short_name() for (e, _) in choose_explorer([decision_model])] == ['MinizincExplorer']
+    chosen = choose_explorer([decision_model], desired_names=['ComponentsParallelExplorer'])
+    assert [e.short_name() for (e, _) in chosen] == ['ComponentsParallelExplorer']
@@ -0,0 +1,41 @@
+import datetime
+import json
+from types import SimpleNamespace
+
+from minizinc import Status
+
+from idesyde.exploration import ExplorationReport
+from idesyde.exploration import ExplorationResult
+from idesyde.pipeline import write_exploration_report
+
+
+def _report():
+    statistics = {'flatTime': datetime.timedelta(milliseconds=1500), 'nodes': 120, 'failures': 40, 'method': 'min'}
+    return ExplorationReport('SDFToMultiCoreCharacterized',
+                             'sdf_mpsoc_linear_dmodel.mzn',
+                             'gecode',
+                             status='OPTIMAL_SOLUTION',
+                             objective=12,
+                             wall_time=3.0,
+                             solutions=[(2.0, 20), (2.5, 12)],
+                             statistics=statistics)
+
+
+def test_report_is_attached_to_the_result():
+    result = ExplorationResult(Status.OPTIMAL_SOLUTION, SimpleNamespace(objective=12, mapped_actors=[[1]]), {},
+                               _report())
+    assert result.objective == 12
+    assert result['mapped_actors'] == [[1]]
+    assert result.report.time_to_first_solution == 2.0
+    summary = result.report.summary()
+    assert 'first after 2.000s' in summary and 'flatTime 1.5' in summary and 'failures 40' in summary
+
+
+def test_report_is_written_as_json(tmp_path):
+    path = str(tmp_path / 'report.json')
+    assert not write_exploration_report(path, {'explorer': 'ParetoExplorer'})
+    assert write_exploration_report(path, {'report': _report()})
+    with open(path) as stream:
+        written = json.load(stream)
+    assert written['statistics']['flatTime'] == 1.5
+    assert [s['objective'] for s in written['solutions']] == [20, 12]
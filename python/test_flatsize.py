@@ -0,0 +1,37 @@
+import pytest
+
+from idesyde.benchmark import generators
+from idesyde.exploration import ComponentsParallelExplorer
+from idesyde.exploration import choose_explorer
+from idesyde.identification import decomposition
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.flatsize import estimate_flat_size
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def _characterized(model):
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_variables_match_the_arrays_of_the_model():
+    decision_model = _characterized(generators.sdf_mpsoc_model(generators.sobel_channels(1), 3, core_types=2))
+    data = decision_model.get_mzn_data()
+    (a, c, p, u, s) = (len(data['sdf_actors']), len(data['sdf_channels']), len(data['procs']), len(data['comms']),
+                       data['max_steps'])
+    # mapped_actors, start, busy_time, local_throughput, buffers, flow, sends and objective
+    expected = a * p * s + 3 * p * s + 2 * c * p * s + c * p * p * s * s * (1 + 2 * u) + 2
+    assert estimate_flat_size(decision_model).variables == expected
+
+
+def test_too_large_models_go_to_smaller_parts_or_fail_fast(monkeypatch):
+    applications = [generators.chain_channels(8, max_repetition=3, seed=i) for i in range(3)]
+    decision_model = _characterized(generators.independent_sdf_mpsoc_model(applications, 4, seed=0))
+    whole = estimate_flat_size(decision_model).constraints
+    part = max(estimate_flat_size(p).constraints for p in decomposition.split_by_components(decision_model))
+    assert part < whole
+    monkeypatch.setenv('IDESYDE_MAX_FLAT_CONSTRAINTS', str(part))
+    chosen = choose_explorer([decision_model])
+    assert [type(e) for (e, _) in chosen] == [ComponentsParallelExplorer]
+    monkeypatch.setenv('IDESYDE_MAX_FLAT_CONSTRAINTS', str(part - 1))
+    with pytest.raises(ValueError, match='SDFToMultiCoreCharacterized would flatten to about'):
+        choose_explorer([decision_model])
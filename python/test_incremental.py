@@ -0,0 +1,85 @@
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.identification.api import _get_standard_rules
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.incremental import diff_models
+from idesyde.identification.incremental import identify_decision_models_incremental
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.profiling import PhaseProfiler
+
+
+def _vertex(model, identifier):
+    return next(v for v in model if v.identifier == identifier)
+
+
+def _assert_same(identified, expected):
+    assert identified == expected
+    for (m, e) in zip(identified, expected):
+        if isinstance(m, SDFExecution):
+            assert np.array_equal(m.sdf_repetition_vector, e.sdf_repetition_vector)
+            assert m.sdf_pass == e.sdf_pass
+        if isinstance(m, SDFToMultiCoreCharacterized):
+            assert np.array_equal(m.wcet, e.wcet)
+            assert np.array_equal(m.token_wcct, e.token_wcct)
+
+
+def _spy_on_rules(monkeypatch, rules):
+    # record which rules were patched and which had to identify again
+    calls = []
+    for rule in rules:
+        (patch, identify) = (rule.patch, rule.identify)
+
+        def spy_patch(*args, rule=rule, patch=patch):
+            result = patch(*args)
+            calls.append(('patch' if result is not None else 'no patch', rule.short_name()))
+            return result
+
+        def spy_identify(*args, rule=rule, identify=identify):
+            calls.append(('identify', rule.short_name()))
+            return identify(*args)
+
+        monkeypatch.setattr(rule, 'patch', spy_patch)
+        monkeypatch.setattr(rule, 'identify', spy_identify)
+    return calls
+
+
+def test_wcet_change_is_patched(monkeypatch):
+    channels = generators.chain_channels(6, max_repetition=3, seed=1)
+    old = generators.sdf_mpsoc_model(channels, 2)
+    previous = identify_decision_models(old)
+    new = generators.sdf_mpsoc_model(channels, 2)
+    _vertex(new, 'app/actor3/wcet0').properties['time'] = 12345
+    assert diff_models(old, new).changed_vertexes == {'app/actor3/wcet0'}
+    profiler = PhaseProfiler()
+    rules = _get_standard_rules()
+    calls = _spy_on_rules(monkeypatch, rules)
+    identified = identify_decision_models_incremental(new, old, previous, rules=rules, profiler=profiler)
+    _assert_same(identified, identify_decision_models(new))
+    # every rule that identified a model before patched it instead of identifying it again
+    patched = [name for (kind, name) in calls if kind == 'patch']
+    assert patched == ['SDFAppRule', 'SDFOrderRule', 'SDFToCoresRule', 'SDFToCoresCharacterizedRule']
+    assert not any(kind == 'identify' and name in patched for (kind, name) in calls)
+    wcet = next(m for m in identified if isinstance(m, SDFToMultiCoreCharacterized)).wcet
+    assert 12345 in wcet[3, :]
+    assert ('diff', ) in profiler.records
+
+
+def test_rate_change_recomputes_repetition_vector():
+    channels = generators.chain_channels(6, max_repetition=3, seed=1)
+    old = generators.sdf_mpsoc_model(channels, 2)
+    previous = identify_decision_models(old)
+    new = generators.sdf_mpsoc_model(channels, 2)
+    _vertex(new, 'app/actor0Cons').properties['production'] = {'out0': channels[0][2] * 2}
+    identified = identify_decision_models_incremental(new, old, previous)
+    _assert_same(identified, identify_decision_models(new))
+    (old_exec, new_exec) = (next(m for m in ms if isinstance(m, SDFExecution)) for ms in (previous, identified))
+    assert not np.array_equal(old_exec.sdf_repetition_vector, new_exec.sdf_repetition_vector)
+
+
+def test_added_actor_matches_full_identification():
+    old = generators.sdf_mpsoc_model(generators.chain_channels(5, max_repetition=3, seed=1), 2)
+    new = generators.sdf_mpsoc_model(generators.chain_channels(6, max_repetition=3, seed=1), 2)
+    identified = identify_decision_models_incremental(new, old, identify_decision_models(old))
+    _assert_same(identified, identify_decision_models(new))
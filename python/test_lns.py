@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import datetime
+import random
+from types import SimpleNamespace
+
+import numpy as np
+from minizinc import Result
+from minizinc import Status
+
+from idesyde import exploration
+from idesyde.benchmark import generators
+from idesyde.exploration import LNSExplorer
+from idesyde.exploration import lns_constraints
+from idesyde.exploration import lns_neighbourhood
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def _incumbent():
+    # actors 0 and 1 on core 0, actor 2 on core 1, actor 3 on core 2
+    mapped = np.zeros((4, 3, 2), dtype=int)
+    (mapped[0, 0, 0], mapped[1, 0, 1], mapped[2, 1, 0], mapped[3, 2, 1]) = (1, 2, 1, 1)
+    topology = np.array([[1, -2, 0, 0], [0, 1, -1, 0], [0, 0, 1, -1]])
+    return (mapped, topology)
+
+
+def test_neighbourhoods_release_actors_with_their_cores():
+    (mapped, topology) = _incumbent()
+    rng = random.Random(1)
+    for _ in range(10):
+        (actors, cores) = lns_neighbourhood('core', mapped, topology, rng)
+        assert all(mapped[a, sorted(cores)].any() for a in actors)
+        (actors, cores) = lns_neighbourhood('channel', mapped, topology, rng)
+        assert len(actors) == 2 and any(set(np.nonzero(row)[0]) == actors for row in topology)
+        assert all(mapped[a, sorted(cores)].any() for a in actors)
+        (actors, cores) = lns_neighbourhood('random', mapped, topology, rng, fraction=0.5)
+        assert len(actors) == 2
+
+
+def test_constraints_fix_everything_outside_the_neighbourhood():
+    (mapped, _) = _incumbent()
+    start = np.arange(6).reshape((3, 2))
+    constraints = lns_constraints(mapped, start, {1, 2}, {0, 1}, bound=42)
+    fixed = [['true'] * 3 for _ in range(4)]
+    for a in (1, 2):
+        for p in (0, 1):
+            fixed[a][p] = 'false'
+    assert 'array2d(sdf_actors, procs, [' + ', '.join(sum(fixed, [])) + '])' in constraints
+    assert 'lns_fixed_start = [false, false, true]' in constraints
+    assert '< 42;' in constraints
+
+
+def _result(mapped, start, values):
+    # the objective of a MiniZinc result is the weighted sum that is minimised
+    solution = SimpleNamespace(objective=values[0], objective_values=values, mapped_actors=mapped, start=start)
+    return Result(Status.SATISFIED, solution, dict())
+
+
+class _FakeInstance(object):
+    '''Gives an incumbent, then improves it once on the first neighbourhood'''
+
+    def __init__(self, mapped, start, improvements):
+        (self.mapped, self.start, self.improvements) = (mapped, start, improvements)
+        self.constraints = []
+
+    async def solve_async(self, time_limit=None):
+        return _result(self.mapped, self.start, [10, 10])
+
+    @contextlib.contextmanager
+    def branch(self):
+
+        async def solve_async(time_limit=None):
+            if self.improvements:
+                return _result(self.mapped, self.start, self.improvements.pop(0))
+            return Result(Status.UNSATISFIABLE, None, dict())
+
+        yield SimpleNamespace(add_string=self.constraints.append, solve_async=solve_async)
+
+
+def test_improving_neighbourhoods_replace_the_incumbent(monkeypatch):
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    data = decision_model.get_mzn_data()
+    (mapped, start) = (data['warm_mapped_actors'], np.zeros((2, data['max_steps']), dtype=int).tolist())
+    improvements = [[8, 10], [9, 10]]
+    fakes = [_FakeInstance(mapped, start, improvements) for _ in range(2)]
+    instances = list(fakes)
+    monkeypatch.setattr(exploration, '_mzn_instance', lambda *args: instances.pop())
+    monkeypatch.setattr(decision_model, 'rebuild_forsyde_model', lambda result: result['objective_values'])
+    explorer = LNSExplorer(rounds=2, workers=2, time_limit=datetime.timedelta(seconds=1))
+    assert asyncio.run(explorer.explore_async(decision_model)) == [8, 10]
+    # the second round only accepts what improves on the first improvement
+    assert not improvements
+    assert sum('< 8;' in c for f in fakes for c in f.constraints) == 2
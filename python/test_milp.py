@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from idesyde import exploration
+from idesyde.benchmark import generators
+from idesyde.exploration import CPSATExplorer
+from idesyde.exploration import LNSExplorer
+from idesyde.exploration import MILPExplorer
+from idesyde.exploration import MinizincExplorer
+from idesyde.exploration import choose_explorer
+from idesyde.exploration import explorer_priority
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+pytest.importorskip('scipy')
+
+
+def _characterized(cores):
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), cores)
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_milp_solves_and_schedules_the_slots():
+    from idesyde import milp
+    decision_model = _characterized(3)
+    decision_model.sdf_mpsoc_sub.comms_capacity = [1]
+    (status, results, statistics) = milp.solve_mpsoc(decision_model)
+    assert status == 'OPTIMAL' and statistics['constraints'] > 0
+    mapped = np.array(results['mapped_actors'])
+    activations = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector[:, 0]
+    assert np.sum(mapped, axis=(1, 2)).tolist() == activations.tolist()
+    # with a single slot, no two transfers share the bus at once
+    (start, duration) = (np.array(results['send_start']), np.array(results['send_duration']))
+    sends = sorted((s, s + d) for (s, d) in zip(start[duration > 0], duration[duration > 0]))
+    assert all(e <= s for ((_, e), (s, _)) in zip(sends, sends[1:]))
+    outcome = dict()
+    assert MILPExplorer().explore(decision_model, outcome=outcome) is not None
+    assert outcome['status'] == 'OPTIMAL' and outcome['report'].solver == 'highs'
+
+
+def test_milp_is_preferred_for_large_throughput_models(monkeypatch):
+    decision_model = _characterized(2)
+    explorers = set([MinizincExplorer(), MILPExplorer()])
+    assert [type(e) for (e, _) in choose_explorer([decision_model], explorers)] == [MinizincExplorer]
+    monkeypatch.setattr(exploration, 'MILP_FASTER_MAPPINGS', 1)
+    assert [type(e) for (e, _) in choose_explorer([decision_model], explorers)] == [MILPExplorer]
+    decision_model.latency_importance = decision_model.throughput_importance + 1
+    assert [type(e) for (e, _) in choose_explorer([decision_model], explorers)] == [MinizincExplorer]
+
+
+def test_explorers_are_ranked_in_one_place(monkeypatch):
+    decision_model = _characterized(2)
+    ranked = [MinizincExplorer(), CPSATExplorer(), MILPExplorer(), LNSExplorer()]
+    assert sorted(ranked, key=lambda e: -explorer_priority(e, decision_model)) == ranked
+    assert all(e.dominates(o, decision_model)[0] != o.dominates(e, decision_model)[0]
+               for (i, e) in enumerate(ranked) for o in ranked[i + 1:])
+    monkeypatch.setattr(exploration, 'MILP_FASTER_MAPPINGS', 1)
+    assert all(ranked[2].dominates(o, decision_model)[0] for o in ranked if o is not ranked[2])
@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import re
+from types import SimpleNamespace
+
+from minizinc import Result
+from minizinc import Status
+
+from idesyde import exploration
+from idesyde.exploration import ParetoExplorer
+from idesyde.exploration import ParetoPoint
+from idesyde.exploration import choose_explorer
+from idesyde.exploration import non_dominated
+from idesyde.exploration import pareto_table
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.pipeline import pareto_output_path
+
+
+def test_front_keeps_non_dominated_points():
+    points = [ParetoPoint(5, 10), ParetoPoint(7, 4), ParetoPoint(6, 12), ParetoPoint(5, 10), ParetoPoint(9, 4)]
+    front = non_dominated(points)
+    assert [(p.throughput, p.latency) for p in front] == [(5, 10), (7, 4)]
+    assert len(pareto_table(front).splitlines()) == 3
+
+
+def test_pareto_explorer_is_chosen_only_by_name():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    assert not any(isinstance(e, ParetoExplorer) for (e, _) in choose_explorer([decision_model]))
+    chosen = choose_explorer([decision_model], desired_names=['ParetoExplorer'])
+    assert [type(e) for (e, _) in chosen] == [ParetoExplorer]
+    assert pareto_output_path('out/model.forsyde.xml', 2) == 'out/model_pareto2.forsyde.xml'
+
+
+class _FakeInstance(object):
+    '''Solves to the first of 'points' within the latency bound added to a branch'''
+
+    def __init__(self, points):
+        self.points = points
+        self.bounds = []
+
+    @contextlib.contextmanager
+    def branch(self):
+        child = SimpleNamespace(bound=None)
+        child.add_string = lambda s: setattr(child, 'bound', int(re.search(r'<= (-?\d+)', s).group(1)))
+
+        async def solve_async():
+            self.bounds.append(child.bound)
+            for (throughput, latency) in self.points:
+                if child.bound is None or latency <= child.bound:
+                    # the objective of a MiniZinc result is the weighted sum that is minimised
+                    solution = SimpleNamespace(objective=throughput * 100 + latency,
+                                               objective_values=[throughput, latency])
+                    return Result(Status.OPTIMAL_SOLUTION, solution, dict())
+            return Result(Status.UNSATISFIABLE, None, dict())
+
+        child.solve_async = solve_async
+        yield child
+
+
+def test_sweep_solves_points_below_the_previous_latency(monkeypatch):
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    instance = _FakeInstance([(5, 10), (6, 12), (7, 4), (9, 1)])
+    monkeypatch.setattr(exploration, '_mzn_instance', lambda *args: instance)
+    monkeypatch.setattr(decision_model, 'rebuild_forsyde_model', lambda result: result['objective_values'])
+    front = ParetoExplorer().explore_front(decision_model)
+    assert [(p.throughput, p.latency) for p in front] == [(5, 10), (7, 4), (9, 1)]
+    assert instance.bounds == [None, 9, 3, 0]
+    assert [p.model for p in front] == [[5, 10], [7, 4], [9, 1]]
+    point = asyncio.run(ParetoExplorer()._solve_point(instance, 4))
+    assert (point[0].throughput, point[0].latency) == (7, 4)
@@ -0,0 +1,87 @@
+import copy
+import math
+
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.exploration import presolve
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def _characterized(channels, num_cores):
+    model = generators.sdf_mpsoc_model(channels, num_cores)
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_bounds_of_feasible_model():
+    decision_model = _characterized(generators.sobel_channels(1), 3)
+    report = presolve(decision_model)
+    assert report.feasible
+    repetitions = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector.reshape(-1)
+    work = int(np.sum(repetitions * np.min(decision_model.wcet, axis=1)))
+    assert report.utilisation_bound >= math.ceil(work / 3)
+    assert report.critical_path_bound >= int(np.max(np.min(decision_model.wcet, axis=1)))
+    assert report.mzn_overrides() == {'objective_lower_bounds': [report.utilisation_bound, 0]}
+    # the data given to minizinc takes the override
+    data = decision_model.get_mzn_data()
+    data.update(report.mzn_overrides())
+    assert data['objective_lower_bounds'][0] == report.utilisation_bound
+
+
+def test_infeasible_models_are_rejected():
+    decision_model = _characterized(generators.sobel_channels(1), 2)
+    no_core = copy.copy(decision_model)
+    no_core.wcet = decision_model.wcet.copy()
+    no_core.wcet[0, :] = 0
+    report = presolve(no_core)
+    assert not report.feasible
+    assert len(report.reasons) == 1
+    assert 'has no core with a non-zero WCET' in report.reasons[0]
+    # the first channel can only cross cores, and there is no path between them
+    topology = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_topology
+    (s, t) = (int(np.nonzero(topology[0] > 0)[0][0]), int(np.nonzero(topology[0] < 0)[0][0]))
+    unrouted = copy.copy(decision_model)
+    unrouted.wcet = decision_model.wcet.copy()
+    (unrouted.wcet[s, 1], unrouted.wcet[t, 0]) = (0, 0)
+    unrouted.sdf_mpsoc_sub = copy.copy(decision_model.sdf_mpsoc_sub)
+    unrouted.sdf_mpsoc_sub.comms_path = np.zeros_like(decision_model.sdf_mpsoc_sub.comms_path)
+    assert not presolve(unrouted).feasible
+    # with the paths back the channel is feasible, but must pay for the crossing
+    routed = copy.copy(unrouted)
+    routed.sdf_mpsoc_sub = decision_model.sdf_mpsoc_sub
+    assert presolve(routed).feasible
+    assert presolve(routed).communication_bound > 0
+
+
+def test_tokens_can_be_relayed_by_other_cores():
+    decision_model = _characterized(generators.sobel_channels(1), 3)
+    topology = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_topology
+    (s, t) = (int(np.nonzero(topology[0] > 0)[0][0]), int(np.nonzero(topology[0] < 0)[0][0]))
+    # the source only runs on the first core and the target on the last one,
+    # which has no path from the first one but one through the second core
+    relayed = copy.copy(decision_model)
+    relayed.wcet = decision_model.wcet.copy()
+    relayed.wcet[s, 1:] = 0
+    relayed.wcet[t, :2] = 0
+    relayed.sdf_mpsoc_sub = copy.copy(decision_model.sdf_mpsoc_sub)
+    relayed.sdf_mpsoc_sub.comms_path = decision_model.sdf_mpsoc_sub.comms_path.copy()
+    relayed.sdf_mpsoc_sub.comms_path[0, 2, :] = 0
+    report = presolve(relayed)
+    assert report.feasible
+    delays = relayed.comm_delays()[0]
+    assert report.communication_bound >= math.ceil(delays[0, 1] + delays[1, 2])
+    # without the second hop the target cannot be reached
+    relayed.sdf_mpsoc_sub.comms_path[1, 2, :] = 0
+    report = presolve(relayed)
+    assert not report.feasible
+    assert 'crosses unreachable cores' in report.reasons[0]
+
+
+def test_other_models_are_not_screened():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCore))
+    report = presolve(decision_model)
+    assert report.feasible
+    assert report.mzn_overrides() == dict()
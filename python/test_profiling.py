@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from idesyde import profiling
+from idesyde.profiling import PhaseProfiler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # a clock that only moves when told to, for both wall and CPU time
+    now = SimpleNamespace(t=0.0)
+    monkeypatch.setattr(profiling, 'time', SimpleNamespace(perf_counter=lambda: now.t, process_time=lambda: now.t))
+    return now
+
+
+def _flow(profiler, clock):
+    with profiler.phase('identify'):
+        clock.t += 1.0
+        for _ in range(2):
+            with profiler.phase('rule'):
+                clock.t += 2.0
+    with profiler.phase('explore'):
+        clock.t += 3.0
+        profiler.record('solver', wall=1.5)
+
+
+def test_nested_phases_are_aggregated_by_path(clock):
+    profiler = PhaseProfiler()
+    _flow(profiler, clock)
+    assert set(profiler.records) == {('identify', ), ('identify', 'rule'), ('explore', ), ('explore', 'solver')}
+    assert profiler.records['identify', 'rule'].calls == 2
+    assert profiler.records['identify', 'rule'].wall == 4.0
+    assert profiler.records[('identify', )].wall == 5.0
+    assert profiler.self_time(('identify', )) == 1.0
+    assert profiler.self_time(('explore', )) == 1.5
+    assert profiler.self_time(('identify', 'rule')) == 4.0
+
+
+def test_reports_are_written_as_json_or_folded_stacks(clock, tmp_path):
+    profiler = PhaseProfiler()
+    _flow(profiler, clock)
+    profiler.write(str(tmp_path / 'flow.json'))
+    with open(tmp_path / 'flow.json') as stream:
+        report = json.load(stream)
+    assert report['total_wall_s'] == 8.0
+    assert [p['phase'] for p in report['phases']] == ['explore', 'explore;solver', 'identify', 'identify;rule']
+    assert {'calls', 'wall_s', 'cpu_s', 'peak_rss_kb'} <= set(report['phases'][0])
+    profiler.write(str(tmp_path / 'flow.folded'))
+    with open(tmp_path / 'flow.folded') as stream:
+        folded = stream.read().splitlines()
+    assert folded == ['explore 1500000', 'explore;solver 1500000', 'identify 1000000', 'identify;rule 4000000']
+
+
+def test_one_cprofile_dump_per_top_level_phase(tmp_path):
+    profiler = PhaseProfiler(cprofile_dir=str(tmp_path / 'prof'))
+    for name in ('parse', 'identify', 'parse'):
+        with profiler.phase(name), profiler.phase('nested'):
+            pass
+    assert sorted(os.listdir(tmp_path / 'prof')) == ['000_parse.prof', '001_identify.prof', '002_parse.prof']
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc/self/status')
+def test_peak_rss_is_measured_within_each_phase():
+    profiler = PhaseProfiler()
+    with profiler.phase('outer'):
+        with profiler.phase('allocate'):
+            block = b'\x01' * (64 * 1024 * 1024)
+            del block
+        with profiler.phase('idle'):
+            pass
+    records = profiler.records
+    if not profiler._resets_high_water:
+        pytest.skip('the high water mark of the process cannot be reset')
+    # the block is freed before the phase ends, so only the peak shows it
+    assert records['outer', 'allocate'].peak_rss_kb >= records['outer', 'idle'].peak_rss_kb + 32 * 1024
+    assert records[('outer', )].peak_rss_kb >= records['outer', 'allocate'].peak_rss_kb
+    assert profiler.report()['peak_rss_kb'] >= records['outer', 'allocate'].peak_rss_kb
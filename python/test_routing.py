@@ -0,0 +1,77 @@
+import json
+
+import networkx as nx
+import numpy as np
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.types import AbstractCommunicationComponent
+from forsyde.io.python.types import AbstractPhysicalConnection
+from forsyde.io.python.types import AbstractProcessingComponent
+
+from idesyde.benchmark import generators
+from idesyde.identification import routing
+from idesyde.identification.routing import _routing_cache
+from idesyde.identification.routing import platform_fingerprint
+from idesyde.identification.routing import route_platform
+
+
+def _ring(model, size):
+    '''Cores each attached to one router of a bidirectional ring of routers'''
+    cores = [generators.add_vertex(model, AbstractProcessingComponent(identifier=f'core{i}')) for i in range(size)]
+    routers = [
+        generators.add_vertex(model, AbstractCommunicationComponent(identifier=f'router{i}')) for i in range(size)
+    ]
+    for i in range(size):
+        for (s, t) in ((cores[i], routers[i]), (routers[i], cores[i]), (routers[i], routers[(i + 1) % size]),
+                       (routers[(i + 1) % size], routers[i])):
+            generators.add_edge(model, AbstractPhysicalConnection(source_vertex=s, target_vertex=t))
+    return (cores, routers)
+
+
+def test_routes_are_shortest_platform_paths():
+    model = ForSyDeModel()
+    (cores, routers) = _ring(model, 6)
+    (connections, comms_path) = route_platform(model, cores, routers)
+    assert len(connections) == 6 * 5
+    for (s, t, path) in connections:
+        assert len(path) == nx.shortest_path_length(model, s, t) - 1
+        hops = comms_path[cores.index(s), cores.index(t)]
+        assert sorted((hops[c], routers[c].identifier) for c in np.nonzero(hops)[0]) ==\
+            [(i + 1, r.identifier) for (i, r) in enumerate(path)]
+
+
+def test_routing_is_cached_per_platform():
+    (first, second) = (ForSyDeModel(), ForSyDeModel())
+    (cores, routers) = _ring(first, 4)
+    (other_cores, other_routers) = _ring(second, 4)
+    # an application does not change the platform fingerprint
+    generators.build_sdf_application(second, generators.chain_channels(3, seed=0))
+    assert platform_fingerprint(first, cores, routers) == platform_fingerprint(second, other_cores, other_routers)
+    route_platform(first, cores, routers)
+    cached = len(_routing_cache)
+    (connections, _) = route_platform(second, other_cores, other_routers)
+    assert len(_routing_cache) == cached
+    assert all(s in other_cores and t in other_cores and all(c in other_routers for c in p)
+               for (s, t, p) in connections)
+
+
+def test_routes_are_shared_through_the_cache_dir(tmp_path, monkeypatch):
+    model = ForSyDeModel()
+    (cores, routers) = _ring(model, 5)
+    monkeypatch.setattr(routing, '_routing_cache', type(_routing_cache)())
+    monkeypatch.setattr(routing, '_routing_cache_dir', None)
+    routing.set_routing_cache_dir(str(tmp_path))
+    (connections, comms_path) = route_platform(model, cores, routers)
+    assert len(list(tmp_path.iterdir())) == 1
+    # another process only has the files, and does not route again
+    routing._routing_cache.clear()
+    route = routing._route
+    monkeypatch.setattr(routing, '_route', None)
+    (shared_connections, shared_comms_path) = route_platform(model, cores, routers)
+    assert shared_connections == connections
+    assert np.array_equal(shared_comms_path, comms_path)
+    # files that do not fit the platform are routed again
+    (stored, ) = tmp_path.iterdir()
+    stored.write_text(json.dumps({'connections': [[0, 9, [0]]], 'comms_path': comms_path.tolist()}))
+    routing._routing_cache.clear()
+    monkeypatch.setattr(routing, '_route', route)
+    assert route_platform(model, cores, routers)[0] == connections
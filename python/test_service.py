@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+import idesyde.pipeline
+from idesyde.pipeline import PipelineCache
+from idesyde.pipeline import parse_and_identify
+from idesyde.service import DSEService
+from idesyde.service import submit
+from idesyde.service import validate_request
+
+
+def test_jobs_stream_their_log_and_are_rejected_when_full(monkeypatch):
+    release = threading.Event()
+
+    def run_pipeline(model_path, outputs, logger, **kwargs):
+        logger.info(f'Parsing {model_path}')
+        release.wait(timeout=10)
+        return outputs
+
+    monkeypatch.setattr(idesyde.pipeline, 'run_pipeline', run_pipeline)
+
+    async def scenario():
+        service = DSEService(concurrency=1, max_queue=1)
+        server = asyncio.ensure_future(service.serve(port=0))
+        while service.address is None:
+            await asyncio.sleep(0.01)
+        (host, port) = service.address
+        (first_events, second_events) = ([], [])
+        first = asyncio.ensure_future(
+            submit({'model': 'first.forxml', 'output': ['first.out']}, host, port, first_events.append))
+        while not any(e['event'] == 'progress' for e in first_events):
+            await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(
+            submit({'model': 'second.forxml', 'output': ['second.out']}, host, port, second_events.append))
+        while not second_events:
+            await asyncio.sleep(0.01)
+        full = await submit({'model': 'third.forxml'}, host, port)
+        invalid = await submit({'model': 'fourth.forxml', 'verbosity': 'LOUD'}, host, port)
+        mistyped = await submit({'model': 'fifth.forxml', 'output': 'fifth.out'}, host, port)
+        release.set()
+        done = await asyncio.gather(first, second)
+        server.cancel()
+        return (first_events, second_events, full, invalid, mistyped, done)
+
+    handlers = list(logging.getLogger('CLI').handlers)
+    (first_events, second_events, full, invalid, mistyped, done) = asyncio.run(scenario())
+    assert [e['event'] for e in first_events] == ['queued', 'started', 'progress']
+    assert first_events[-1]['message'] == 'Parsing first.forxml'
+    assert second_events[0] == {'event': 'queued', 'job': 2, 'position': 1}
+    assert full == {'event': 'rejected', 'reason': 'Job queue is full'}
+    assert invalid['event'] == 'rejected' and 'LOUD' in invalid['reason']
+    assert mistyped['event'] == 'rejected' and 'output must be a list of strings' in mistyped['reason']
+    assert [(d['event'], d['outputs']) for d in done] == [('done', ['first.out']), ('done', ['second.out'])]
+    # jobs log through the single CLI logger, so no logger is left behind per job
+    assert not any(name.startswith('CLI.') for name in logging.Logger.manager.loggerDict)
+    assert logging.getLogger('CLI').handlers == handlers
+
+
+def test_requests_are_checked_for_the_types_of_their_entries():
+    validate_request({'model': 'a.forxml', 'output': ['a.out'], 'pareto': 3, 'snapshot': True, 'resume': None})
+    for (key, value) in (('pareto', True), ('pareto', -1), ('explorer', [1]), ('snapshot', 'yes'), ('resume', 3)):
+        with pytest.raises(ValueError, match=key):
+            validate_request({'model': 'a.forxml', key: value})
+
+
+def test_pipeline_cache_is_keyed_by_content_and_evicts_the_least_recent(tmp_path, monkeypatch):
+    cache = PipelineCache(max_entries=2)
+    cache.put('a', 'model a', [])
+    cache.put('b', 'model b', [])
+    assert cache.get('a') == ('model a', [])
+    cache.put('c', 'model c', [])
+    assert cache.get('b') is None and len(cache) == 2
+    assert cache.get('a') and cache.get('c')
+    # the same content under another name is a hit, and other content is not
+    (first, renamed, other) = (tmp_path / 'first.forxml', tmp_path / 'renamed.forxml', tmp_path / 'other.forxml')
+    first.write_text('same')
+    renamed.write_text('same')
+    other.write_text('other')
+    parsed = []
+    monkeypatch.setattr(idesyde.pipeline.forsyde_io, 'load_model', lambda path: parsed.append(path) or path)
+    monkeypatch.setattr(idesyde.pipeline, 'identify_decision_models', lambda model, **kwargs: [])
+    logger = logging.getLogger('test')
+    assert parse_and_identify(str(first), logger, cache)[0] == str(first)
+    assert parse_and_identify(str(renamed), logger, cache)[0] == str(first)
+    assert parse_and_identify(str(other), logger, cache)[0] == str(other)
+    assert parsed == [str(first), str(other)]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.benchmark.runner import synthetic_results
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.simulation import simulate
+from idesyde.simulation import simulate_results
+from idesyde.simulation import validate_results
+from idesyde.throughput import build_hsdf
+from idesyde.throughput import period
+
+
+def test_simulated_period_matches_analysis():
+    # a fires twice per firing of b, b sends two tokens back with a delay of 2 from core 1 to core 0
+    topology = np.array([[1, -2], [-1, 2]])
+    times = np.array([[3.0, 5.0], [4.0, 2.0]])
+    comm_delays = np.zeros((2, 2, 2))
+    comm_delays[1, 1, 0] = 2.0
+    simulated = simulate(topology, [2, 1], [[0], [1]], times, initial_tokens=[0, 2], comm_delays=comm_delays,
+                         iterations=50)
+    hsdf = build_hsdf(topology, [2, 1], [0, 2],
+                      execution_times=np.array([3.0, 3.0, 2.0]),
+                      firing_cores=np.array([0, 0, 1]),
+                      comm_delays=comm_delays,
+                      orders=[[0, 1], [2]])
+    assert not simulated.deadlocked
+    assert simulated.firings == 150
+    assert np.isclose(simulated.period(), period(hsdf))
+
+
+def test_deadlock_is_detected():
+    # b is ordered before a on the only core, but needs its tokens
+    simulated = simulate(np.array([[1, -1]]), [1, 1], [[1, 0]], np.ones((2, 1)), iterations=3)
+    assert simulated.deadlocked
+    assert simulated.period() == np.inf
+
+
+def test_validate_decision_model_results():
+    model = generators.sdf_mpsoc_model(generators.random_dag_channels(12, 4, max_repetition=3, seed=2), 3)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    results = synthetic_results(decision_model.sdf_mpsoc_sub)
+    assert validate_results(decision_model, results) == []
+    simulated = simulate_results(decision_model, results, iterations=20)
+    assert np.isclose(simulated.period(), decision_model.evaluate_period(results))
+    assert len(validate_results(decision_model, results, min_throughput=2 * simulated.throughput())) == 1
@@ -0,0 +1,94 @@
+import logging
+
+import forsyde.io.python.api as forsyde_io
+import numpy as np
+import pytest
+
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.pipeline import file_digest
+from idesyde import snapshot
+from idesyde.pipeline import parse_and_identify
+from idesyde.snapshot import _decode
+from idesyde.snapshot import _encode
+from idesyde.snapshot import load_snapshot
+from idesyde.snapshot import read_snapshot
+from idesyde.snapshot import snapshot_path
+from idesyde.snapshot import write_snapshot
+
+
+def _edges(model):
+    return sorted((s.identifier, t.identifier, k, e['object'].get_type_tag(),
+                   getattr(e['object'].source_vertex_port, 'identifier', None),
+                   getattr(e['object'].target_vertex_port, 'identifier', None))
+                  for (s, t, k, e) in model.edges(keys=True, data=True))
+
+
+def test_snapshot_round_trip(tmp_path):
+    model = generators.sdf_mpsoc_model(generators.random_dag_channels(10, 4, max_repetition=3, seed=2), 3)
+    identified = identify_decision_models(model)
+    path = str(tmp_path / 'model.snapshot')
+    write_snapshot(path, 'digest', model, identified)
+    loaded = read_snapshot(path)
+    assert loaded.input_digest == 'digest'
+    assert [v.identifier for v in loaded.model] == [v.identifier for v in model]
+    assert [v.get_type_tag() for v in loaded.model] == [v.get_type_tag() for v in model]
+    assert [v.properties for v in loaded.model] == [v.properties for v in model]
+    assert _edges(loaded.model) == _edges(model)
+    assert loaded.identified == identified
+
+
+def test_pipeline_uses_snapshot_only_while_input_is_unchanged(tmp_path):
+    model_path = str(tmp_path / 'model.forxml')
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(), 2), model_path)
+    logger = logging.getLogger('test')
+    (model, identified) = parse_and_identify(model_path, logger, use_snapshot=True)
+    assert load_snapshot(model_path, file_digest(model_path)) is not None
+    (again, again_identified) = parse_and_identify(model_path, logger, use_snapshot=True)
+    assert again_identified == identified
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(2), 2), model_path)
+    assert load_snapshot(model_path, file_digest(model_path)) is None
+    (changed, _) = parse_and_identify(model_path, logger, use_snapshot=True)
+    assert len(changed) > len(model)
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    model_path = str(tmp_path / 'model.forxml')
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(), 2), model_path)
+    with open(snapshot_path(model_path), 'wb') as stream:
+        stream.write(b'garbage')
+    (model, identified) = parse_and_identify(model_path, logging.getLogger('test'), use_snapshot=True)
+    assert len(identified) == 4
+    assert read_snapshot(snapshot_path(model_path)).identified == identified
+
+
+def test_snapshot_of_other_identification_is_stale(tmp_path, monkeypatch):
+    model_path = str(tmp_path / 'model.forxml')
+    forsyde_io.write_model(generators.sdf_mpsoc_model(generators.sobel_channels(), 2), model_path)
+    model = forsyde_io.load_model(model_path)
+    # properties with keys that are not strings come back as they were
+    next(iter(model)).properties['by_core'] = {0: 3, 1: (4, 5)}
+    write_snapshot(snapshot_path(model_path), file_digest(model_path), model, identify_decision_models(model))
+    loaded = load_snapshot(model_path, file_digest(model_path))
+    assert [v.properties for v in loaded.model] == [v.properties for v in model]
+    # e.g. after a rule is fixed
+    monkeypatch.setattr(snapshot, 'identification_digest', lambda: 'fixed rules')
+    assert load_snapshot(model_path, file_digest(model_path)) is None
+    with pytest.raises(ValueError):
+        read_snapshot(snapshot_path(model_path))
+
+
+def test_values_keep_their_types_without_pickle():
+    arrays = dict()
+    value = [(1, 'a'), {2: {'x'}, 'k': frozenset([3])}, np.int32(4), np.arange(6).reshape((2, 3)), None]
+    encoded = _encode(value, arrays)
+    assert list(arrays) == ['value0']
+    decoded = _decode(encoded, arrays)
+    assert decoded[:3] == value[:3]
+    assert type(decoded[2]) is np.int32
+    assert np.array_equal(decoded[3], value[3]) and decoded[4] is None
+    with pytest.raises(ValueError):
+        _encode(object(), arrays)
+    # only decision models are rebuilt from class names
+    with pytest.raises(ValueError):
+        _decode({'compact': ['os.system', {}]}, arrays)
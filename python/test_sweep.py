@@ -0,0 +1,36 @@
+import numpy as np
+
+from idesyde import sweep
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+
+
+def _characterized(cores):
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), cores, core_types=2)
+    return next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+
+
+def test_restricted_platforms_keep_the_application():
+    decision_model = _characterized(4)
+    configs = sweep.platform_grid(decision_model, core_counts=[2, 8], slot_counts=[1, 3])
+    assert [(len(c.cores), c.comms_capacity[0]) for c in configs] == [(2, 1), (2, 3), (4, 1), (4, 3)]
+    assert configs[0].is_cheaper(configs[3]) and not configs[1].is_cheaper(configs[2])
+    restricted = sweep.restrict_platform(decision_model, configs[1])
+    data = restricted.get_mzn_data()
+    full = decision_model.get_mzn_data()
+    assert data['procs'] == {1, 2}
+    assert data['comms_capacity'] == [3] * len(full['comms'])
+    assert data['wcet'] == np.array(full['wcet'])[:, :2].tolist()
+    assert data['sdf_topology'] == full['sdf_topology']
+    assert data['max_steps'] >= full['max_steps']
+
+
+def test_presolve_rejects_platforms_before_solving():
+    decision_model = _characterized(4)
+    # the first core type cannot run the first actor
+    decision_model.wcet[0, ::2] = 0
+    points = sweep.sweep_platform(decision_model, [sweep.PlatformConfig(cores=(0, ), comms_capacity=(1, ))])
+    assert points[0].status == 'infeasible'
+    assert points[0].reason
+    assert 'infeasible' in sweep.sweep_table(points)
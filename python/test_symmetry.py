@@ -0,0 +1,34 @@
+from idesyde.benchmark import generators
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.identification.symmetry import mpsoc_symmetries
+
+
+def _line_platform_data(wcet):
+    # three cores in a line, connected by one element between each neighbour
+    path = [[[0, 0], [1, 0], [1, 2]], [[1, 0], [0, 0], [0, 1]], [[2, 1], [0, 1], [0, 0]]]
+    return {
+        'sdf_actors': range(1, 3),
+        'sdf_channels': range(1, 2),
+        'procs': {1, 2, 3},
+        'comms': {1, 2},
+        'wcet': wcet,
+        'token_wcct': [[1, 1]],
+        'comms_capacity': [2, 2],
+        'path': path
+    }
+
+
+def test_ends_of_a_line_are_interchangeable():
+    symmetries = mpsoc_symmetries(_line_platform_data([[2, 3, 2], [1, 1, 1]]))
+    assert symmetries['proc_class'] == [1, 2, 1]
+    assert set(symmetries) == {'proc_class'}
+    # different WCETs break the symmetry
+    assert mpsoc_symmetries(_line_platform_data([[2, 3, 4], [1, 1, 1]]))['proc_class'] == [1, 2, 3]
+
+
+def test_bus_cores_are_classed_by_core_type():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 6, core_types=2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    data = decision_model.get_mzn_data()
+    assert data['proc_class'] == [1, 2, 1, 2, 1, 2]
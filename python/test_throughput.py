@@ -0,0 +1,85 @@
+import random
+
+import networkx as nx
+import numpy as np
+
+from idesyde.benchmark import generators
+from idesyde.benchmark.runner import synthetic_results
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.throughput import HSDFGraph
+from idesyde.throughput import build_hsdf
+from idesyde.throughput import max_cycle_mean
+from idesyde.throughput import maxplus_matrix
+from idesyde.throughput import period
+from idesyde.throughput import tdma_delay
+
+
+def test_period_of_simple_graphs():
+    # a -> b with one token back from b to a
+    cycle = build_hsdf(np.array([[1, -1], [-1, 1]]), [1, 1], [0, 1], execution_times=np.array([2.0, 3.0]))
+    assert period(cycle) == 5.0
+    # a fires twice for every firing of b
+    multirate = np.array([[1, -2]])
+    assert period(build_hsdf(multirate, [2, 1], execution_times=np.array([3.0, 3.0, 4.0]))) == 6.0
+    # and on the same core they cannot overlap
+    ordered = build_hsdf(multirate, [2, 1], execution_times=np.array([3.0, 3.0, 4.0]), orders=[[0, 1, 2]])
+    assert period(ordered) == 10.0
+    # without the initial token the cycle deadlocks
+    assert period(build_hsdf(np.array([[1, -1], [-1, 1]]), [1, 1])) == np.inf
+
+
+def test_karp_matches_cycle_enumeration():
+    rng = random.Random(3)
+    for _ in range(20):
+        n = rng.randint(2, 6)
+        edges = [(u, v, float(rng.randint(1, 9)), rng.randint(1, 2)) for u in range(n) for v in range(n)
+                 if rng.random() < 0.4]
+        hsdf = HSDFGraph(offsets=np.arange(n + 1),
+                         sources=np.array([e[0] for e in edges], dtype=int),
+                         targets=np.array([e[1] for e in edges], dtype=int),
+                         weights=np.array([e[2] for e in edges]),
+                         delays=np.array([e[3] for e in edges], dtype=int))
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from(range(n))
+        for (u, v, w, d) in edges:
+            graph.add_edge(u, v, w=w, d=d)
+        expected = 0.0
+        for cycle in nx.simple_cycles(nx.DiGraph(graph)):
+            steps = list(zip(cycle, cycle[1:] + cycle[:1]))
+            # with parallel edges, every choice of edge is a different cycle
+            choices = [[(e['w'], e['d']) for e in graph[u][v].values()] for (u, v) in steps]
+            for picked in _products(choices):
+                expected = max(expected, sum(w for (w, _) in picked) / sum(d for (_, d) in picked))
+        assert np.isclose(period(hsdf), expected)
+
+
+def _products(choices):
+    if not choices:
+        yield []
+        return
+    for c in choices[0]:
+        for rest in _products(choices[1:]):
+            yield [c] + rest
+
+
+def test_max_cycle_mean_without_cycles():
+    assert max_cycle_mean(np.full((2, 2), -np.inf)) == -np.inf
+    assert maxplus_matrix(build_hsdf(np.zeros((0, 1), dtype=int), [1])).shape == (1, 1)
+
+
+def test_tdma_delay_waits_for_other_slots():
+    assert tdma_delay(0, 2.0, 4) == 0.0
+    assert tdma_delay(3, 2.0, 4, allocated=1) == 3 * 2.0 + 3 * 3 * 2.0
+    assert tdma_delay(3, 2.0, 4, allocated=4) == 6.0
+
+
+def test_decision_model_period_of_results():
+    model = generators.sdf_mpsoc_model(generators.sobel_channels(1), 2)
+    decision_model = next(m for m in identify_decision_models(model) if isinstance(m, SDFToMultiCoreCharacterized))
+    value = decision_model.evaluate_period(synthetic_results(decision_model.sdf_mpsoc_sub))
+    assert 0 < value < np.inf
+    # a single core runs every firing in sequence
+    wcet = decision_model.wcet
+    repetitions = decision_model.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector.reshape(-1)
+    assert value <= float(np.sum(np.max(wcet, axis=1) * repetitions)) + np.sum(decision_model.comm_delays())